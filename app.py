@@ -1,11 +1,17 @@
 # app.py
 import streamlit as st
+import metrics
 import ui_capture
+import utils
 
 # --- MAIN APP LAYOUT ---
 st.set_page_config(page_title="BDO Loan Eligibility Assistant", layout="wide")
 st.title("💬 BDO Loan Eligibility Assistant")
 st.caption("Capture lead details and get instant eligibility results.")
 
+# Periodic metrics file, when ELIGIBILITY_METRICS and ELIGIBILITY_METRICS_FILE are set
+utils.init_metrics_dump()
+
 # Always show the Lead Capture view (Admin removed)
-ui_capture.display_lead_capture()
+with metrics.timed("eligibility_rerun_seconds", page="lead_capture"):
+    ui_capture.display_lead_capture()
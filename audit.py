@@ -0,0 +1,281 @@
+# audit.py
+"""
+Out-of-core re-scoring of lead exports (month-end audit).
+
+Reads leads from a CSV or XLSX file, or straight from public.bdo_leads, in
+bounded chunks, scores each chunk with bulk.check_eligibility_bulk on a pool
+of worker processes and streams the results, in input order, to a CSV:
+    mobile_number, eligible_lenders, eligibility_mask, <one column per lender>
+where a lender column is empty when the lead is eligible and otherwise lists
+the failed checks (logic.REASON_LABELS, e.g. "vintage+foir").
+
+Only a few chunks are in flight at a time, so memory does not grow with the
+input. Each worker loads the policy tables once (the memory-mapped snapshot).
+After every chunk the output is flushed and <output>.progress records how far
+it got; re-running the same command resumes from there, as long as the source
+and the policy (its rules and tables, see snapshot.source_hash) are unchanged
+(--restart starts over).
+
+Usage (from the repo root):
+    python audit.py leads.csv audit.csv [--chunk-size 20000] [--workers N]
+    python audit.py --db audit.csv [--status active]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import export
+import logic
+import policy_data
+import snapshot
+
+CHUNK_SIZE = 20000
+LEADS_SHEET = "leads"  # utils.LEADS_SHEET; utils is not imported (Streamlit)
+
+# Text columns that spreadsheets turn into floats ("560001.0")
+_DIGIT_COLUMNS = ("mobile_number", "pincode")
+
+
+# --- SOURCES ---
+# Each yields DataFrame chunks of at most chunk_size rows, starting after the
+# first `skip` rows (resume).
+def read_csv_chunks(path, chunk_size, skip=0):
+    reader = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""], chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            # Skipped by record, not by line: a quoted field may span lines
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            yield chunk.iloc[skip:] if skip else chunk
+            skip = 0
+
+
+def read_xlsx_chunks(path, chunk_size, skip=0):
+    from openpyxl import load_workbook
+    book = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = book[LEADS_SHEET] if LEADS_SHEET in book.sheetnames else book.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(name).strip() if name is not None else "" for name in next(rows, ())]
+        chunk = []
+        for row_number, row in enumerate(rows):
+            if row_number < skip:
+                continue
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame.from_records(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame.from_records(chunk, columns=header)
+    finally:
+        book.close()
+
+
+def read_db_chunks(pool, chunk_size, after_mobile="", status=None):
+    """
+    Streams public.bdo_leads through a server-side cursor in mobile_number
+    order, starting after after_mobile (resume).
+    """
+    columns = ("mobile_number", "lead_json") + tuple(c for c in _LEAD_COLUMNS if c != "mobile_number")
+    return export.iter_lead_chunks(pool, columns, chunk_size, after_mobile=after_mobile, status=status)
+
+
+# Lead columns read from the database (bulk.LEAD_FIELDS plus the derivation inputs)
+_LEAD_COLUMNS = ("mobile_number", "vintage_years", "constitution_type", "monthly_turnover", "yearly_turnover",
+                 "total_obligations", "foir", "pincode", "business_segment", "ownership_status", "is_ntc",
+                 "requested_loan_type")
+
+
+# --- SCORING (worker processes) ---
+def _init_worker():
+    # Loads the policy tables (snapshot) once per worker, before the first chunk
+    import bulk  # noqa: F401
+
+
+def _clean_digits(column):
+    text = column.astype("string").str.strip()
+    return text.str.replace(r"\.0$", "", regex=True)
+
+
+def normalize_chunk(df):
+    """Types a raw chunk the way the capture form stores leads (cf. importer.normalize_lead)."""
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    for column in _DIGIT_COLUMNS:
+        if column in df.columns:
+            df[column] = _clean_digits(df[column])
+    if "is_ntc" in df.columns and not pd.api.types.is_bool_dtype(df["is_ntc"]):
+        flags = df["is_ntc"].astype("string").str.strip().str.lower()
+        df["is_ntc"] = flags.isin(["true", "yes", "1", "y"]).astype(object).where(flags.notna(), None)
+    # Derived fields, computed the same way as the capture form
+    if "monthly_turnover" in df.columns:
+        monthly = pd.to_numeric(df["monthly_turnover"], errors="coerce")
+        if "yearly_turnover" not in df.columns:
+            df["yearly_turnover"] = None
+        yearly = pd.to_numeric(df["yearly_turnover"], errors="coerce")
+        df["yearly_turnover"] = yearly.fillna(monthly * 12)
+        if "total_obligations" in df.columns:
+            if "foir" not in df.columns:
+                df["foir"] = None
+            foir = pd.to_numeric(df["foir"], errors="coerce")
+            derived = pd.to_numeric(df["total_obligations"], errors="coerce") / monthly.where(monthly != 0)
+            df["foir"] = foir.fillna(derived)
+    return df
+
+
+def score_chunk(df):
+    """Scores one chunk; returns (rows, CSV text without header, last mobile_number)."""
+    import bulk
+    df = normalize_chunk(df)
+    rules = logic.COMPILED_RULES
+    _, codes = bulk.check_eligibility_bulk(df, rules)
+    labels = {}  # reason code -> "vintage+foir"; few distinct codes per chunk
+
+    def describe(code):
+        if code not in labels:
+            labels[code] = "+".join(logic.describe_reason_codes(code))
+        return labels[code]
+
+    out = pd.DataFrame({"mobile_number": df["mobile_number"] if "mobile_number" in df.columns else ""},
+                       index=df.index)
+    eligible = codes.eq(0)
+    out["eligible_lenders"] = eligible.sum(axis=1)
+    mask = np.zeros(len(df), dtype=np.int64)
+    for rule in rules:
+        mask |= eligible[rule.lender].to_numpy(dtype=np.int64) << rule.eligibility_bit
+        out[rule.lender] = [describe(int(code)) for code in codes[rule.lender]]
+    out["eligibility_mask"] = mask
+    out = out[["mobile_number", "eligible_lenders", "eligibility_mask"] + [rule.lender for rule in rules]]
+    last_mobile = str(out["mobile_number"].iloc[-1]) if len(out) else ""
+    return len(out), out.to_csv(header=False, index=False), last_mobile
+
+
+# --- PIPELINE ---
+def _progress_path(output):
+    return Path(f"{output}.progress")
+
+
+def policy_hash(policy=None):
+    """Content hash of the policy's rules and tables; a changed policy cannot resume a run."""
+    lenders = (policy or logic.POLICY).lenders
+    return snapshot.source_hash(*policy_data.source_files(lenders), lenders)
+
+
+def _load_progress(output, source, policy, restart):
+    """Returns the progress record to resume from, or a fresh one (policy: policy_hash())."""
+    fresh = {"source": source, "policy_hash": policy, "rows": 0, "bytes": 0, "last_mobile": ""}
+    path = _progress_path(output)
+    if restart or not path.exists() or not Path(output).exists():
+        return fresh
+    progress = json.loads(path.read_text())
+    if progress.get("source") != source or progress.get("policy_hash") != policy:
+        raise SystemExit(f"{path} belongs to another run (source {progress.get('source')!r} or a different "
+                         f"policy); use --restart to start over.")
+    return progress
+
+
+def _save_progress(output, progress):
+    path = _progress_path(output)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(progress))
+    os.replace(tmp_path, path)
+
+
+def run_audit(chunks, output, progress, workers=None, report=None):
+    """
+    Scores DataFrame chunks on a process pool and appends the results to
+    output in input order, recording progress after each chunk.
+    Returns the final progress record.
+    """
+    header = ["mobile_number", "eligible_lenders", "eligibility_mask"] + [rule.lender for rule in logic.COMPILED_RULES]
+    workers = workers or os.cpu_count() or 1
+    with open(output, "a+b") as out:
+        # Drop anything written after the last recorded chunk
+        out.truncate(progress["bytes"])
+        out.seek(progress["bytes"])
+        if progress["bytes"] == 0:
+            out.write((pd.DataFrame(columns=header).to_csv(index=False)).encode())
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            pending = deque()
+
+            def write_next():
+                rows, text, last_mobile = pending.popleft().result()
+                out.write(text.encode())
+                out.flush()
+                os.fsync(out.fileno())
+                progress.update(rows=progress["rows"] + rows, bytes=out.tell(), last_mobile=last_mobile)
+                _save_progress(output, progress)
+                if report:
+                    report(progress)
+
+            try:
+                for chunk in chunks:
+                    pending.append(executor.submit(score_chunk, chunk))
+                    # Bounded read-ahead: memory stays flat however large the source is
+                    while len(pending) > 2 * workers:
+                        write_next()
+                while pending:
+                    write_next()
+            except KeyboardInterrupt:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score a leads export (CSV/XLSX) or public.bdo_leads in chunks.")
+    parser.add_argument("source", nargs="?", help="CSV or XLSX file in the data/leads.xlsx layout")
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--db", action="store_true", help="read public.bdo_leads instead of a file")
+    parser.add_argument("--status", help="with --db: only leads with this status")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--restart", action="store_true", help="ignore earlier progress and overwrite output")
+    args = parser.parse_args(argv)
+    if bool(args.db) == bool(args.source):
+        parser.error("give either a source file or --db")
+
+    source = f"db:{args.status or '*'}" if args.db else str(Path(args.source).resolve())
+    progress = _load_progress(args.output, source, policy_hash(), args.restart)
+    if progress["rows"]:
+        print(f"Resuming after {progress['rows']:,} rows")
+
+    if args.db:
+        import utils
+        chunks = read_db_chunks(utils.init_db_pool(), args.chunk_size, progress["last_mobile"], args.status)
+    elif Path(args.source).suffix.lower() in (".xlsx", ".xls"):
+        chunks = read_xlsx_chunks(args.source, args.chunk_size, progress["rows"])
+    else:
+        chunks = read_csv_chunks(args.source, args.chunk_size, progress["rows"])
+
+    start = time.perf_counter()
+    first_row = progress["rows"]
+
+    def report(progress):
+        done = progress["rows"] - first_row
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        print(f"  {progress['rows']:,} rows scored ({rate:,.0f} rows/s)", end="\r", flush=True)
+
+    try:
+        progress = run_audit(chunks, args.output, progress, args.workers, report)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted after {progress['rows']:,} rows; run the same command again to resume.")
+        return 130
+    print()
+    print(f"Wrote {progress['rows']:,} rows to {args.output} in {time.perf_counter() - start:.1f}s")
+    _progress_path(args.output).unlink(missing_ok=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1126 @@
+# bench.py
+"""
+Micro-benchmarks for the eligibility engine.
+Run from the repo root:  python bench.py [benchmark ...]
+
+Regression suite (eligibility latency and throughput, startup, peak memory,
+lead saves/loads, Streamlit reruns), compared with bench_baseline.json;
+exits 1 when a metric is more than --threshold slower than the baseline:
+    python bench.py --suite [--quick] [--group ui] [--threshold 0.25]
+    python bench.py --suite [--quick] --save-baseline      (after an intended change)
+Set BENCH_DATABASE_URL to a scratch Postgres to time saves/loads against it
+instead of the in-memory fake.
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+SEGMENTS = ["Kirana Store", "Textile Trading", "IT Services", "Jewellery Shop", "DSA / Loan Agent",
+            "Pharma Distributor", "Real Estate Broker", "Restaurant", "Auto Parts", "Cattle Feed"]
+CONSTITUTIONS = ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd", "CA", "Others"]
+OWNERSHIP = ["Both Owned", "Both Rented", "Residence Owned", "Office Owned", "Residence Owned in Other City"]
+LOAN_TYPES = ["Term Loan", "DLOD", "OD", "LAP"]
+PINCODES = ["110001", "400080", "560001", "500017", "380058", "201301", "122001", "452011", "999999"]
+
+
+def make_leads(n, seed=42):
+    """Builds n synthetic leads shaped like st.session_state.lead_data at step 16."""
+    rnd = random.Random(seed)
+    leads = []
+    for i in range(n):
+        monthly_turnover = rnd.choice([1, 2, 3.5, 5, 8, 12]) * 100000
+        obligations = monthly_turnover * rnd.choice([0.0, 0.1, 0.15, 0.25, 0.4, 0.6])
+        leads.append({
+            "mobile_number": str(9000000000 + i),
+            "pincode": rnd.choice(PINCODES),
+            "vintage_years": rnd.choice([0.5, 1.0, 1.8, 2.5, 2.9, 3.0, 5.0, 10.0]),
+            "ownership_status": rnd.choice(OWNERSHIP),
+            "business_segment": rnd.choice(SEGMENTS),
+            "constitution_type": rnd.choice(CONSTITUTIONS),
+            "is_ntc": rnd.random() < 0.2,
+            "monthly_turnover": monthly_turnover,
+            "yearly_turnover": monthly_turnover * 12,
+            "total_obligations": obligations,
+            "foir": obligations / monthly_turnover,
+            "requested_loan_type": rnd.choice(LOAN_TYPES),
+        })
+    return leads
+
+
+def make_captured_leads(n, seed=42):
+    """
+    Like make_leads, but weighted the way BDOs' captured leads are: mostly term
+    loans from proprietorships/partnerships in serviced pincodes with
+    moderate FOIR, so several lenders accept a typical lead.
+    """
+    rnd = random.Random(seed)
+    leads = make_leads(n, seed)
+    for lead in leads:
+        lead["constitution_type"] = rnd.choices(CONSTITUTIONS, weights=[50, 20, 5, 15, 2, 4, 4])[0]
+        lead["requested_loan_type"] = rnd.choices(LOAN_TYPES, weights=[80, 8, 7, 5])[0]
+        lead["ownership_status"] = rnd.choices(OWNERSHIP, weights=[35, 15, 30, 15, 5])[0]
+        lead["vintage_years"] = rnd.choice([1.0, 2.5, 3.0, 4.0, 5.0, 8.0, 10.0])
+        lead["monthly_turnover"] = rnd.choice([3, 5, 8, 12, 20]) * 100000
+        lead["yearly_turnover"] = lead["monthly_turnover"] * 12
+        lead["total_obligations"] = lead["monthly_turnover"] * rnd.choice([0.0, 0.05, 0.1, 0.15, 0.25])
+        lead["foir"] = lead["total_obligations"] / lead["monthly_turnover"]
+        lead["is_ntc"] = rnd.random() < 0.05
+        lead["pincode"] = rnd.choices(PINCODES, weights=[20, 20, 20, 15, 10, 5, 5, 4, 1])[0]
+    return leads
+
+
+# Weights for make_form_leads, from the mix of leads BDOs capture
+SEGMENT_WEIGHTS = [22, 14, 8, 9, 3, 10, 3, 12, 12, 7]
+NATURES = ["Retailer", "Manufacturer", "Service Provider", "Wholesaler"]
+UNIT_WEIGHTS = {"Rupees": 15, "Thousands": 10, "Lakhs": 70, "Crores": 5}
+_PINCODE_POOL = []
+
+
+def _pincode_pool():
+    """(pincodes, cum_weights): serviceable pincodes, weighted by how many lenders serve them (metros first)."""
+    if not _PINCODE_POOL:
+        import logic
+        covered = {}
+        for view in logic.SERVICEABLE_PINCODES.values():
+            for pincode in view:
+                covered[pincode] = covered.get(pincode, 0) + 1
+        pincodes = sorted(covered)
+        cum_weights, total = [], 0
+        for pincode in pincodes:
+            total += covered[pincode] ** 2
+            cum_weights.append(total)
+        _PINCODE_POOL.extend([pincodes, cum_weights])
+    return _PINCODE_POOL
+
+
+def _amount(rnd, rupees):
+    """rupees as a BDO would type it: a rounded value in a (mostly Lakhs) unit, back in rupees."""
+    import utils
+    unit = rnd.choices(list(UNIT_WEIGHTS), weights=list(UNIT_WEIGHTS.values()))[0]
+    value = round(rupees / utils.UNITS[unit], 2 if unit in ("Lakhs", "Crores") else 0)
+    return value * utils.UNITS[unit]
+
+
+def make_form_leads(n, seed=42):
+    """
+    Complete leads as the capture form saves them (every field through step 16),
+    with the real mix: pincodes drawn from the lenders' serviceable tables
+    (weighted towards pincodes many lenders serve, ~8% outside all of them),
+    weighted segments and constitutions, and amounts entered in units.
+    """
+    rnd = random.Random(seed)
+    pincodes, cum_weights = _pincode_pool()
+    leads = make_captured_leads(n, seed)
+    for lead in leads:
+        if rnd.random() < 0.08:
+            lead["pincode"] = str(rnd.randrange(110000, 860000))
+        else:
+            lead["pincode"] = str(rnd.choices(pincodes, cum_weights=cum_weights)[0])
+        lead["business_segment"] = rnd.choices(SEGMENTS, weights=SEGMENT_WEIGHTS)[0]
+        monthly_turnover = _amount(rnd, rnd.lognormvariate(13.1, 0.8))  # median ~5 Lakhs
+        obligations = _amount(rnd, monthly_turnover * rnd.choice([0.0, 0.05, 0.1, 0.15, 0.25, 0.4, 0.7]))
+        gender = rnd.choices(["Male", "Female", "Other"], weights=[85, 14, 1])[0]
+        age = rnd.randint(19, 70)
+        lead.update({
+            "firm_name": f"Firm {lead['mobile_number'][-6:]}",
+            "bdo_name": f"BDO {rnd.randrange(40)}",
+            "nature_of_business": rnd.choices(NATURES, weights=[45, 15, 25, 15])[0],
+            "gender": gender,
+            "age": age,
+            "co_applicant_details": ({"name": "Co Applicant", "relationship": "Spouse"}
+                                     if gender == "Female" or not 21 <= age <= 65 else None),
+            "monthly_turnover": monthly_turnover,
+            "yearly_turnover": monthly_turnover * 12,
+            "total_obligations": obligations,
+            "foir": obligations / monthly_turnover if monthly_turnover else 0.0,
+            "profit_last_year": _amount(rnd, monthly_turnover * 12 * rnd.choice([0.0, 0.03, 0.06, 0.1])),
+            "remarks": "",
+            "draft_step": 16,
+        })
+    return leads
+
+
+# Awkward values per lead field for make_edge_leads: nulls, empty strings,
+# numbers as text or of the wrong type, misspelt and mixed-case segments
+EDGE_VALUES = {
+    "pincode": [None, "", "0", "abc", "11000 1", " 110001", 110001, 400080.0, "999999", "-1", float("inf")],
+    "vintage_years": [None, "", "2.5", "abc", 0, -1, 2.999, 3, float("nan"), True],
+    "constitution_type": [None, "", "sole proprietor", "Sole Proprietor ", 0],
+    "yearly_turnover": [None, "", "2400000", "24 lakhs", 0, -5, 1e12, float("inf"), float("-inf"), "-inf"],
+    "foir": [None, "", "0.3", 0.3, 0.17, 0.1700001, -0.1, float("nan")],
+    "business_segment": [None, "", "  ", "REAL ESTATE broker", "Jewelery Shop", "Real  Estate", "dsa", 0],
+    "ownership_status": [None, "", "both rented", "Unknown"],
+    "is_ntc": [None, "", "True", 1, 0, False, True],
+    "requested_loan_type": [None, "", "term loan", "LAP", "Working Capital"],
+}
+
+
+def make_edge_leads(n, seed=42):
+    """
+    make_leads with roughly a third of each lead's fields replaced by an
+    EDGE_VALUES entry or dropped from the dict. Used to check the bulk scorer
+    against logic.check_eligibility.
+    """
+    rnd = random.Random(seed)
+    leads = make_leads(n, seed)
+    for lead in leads:
+        for field, values in EDGE_VALUES.items():
+            roll = rnd.random()
+            if roll < 0.05:
+                del lead[field]
+            elif roll < 0.35:
+                lead[field] = rnd.choice(values)
+    return leads
+
+
+def _timeit(fn, repeat=5):
+    """Returns the best wall time of repeat runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# --- BENCHMARKS ---
+def bench_check_eligibility(n=2000):
+    import logic
+    leads = make_leads(n)
+    seconds = _timeit(lambda: [logic.check_eligibility(lead) for lead in leads])
+    print(f"check_eligibility: {seconds / n * 1e6:,.1f} µs/call ({n} leads, {len(logic.POLICY_RULES)} lenders)")
+
+
+def bench_results(n=2000):
+    """Dict results vs lazily formatted EligibilityResult objects: time and blocks kept per lead."""
+    import tracemalloc
+    import logic
+    leads = make_leads(n)
+    cases = {
+        "check_eligibility (dicts)": logic.check_eligibility,
+        "evaluate_lead (flags only)": lambda lead: [r.eligible for r in logic.evaluate_lead(lead).values()],
+        "evaluate_lead + reasons read": lambda lead: [r["reasons"] for r in logic.evaluate_lead(lead).values()],
+        "eligibility_columns": logic.eligibility_columns,
+    }
+    for name, fn in cases.items():
+        seconds = _timeit(lambda: [fn(lead) for lead in leads])
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        kept = [fn(lead) for lead in leads[:200]]
+        blocks = sum(stat.count_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+        tracemalloc.stop()
+        print(f"{name}: {seconds / n * 1e6:,.1f} µs/lead, {blocks / len(kept):,.0f} blocks kept/lead")
+
+
+def bench_short_circuit(n=5000):
+    """Eligible/not-eligible flags: every check vs the short-circuit mode, fixed and learned order."""
+    import logic
+    for mix, make in (("captured-lead mix", make_captured_leads), ("uniform mix", make_leads)):
+        leads = make(n, seed=17)
+        fixed = logic.CheckOrder(sample_every=0)  # never samples: POLICY_CHECKS order
+        learned = logic.CheckOrder()
+        for lead in make(5000, seed=18):  # warm-up on a separate sample of the same mix
+            logic.eligibility_flags(lead, check_order=learned)
+        expected = [{lender: r.eligible for lender, r in logic.evaluate_lead(lead).items()} for lead in leads]
+        assert [logic.eligibility_flags(lead, check_order=learned) for lead in leads] == expected
+        eligible = sum(sum(flags.values()) for flags in expected) / (n * len(logic.COMPILED_RULES))
+        print(f"{mix} ({eligible:.0%} of lead x lender pairs eligible):")
+        cases = {
+            "check_eligibility (full diagnostics)": logic.check_eligibility,
+            "evaluate_lead flags (all checks)": lambda lead: [r.eligible for r in logic.evaluate_lead(lead).values()],
+            "eligibility_flags, fixed order": lambda lead: logic.eligibility_flags(lead, check_order=fixed),
+            "eligibility_flags, learned order": lambda lead: logic.eligibility_flags(lead, check_order=learned),
+        }
+        for name, fn in cases.items():
+            seconds = _timeit(lambda: [fn(lead) for lead in leads])
+            print(f"  {name}: {seconds / n * 1e6:,.1f} µs/lead")
+
+
+def bench_bulk(n=1_000_000):
+    import pandas as pd
+    import bulk
+    leads_df = pd.DataFrame.from_records(make_leads(n))
+    seconds = _timeit(lambda: bulk.check_eligibility_bulk(leads_df), repeat=3)
+    print(f"check_eligibility_bulk: {seconds:.2f} s for {n:,} leads ({n / seconds:,.0f} leads/s)")
+
+
+def bench_capacity(n=100_000):
+    import pandas as pd
+    import bulk
+    import capacity
+    import logic
+
+    # One lead: the rates x tenures grid per lender as one broadcast vs nested loops
+    lead = make_form_leads(1, seed=7)[0]
+    rates, tenures = capacity.INTEREST_RATES, capacity.TENURES_MONTHS
+
+    def _loops():
+        monthly = lead["monthly_turnover"]
+        grid = {}
+        for rule in logic.COMPILED_RULES:
+            max_emi = max(rule.max_foir * monthly - lead["total_obligations"], 0.0)
+            for rate in rates:
+                for months in tenures:
+                    r = rate / 12
+                    grid[rule.lender, rate, months] = max_emi * (1 - (1 + r) ** -months) / r
+        return grid
+
+    for label, fn in (("nested loops", _loops), ("lead_capacity", lambda: capacity.lead_capacity(lead))):
+        seconds = _timeit(lambda: [fn() for _ in range(2000)]) / 2000
+        print(f"capacity grid per lead ({label}, {len(rates)}x{len(tenures)}): {seconds * 1e6:,.1f} us")
+
+    leads_df = pd.DataFrame.from_records(make_form_leads(n, seed=8))
+    eligible, _ = bulk.check_eligibility_bulk(leads_df)
+    seconds = _timeit(lambda: capacity.capacity_bulk(leads_df, eligible), repeat=3)
+    print(f"capacity_bulk: {seconds:.2f} s for {n:,} leads ({n / seconds:,.0f} leads/s)")
+
+
+def bench_pincode_index():
+    import timeit
+    import tracemalloc
+    import pandas as pd
+    import utils
+    from pincodes import PincodeIndex
+
+    tracemalloc.start()
+    sets = {lender: set(view) for lender, view in utils.load_pincode_sets().items()}
+    sets_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    index = PincodeIndex(sets)
+    views = {lender: index.view(lender) for lender in sets}
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"pincode sets: {sets_bytes / 1e6:.1f} MB as per-lender sets, {index_bytes / 1e6:.1f} MB as shared index")
+
+    lender = next(iter(sets))
+    probes = pd.Series(PINCODES).astype(int).tolist()
+    for label, container in (("set", sets[lender]), ("index view", views[lender])):
+        seconds = timeit.timeit(lambda: [p in container for p in probes], number=20000) / 20000 / len(probes)
+        print(f"pincode lookup ({label}): {seconds * 1e9:,.0f} ns")
+
+    # What check_eligibility does per lead: one lookup per lender vs one mask read
+    all_sets = list(sets.values())
+    bits = [index.bits[lender] for lender in sets]
+
+    def _mask_lookup(p):
+        mask = index.mask_for(p)
+        return [mask & bit for bit in bits]
+
+    per_lead = {
+        "sets, all lenders": lambda p: [p in s for s in all_sets],
+        "index mask, all lenders": _mask_lookup,
+    }
+    for label, lookup in per_lead.items():
+        seconds = timeit.timeit(lambda: [lookup(p) for p in probes], number=5000) / 5000 / len(probes)
+        print(f"pincode lookup per lead ({label}): {seconds * 1e9:,.0f} ns")
+
+
+_STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import numpy, policy_data
+loaded = time.perf_counter()
+import logic
+print(loaded - start, time.perf_counter() - loaded)
+"""
+
+
+def bench_startup(runs=3):
+    """
+    Fresh-process startup: time to import logic's dependencies and then logic
+    (policy tables), rebuilding from the CSVs vs loading the snapshot.
+    """
+    import os
+    import subprocess
+    import tempfile
+
+    def _startup_seconds(snapshot_file):
+        env = dict(os.environ, POLICY_SNAPSHOT_FILE=snapshot_file)
+        out = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT], env=env, capture_output=True, text=True, check=True)
+        return [float(value) for value in out.stdout.strip().splitlines()[-1].split()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_file = os.path.join(tmp, "policy_snapshot.npz")
+        csv_runs = []
+        for _ in range(runs):
+            if os.path.exists(snapshot_file):
+                os.remove(snapshot_file)
+            csv_runs.append(_startup_seconds(snapshot_file))
+        snapshot_runs = [_startup_seconds(snapshot_file) for _ in range(runs)]
+    for label, timings in (("CSVs + snapshot rebuild", csv_runs), ("snapshot", snapshot_runs)):
+        deps, policy = min(timings, key=lambda t: t[1])
+        print(f"startup ({label}): policy tables {policy * 1e3:,.0f} ms (imports {deps * 1e3:,.0f} ms)")
+
+
+_WORKER_SCRIPT = """
+import sys
+import numpy as np
+import logic
+index = next(iter(logic.SERVICEABLE_PINCODES.values())).index
+masks = np.array(index.masks) if sys.argv[1] == "private" else index.masks
+int(np.count_nonzero(masks))  # fault in every page
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def bench_worker_memory(workers=4):
+    """
+    Unique memory (USS) per worker process holding the pincode table privately
+    vs memory-mapping the shared snapshot. Needs psutil.
+    """
+    import subprocess
+    import psutil
+
+    for mode in ("private", "shared"):
+        procs = [subprocess.Popen([sys.executable, "-c", _WORKER_SCRIPT, mode], stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                 for _ in range(workers)]
+        try:
+            for proc in procs:
+                while proc.stdout.readline().strip() != "ready":
+                    pass
+            uss = [psutil.Process(proc.pid).memory_full_info().uss for proc in procs]
+        finally:
+            for proc in procs:
+                proc.communicate("")
+        print(f"worker memory ({mode} pincode table, {workers} workers): {sum(uss) / workers / 1e6:,.1f} MB USS per worker")
+
+
+# --- FAKE DB-API CONNECTION ---
+class FakeDBError(Exception):
+    """Stands in for the driver's OperationalError."""
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.connection = conn
+        self._row = None
+        self._values = []
+
+    def mogrify(self, template, args):
+        # execute_values renders each row with mogrify; keep the params instead
+        self._values.append(args)
+        return b"()"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.closed:
+            raise FakeDBError("server closed the connection unexpectedly")
+        if isinstance(query, bytes):  # a rendered execute_values statement
+            query, params, self._values = query.decode(), self._values, []
+        with self.conn.busy:  # one statement at a time per connection, like psycopg2
+            time.sleep(self.conn.latency)
+        self._row = self.conn.server.execute(query, params)
+
+    def fetchone(self):
+        return self._row
+
+
+class FakeConnection:
+    """DB-API stand-in with a fixed round-trip latency per statement."""
+
+    def __init__(self, server, latency):
+        import threading
+        self.server = server
+        self.latency = latency
+        self.encoding = "UTF8"
+        self.closed = 0
+        self.busy = threading.Lock()
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeLeadServer:
+    """In-memory public.bdo_leads keyed by mobile number."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def execute(self, query, params):
+        if query.lstrip().startswith("INSERT"):
+            for row in params if isinstance(params, list) else [params]:
+                self.rows[row["mobile"]] = {"lead_json": row["lead_json"], "draft_step": row["draft_step"],
+                                            "status": row["status"], "updated_at": None,
+                                            "eligibility_codes": row["eligibility_codes"]}
+        elif "WHERE mobile_number" in query:
+            return self.rows.get(params[0])
+        return None
+
+
+def bench_db_pool(saves=32, latency=0.02):
+    """N simultaneous save_lead_to_db calls: one shared connection vs a pool of 8."""
+    from concurrent.futures import ThreadPoolExecutor
+    import utils
+    from db import ConnectionPool
+
+    leads = make_leads(saves)
+    original = utils.init_db_pool
+    try:
+        for maxconn in (1, 8):
+            server = FakeLeadServer()
+            pool = ConnectionPool(lambda: FakeConnection(server, latency), minconn=1, maxconn=maxconn,
+                                  disconnect_errors=(FakeDBError,))
+            utils.init_db_pool = lambda: pool
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=saves) as executor:
+                ok = list(executor.map(utils.save_lead_to_db, leads))
+            seconds = time.perf_counter() - start
+            print(f"save_lead_to_db x{saves} concurrent ({maxconn} connection(s), {latency * 1e3:.0f} ms RTT): "
+                  f"{seconds * 1e3:,.0f} ms, {sum(ok)} saved")
+    finally:
+        utils.init_db_pool = original
+
+
+def bench_write_behind(saves=200, latency=0.02):
+    """Save latency seen by the UI: direct upsert vs write-behind queue, plus drain time."""
+    import os
+    import tempfile
+    import utils
+    from db import ConnectionPool
+    from outbox import LeadOutbox
+
+    leads = make_leads(saves)
+    original = utils.init_db_pool
+    try:
+        server = FakeLeadServer()
+        pool = ConnectionPool(lambda: FakeConnection(server, latency), minconn=1, maxconn=1,
+                              disconnect_errors=(FakeDBError,))
+        utils.init_db_pool = lambda: pool
+        start = time.perf_counter()
+        for lead in leads:
+            utils.save_lead_to_db(lead)
+        seconds = time.perf_counter() - start
+        print(f"save_lead_to_db x{saves} ({latency * 1e3:.0f} ms RTT): {seconds / saves * 1e3:.2f} ms/save")
+
+        server = FakeLeadServer()
+        pool = ConnectionPool(lambda: FakeConnection(server, latency), minconn=1, maxconn=1,
+                              disconnect_errors=(FakeDBError,))
+        with tempfile.TemporaryDirectory() as tmp:
+            outbox = LeadOutbox(os.path.join(tmp, "outbox.sqlite3"), flush=utils.save_leads_to_db)
+            start = time.perf_counter()
+            for lead in leads:
+                outbox.enqueue(lead)
+            queued = time.perf_counter() - start
+            drained = 0
+            while outbox.drain_once():
+                drained += 1
+            total = time.perf_counter() - start
+            print(f"outbox.enqueue x{saves}: {queued / saves * 1e3:.2f} ms/save; "
+                  f"all synced after {total * 1e3:,.0f} ms in {drained} batch(es), {len(server.rows)} rows")
+    finally:
+        utils.init_db_pool = original
+
+
+def bench_draft_cache(leads=50, reloads=5, latency=0.02):
+    """Repeated "Load Draft" of the same leads: database round trip vs draft cache hit."""
+    import utils
+    from db import ConnectionPool
+
+    sample = make_leads(leads)
+    server = FakeLeadServer()
+    pool = ConnectionPool(lambda: FakeConnection(server, latency), minconn=1, maxconn=1,
+                          disconnect_errors=(FakeDBError,))
+    original = utils.init_db_pool
+    try:
+        utils.init_db_pool = lambda: pool
+        utils.save_leads_to_db([(lead, "draft") for lead in sample])
+        cache = utils.init_draft_cache()
+        cache.clear()
+        before = cache.stats()
+        start = time.perf_counter()
+        for lead in sample:
+            utils.load_draft_from_db(lead["mobile_number"])
+        cold = (time.perf_counter() - start) / leads
+        start = time.perf_counter()
+        for _ in range(reloads):
+            for lead in sample:
+                utils.load_draft_from_db(lead["mobile_number"])
+        warm = (time.perf_counter() - start) / (leads * reloads)
+        stats = cache.stats()
+    finally:
+        utils.init_db_pool = original
+    print(f"load_draft_from_db ({latency * 1e3:.0f} ms RTT): miss {cold * 1e3:.2f} ms, hit {warm * 1e6:.1f} us; "
+          f"{stats['hits'] - before['hits']} hits, {stats['misses'] - before['misses']} misses")
+
+
+def bench_import(n=100_000, latency=0.02, chunk_size=1000):
+    """importer.import_leads of an n-row CSV vs one save_lead_to_db per row (extrapolated)."""
+    import os
+    import tempfile
+    import pandas as pd
+    import importer
+    import utils
+    from db import ConnectionPool
+
+    leads = make_leads(n)
+    server = FakeLeadServer()
+    pool = ConnectionPool(lambda: FakeConnection(server, latency), minconn=1, maxconn=1,
+                          disconnect_errors=(FakeDBError,))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "leads.csv")
+        pd.DataFrame(leads).to_csv(path, index=False)
+        start = time.perf_counter()
+        summary, errors = importer.import_leads(path, pool=pool, chunk_size=chunk_size)
+        seconds = time.perf_counter() - start
+    print(f"import_leads {n:,} rows ({chunk_size}-row chunks, {latency * 1e3:.0f} ms RTT): {seconds:.1f} s, "
+          f"{summary['imported']:,} imported, {summary['failed']} failed")
+
+    original = utils.init_db_pool
+    try:
+        utils.init_db_pool = lambda: pool
+        sample = leads[:100]
+        start = time.perf_counter()
+        for lead in sample:
+            utils.save_lead_to_db(lead, status="active")
+        per_row = (time.perf_counter() - start) / len(sample)
+    finally:
+        utils.init_db_pool = original
+    print(f"save_lead_to_db per row: {per_row * 1e3:.1f} ms -> {per_row * n / 60:,.0f} min for {n:,} rows")
+
+
+def bench_eligibility_storage(n=200_000, lender="Kotak (Term Loan)"):
+    """
+    Stored eligibility per lead: eligibility_results JSON text vs eligibility_mask
+    + eligibility_codes. With BENCH_DATABASE_URL pointing at a scratch Postgres,
+    also loads n leads both ways and times "active leads eligible for a lender
+    updated in the last week".
+    """
+    import json
+    import os
+    from datetime import datetime, timedelta, timezone
+    import logic
+
+    leads = make_leads(2000)
+    json_bytes = sum(len(json.dumps(logic.check_eligibility(lead))) for lead in leads) / len(leads)
+    # bigint + array header (24 bytes) + 2 bytes per smallint
+    code_bytes = sum(8 + 24 + 2 * len(logic.eligibility_columns(lead)[1]) for lead in leads) / len(leads)
+    print(f"eligibility per lead: {json_bytes:,.0f} bytes as JSON text vs {code_bytes:.0f} bytes as mask + codes")
+
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        print("  (set BENCH_DATABASE_URL to a scratch Postgres to compare table size and query time)")
+        return
+    import psycopg2
+    import psycopg2.extras
+    import schema
+
+    rnd = random.Random(7)
+    conn = psycopg2.connect(url)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS bench_eligibility CASCADE; CREATE SCHEMA bench_eligibility;")
+        columns = "mobile_number text PRIMARY KEY, status text, bdo_name text, updated_at timestamptz"
+        cur.execute(f"CREATE TABLE bench_eligibility.legacy ({columns}, eligibility_results text);")
+        cur.execute(f"CREATE TABLE bench_eligibility.compact ({columns}, eligibility_mask bigint, "
+                    f"eligibility_codes smallint[]);")
+        legacy_rows, compact_rows = [], []
+        for lead in make_leads(n):
+            row = (lead["mobile_number"], rnd.choice(["draft", "active", "active"]), f"BDO {rnd.randrange(50)}",
+                   f"{rnd.uniform(0, 180):.4f} days")
+            mask, codes = logic.eligibility_columns(lead)
+            legacy_rows.append(row + (json.dumps(logic.check_eligibility(lead)),))
+            compact_rows.append(row + (mask, codes))
+        template = "(%s, %s, %s, now() - %s::interval, %s)"
+        psycopg2.extras.execute_values(cur, "INSERT INTO bench_eligibility.legacy VALUES %s", legacy_rows,
+                                       template=template, page_size=5000)
+        psycopg2.extras.execute_values(cur, "INSERT INTO bench_eligibility.compact VALUES %s", compact_rows,
+                                       template="(%s, %s, %s, now() - %s::interval, %s, %s::smallint[])",
+                                       page_size=5000)
+        cur.execute("CREATE INDEX ON bench_eligibility.legacy (status, updated_at DESC);")
+        for statement in schema.LEAD_INDEXES_SQL + schema.lender_index_sql():
+            cur.execute(statement.replace("public.bdo_leads", "bench_eligibility.compact"))
+        cur.execute("VACUUM ANALYZE bench_eligibility.legacy; VACUUM ANALYZE bench_eligibility.compact;")
+
+        for table in ("legacy", "compact"):
+            cur.execute(f"SELECT pg_total_relation_size('bench_eligibility.{table}'), "
+                        f"avg(pg_column_size({table}.*)) FROM bench_eligibility.{table};")
+            total, row_size = cur.fetchone()
+            print(f"  {table}: {total / 1e6:,.1f} MB with indexes, {row_size:,.0f} bytes/row")
+
+        since = datetime.now(timezone.utc) - timedelta(days=7)
+        legacy_sql = ("SELECT mobile_number FROM bench_eligibility.legacy WHERE status = 'active' "
+                      "AND updated_at >= %s AND (eligibility_results::jsonb -> %s ->> 'eligible')::boolean "
+                      "ORDER BY updated_at DESC;")
+        compact_sql, params = schema.eligible_leads_query(lender, status="active", since=since, limit=n)
+        compact_sql = compact_sql.replace("public.bdo_leads", "bench_eligibility.compact")
+        for name, sql, args in (("JSON text", legacy_sql, [since, lender]), ("mask + index", compact_sql, params)):
+            cur.execute(sql, args)
+            found = len(cur.fetchall())
+            seconds = _timeit(lambda: (cur.execute(sql, args), cur.fetchall()))
+            print(f"  eligible for {lender}, active, last 7 days ({name}): {seconds * 1e3:,.1f} ms, {found} leads")
+        cur.execute("DROP SCHEMA bench_eligibility CASCADE;")
+    conn.close()
+
+
+def bench_audit(n=400_000, chunk_size=20_000):
+    """audit.run_audit throughput (rows/s) by worker count, on the captured-lead mix."""
+    import os
+    import tempfile
+    import pandas as pd
+    import audit
+
+    cpus = os.cpu_count() or 1
+    counts = [w for w in (1, 2, 4, 8, 16) if w <= cpus] or [1]
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "leads.csv")
+        pd.DataFrame(make_captured_leads(n)).to_csv(source, index=False)
+        for workers in counts:
+            output = os.path.join(tmp, "audit.csv")
+            progress = {"source": source, "revision": None, "rows": 0, "bytes": 0, "last_mobile": ""}
+            start = time.perf_counter()
+            audit.run_audit(audit.read_csv_chunks(source, chunk_size), output, progress, workers)
+            seconds = time.perf_counter() - start
+            print(f"audit {n:,} rows, {workers} worker(s): {n / seconds:,.0f} rows/s")
+    if cpus == 1:
+        print("  (1 CPU available: no scaling to show)")
+
+
+def _load_generator(port, path, bodies, concurrency, requests):
+    """
+    Sends `requests` POSTs from `concurrency` keep-alive clients; returns
+    (sorted latencies in seconds, wall seconds).
+    """
+    import http.client
+    import threading
+
+    latencies = []
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            body = bodies[i % len(bodies)]
+            start = time.perf_counter()
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            if response.status != 200:
+                raise RuntimeError(f"{path} returned HTTP {response.status}")
+            with lock:
+                latencies.append(elapsed)
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), time.perf_counter() - start
+
+
+def bench_service(requests=2000, concurrency=16, batch_size=100):
+    """service.py on loopback: p50/p99 latency and requests/s for single and batch requests."""
+    import json
+    import subprocess
+
+    proc = subprocess.Popen([sys.executable, "service.py", "--port", "0"], stdout=subprocess.PIPE, text=True)
+    try:
+        line = ""
+        while not line.startswith("Eligibility service on"):  # "... http://127.0.0.1:<port> ..."
+            line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError("service.py exited before listening")
+        port = int(line.split("http://", 1)[1].split()[0].rsplit(":", 1)[1])
+        leads = make_leads(1000)
+        singles = [json.dumps(lead).encode() for lead in leads]
+        batches = [json.dumps({"leads": leads[i:i + batch_size]}).encode() for i in range(0, len(leads), batch_size)]
+        for label, path, bodies, n, clients in (
+            ("single", "/eligibility", singles, requests, concurrency),
+            (f"batch of {batch_size}", "/eligibility/batch", batches, max(1, requests // batch_size), 4),
+        ):
+            latencies, seconds = _load_generator(port, path, bodies, clients, n)
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"service {label} ({clients} clients, {n} requests): p50 {p50 * 1e3:.1f} ms, "
+                  f"p99 {p99 * 1e3:.1f} ms, {n / seconds:,.0f} req/s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+BENCHMARKS = {
+    "check_eligibility": bench_check_eligibility,
+    "results": bench_results,
+    "short_circuit": bench_short_circuit,
+    "bulk": bench_bulk,
+    "capacity": bench_capacity,
+    "pincode_index": bench_pincode_index,
+    "startup": bench_startup,
+    "worker_memory": bench_worker_memory,
+    "db_pool": bench_db_pool,
+    "write_behind": bench_write_behind,
+    "draft_cache": bench_draft_cache,
+    "import": bench_import,
+    "audit": bench_audit,
+    "eligibility_storage": bench_eligibility_storage,
+    "service": bench_service,
+}
+
+
+# --- REGRESSION SUITE ---
+# python bench.py --suite measures a fixed set of metrics (all lower-is-better;
+# the unit is the name's suffix) and compares them with BASELINE_FILE.
+BASELINE_FILE = Path("bench_baseline.json")
+THRESHOLD = 0.25
+# Metrics that depend on process startup, the Streamlit runtime or a real
+# database vary more between runs; they get twice the threshold.
+NOISY_PREFIXES = ("startup.", "ui.", "db.postgres.")
+
+# Peak RSS from /proc (VmHWM): ru_maxrss would include the forking parent's peak
+_SUITE_STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import logic
+policy = time.perf_counter() - start
+start = time.perf_counter()
+import utils
+app = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak_kb = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+print(policy, app, peak_kb)
+"""
+
+BENCH_LEADS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS public.bdo_leads (
+    mobile_number text PRIMARY KEY, vintage_years double precision, firm_name text, bdo_name text,
+    business_segment text, nature_of_business text, constitution_type text, gender text, age integer,
+    co_applicant_details jsonb, monthly_turnover double precision, yearly_turnover double precision,
+    total_obligations double precision, foir double precision, pincode text, ownership_status text,
+    profit_last_year double precision, eligibility_results text, eligibility_mask bigint,
+    eligibility_codes smallint[], is_ntc boolean, requested_loan_type text, lead_json jsonb,
+    draft_step integer, status text, updated_at timestamptz, remarks text
+);
+"""
+
+
+def _run_script(script, env=None):
+    """Runs script in a fresh interpreter; returns the numbers on its last output line."""
+    import subprocess
+    out = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    return [float(value) for value in out.stdout.strip().splitlines()[-1].split()]
+
+
+def _interleaved(cases, rounds):
+    """
+    Best wall time of each case over rounds, running every case once per round:
+    a slow spell of the host then affects one round, not one case's every repeat.
+    """
+    best = {name: float("inf") for name in cases}
+    for _ in range(rounds):
+        for name, fn in cases.items():
+            start = time.perf_counter()
+            fn()
+            best[name] = min(best[name], time.perf_counter() - start)
+    return best
+
+
+def suite_eligibility(quick=False):
+    """Single-lead latency of each entry point and bulk throughput, on form leads."""
+    import pandas as pd
+    import bulk
+    import capacity
+    import logic
+
+    n = 500 if quick else 2000
+    leads = make_form_leads(n, seed=101)
+    fixed = logic.CheckOrder(sample_every=0)
+    per_lead = {
+        "check_eligibility_us": logic.check_eligibility,
+        "evaluate_lead_us": lambda lead: [r.eligible for r in logic.evaluate_lead(lead).values()],
+        "eligibility_flags_us": lambda lead: logic.eligibility_flags(lead, check_order=fixed),
+        "eligibility_columns_us": logic.eligibility_columns,
+        "capacity_us": capacity.lead_capacity,
+    }
+    bulk_n = 20_000 if quick else 200_000
+    leads_df = pd.DataFrame.from_records(make_form_leads(bulk_n, seed=102))
+    cases = {name: (lambda fn=fn: [fn(lead) for lead in leads]) for name, fn in per_lead.items()}
+    cases["bulk_ns"] = lambda: bulk.check_eligibility_bulk(leads_df)
+    cases["capacity_bulk_ns"] = lambda: capacity.capacity_bulk(leads_df)
+    best = _interleaved(cases, 3 if quick else 9)
+    metrics = {f"eligibility.{name}": best[name] / n * 1e6 for name in per_lead}
+    metrics["eligibility.bulk_ns"] = best["bulk_ns"] / bulk_n * 1e9
+    metrics["eligibility.capacity_bulk_ns"] = best["capacity_bulk_ns"] / bulk_n * 1e9
+    return metrics
+
+
+def suite_startup(quick=False):
+    """Fresh-process import of logic (snapshot and CSV rebuild) and of the app modules."""
+    import os
+    import tempfile
+
+    runs = 1 if quick else 3
+    with_snapshot = [_run_script(_SUITE_STARTUP_SCRIPT) for _ in range(runs)]
+    rebuilds = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(runs):
+            env = dict(os.environ, POLICY_SNAPSHOT_FILE=os.path.join(tmp, f"snapshot{run}.npz"))
+            rebuilds.append(_run_script(_SUITE_STARTUP_SCRIPT, env=env))
+    return {
+        "startup.policy_snapshot_ms": min(r[0] for r in with_snapshot) * 1e3,
+        "startup.policy_rebuild_ms": min(r[0] for r in rebuilds) * 1e3,
+        "startup.app_imports_ms": min(r[1] for r in with_snapshot) * 1e3,
+    }
+
+
+def suite_memory(quick=False):
+    """
+    Peak RSS of a fresh process after startup, and the peak of memory allocated
+    while bulk-scoring leads (tracemalloc sees numpy and pandas buffers too).
+    """
+    import tracemalloc
+    import pandas as pd
+    import bulk
+
+    startup_kb = min(_run_script(_SUITE_STARTUP_SCRIPT)[2] for _ in range(1 if quick else 2))
+    n = 50_000 if quick else 200_000
+    leads_df = pd.DataFrame.from_records(make_form_leads(n, seed=103))
+    bulk.check_eligibility_bulk(leads_df.head(100))  # first-call setup is not part of the peak
+    tracemalloc.start()
+    bulk.check_eligibility_bulk(leads_df)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "memory.startup_peak_mb": startup_kb / 1024,
+        f"memory.bulk_{n // 1000}k_peak_mb": peak / 2**20,
+    }
+
+
+def _bench_db_pool():
+    """(backend, pool, cleanup): BENCH_DATABASE_URL's Postgres if set, else the in-memory fake."""
+    import os
+    from db import ConnectionPool
+
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        server = FakeLeadServer()
+        return "fake", ConnectionPool(lambda: FakeConnection(server, 0.0), minconn=1, maxconn=1,
+                                      disconnect_errors=(FakeDBError,)), lambda mobiles: None
+    import psycopg2
+    import psycopg2.extras
+    pool = ConnectionPool(lambda: psycopg2.connect(url, cursor_factory=psycopg2.extras.RealDictCursor),
+                          minconn=1, maxconn=2, disconnect_errors=(psycopg2.OperationalError, psycopg2.InterfaceError))
+
+    def create(conn):
+        with conn.cursor() as cur:
+            cur.execute(BENCH_LEADS_TABLE_SQL)
+        conn.commit()
+
+    def cleanup(mobiles):
+        def delete(conn):
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM public.bdo_leads WHERE mobile_number = ANY(%s);", (list(mobiles),))
+            conn.commit()
+        pool.run(delete)
+
+    pool.run(create)
+    return "postgres", pool, cleanup
+
+
+def suite_db(quick=False):
+    """save_lead_to_db / save_leads_to_db / load_draft_from_db (cache miss and hit) on a fake or local Postgres."""
+    import utils
+
+    backend, pool, cleanup = _bench_db_pool()
+    n = 50 if quick else 200
+    leads = make_form_leads(n, seed=104)
+    original = utils.init_db_pool
+    cache = utils.init_draft_cache()
+    try:
+        utils.init_db_pool = lambda: pool
+
+        def load_cold():
+            cache.clear()
+            for lead in leads:
+                utils.load_draft_from_db(lead["mobile_number"])
+
+        best = _interleaved({
+            "save_lead_us": lambda: [utils.save_lead_to_db(lead) for lead in leads],
+            "save_batch_us": lambda: utils.save_leads_to_db([(lead, "draft") for lead in leads]),
+            "load_draft_miss_us": load_cold,
+            "load_draft_hit_us": lambda: [utils.load_draft_from_db(lead["mobile_number"]) for lead in leads],
+        }, 3 if quick else 7)
+    finally:
+        utils.init_db_pool = original
+        cache.clear()
+        cleanup(lead["mobile_number"] for lead in leads)
+    return {f"db.{backend}.{name}": seconds / n * 1e6 for name, seconds in best.items()}
+
+
+def suite_ui(quick=False):
+    """
+    Streamlit script runs via AppTest: empty form, restoring a full draft,
+    a rerun with the full board, and clicking "Save as Draft" (queued to a
+    temporary outbox drained into the fake database).
+    """
+    import os
+    import tempfile
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    import utils
+
+    repeat = 2 if quick else 5
+    server = FakeLeadServer()
+    from db import ConnectionPool
+    pool = ConnectionPool(lambda: FakeConnection(server, 0.0), minconn=1, maxconn=1, disconnect_errors=(FakeDBError,))
+    lead = make_form_leads(1, seed=105)[0]
+    original_pool, original_outbox = utils.init_db_pool, utils.OUTBOX_FILE
+    timings = {"empty_form": [], "restore": [], "rerun": [], "save_click": []}
+
+    def timed(name, run):
+        start = time.perf_counter()
+        at = run()
+        timings[name].append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"app raised during {name}: {at.exception[0].value}")
+        return at
+
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            utils.init_db_pool = lambda: pool
+            utils.OUTBOX_FILE = Path(os.path.join(tmp, "outbox.sqlite3"))
+            utils.init_lead_outbox.clear()
+            for _ in range(repeat + 1):  # the first round warms up imports and caches
+                at = AppTest.from_file("app.py", default_timeout=120)
+                timed("empty_form", at.run)
+                at.session_state["_lead_to_restore"] = {"lead": dict(lead), "draft_step": 16}
+                timed("restore", at.run)
+                timed("rerun", at.run)
+                save = next(button for button in at.button if button.label == "💾 Save as Draft")
+                timed("save_click", save.click().run)
+            utils.init_lead_outbox().stop(timeout=10)
+        finally:
+            utils.init_db_pool, utils.OUTBOX_FILE = original_pool, original_outbox
+            utils.init_lead_outbox.clear()
+            st.cache_resource.clear()
+    if lead["mobile_number"] not in server.rows:
+        raise RuntimeError("Save as Draft did not reach the database")
+    return {f"ui.{name}_ms": min(values[1:]) * 1e3 for name, values in timings.items()}
+
+
+SUITE = {
+    "eligibility": suite_eligibility,
+    "startup": suite_startup,
+    "memory": suite_memory,
+    "db": suite_db,
+    "ui": suite_ui,
+}
+
+
+def _machine():
+    import os
+    import platform
+    return {"platform": platform.platform(), "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()}
+
+
+def run_suite(groups=None, quick=False):
+    """Runs the suite groups (all by default); returns {metric: value}."""
+    metrics = {}
+    for group in groups or SUITE:
+        start = time.perf_counter()
+        result = SUITE[group](quick)
+        metrics.update(result)
+        print(f"{group}: {len(result)} metrics in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return metrics
+
+
+def compare_to_baseline(metrics, baseline, threshold=THRESHOLD):
+    """
+    Prints current vs baseline per metric; returns the metrics that got slower
+    (or bigger) than the baseline by more than threshold (2x for NOISY_PREFIXES).
+    """
+    regressions = []
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in metrics.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<40} {'-':>12} {value:>12,.2f}      new")
+            continue
+        change = value / old - 1 if old else 0.0
+        limit = threshold * 2 if name.startswith(NOISY_PREFIXES) else threshold
+        flag = ""
+        if change > limit:
+            regressions.append(name)
+            flag = f"  REGRESSION (> {limit:.0%})"
+        print(f"{name:<40} {old:>12,.2f} {value:>12,.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+    import json
+    from datetime import datetime, timezone
+
+    parser = argparse.ArgumentParser(description="Eligibility engine benchmarks.")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to print (default all): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--suite", action="store_true", help="run the regression suite and compare with the baseline")
+    parser.add_argument("--group", action="append", choices=list(SUITE), help="with --suite: only these groups")
+    parser.add_argument("--quick", action="store_true", help="with --suite: smaller inputs and fewer repeats")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="with --suite: store the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, e.g. 0.25 for 25%%")
+    args = parser.parse_args(argv)
+
+    if not args.suite:
+        unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+        for name in args.benchmarks or BENCHMARKS:
+            BENCHMARKS[name]()
+        return 0
+
+    import logic
+    mode = "quick" if args.quick else "full"  # inputs differ in size, so each mode has its own baseline
+    metrics = run_suite(args.group, args.quick)
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.save_baseline:
+        section = stored.get(mode, {}) if args.group else {}
+        section.update(created=datetime.now(timezone.utc).isoformat(timespec="seconds"), machine=_machine(),
+                       policy_revision=logic.POLICY.revision)
+        section.setdefault("metrics", {}).update({name: round(value, 3) for name, value in metrics.items()})
+        stored[mode] = section
+        args.baseline.write_text(json.dumps(stored, indent=2) + "\n")
+        print(f"Saved {len(metrics)} metrics to {args.baseline} ({mode})")
+        return 0
+    if mode not in stored:
+        print(f"No {mode} baseline in {args.baseline}; run with --save-baseline first.")
+        return 2
+    baseline = stored[mode]
+    if baseline.get("machine") != _machine():
+        print(f"Note: baseline was recorded on {baseline.get('machine')}; timings may not be comparable.")
+    regressions = compare_to_baseline(metrics, baseline["metrics"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
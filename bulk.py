@@ -0,0 +1,243 @@
+# bulk.py
+"""
+Vectorized eligibility scoring over a table of leads.
+
+check_eligibility_bulk applies the compiled policy table from logic to a
+DataFrame shaped like public.bdo_leads or data/leads.xlsx, one column
+operation per lender and check, and returns a lead x lender matrix.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import logic
+from industry import normalize_industry
+from pincodes import ServiceablePincodes
+
+# Lead fields read by the policy checks
+LEAD_FIELDS = (
+    "vintage_years", "constitution_type", "yearly_turnover", "foir", "pincode",
+    "business_segment", "ownership_status", "is_ntc", "requested_loan_type",
+)
+
+# Pincode parse status per unique value
+_PIN_OK, _PIN_MISSING, _PIN_INVALID = 0, 1, 2
+
+
+def _with_lead_json_fields(leads_df):
+    """
+    Fills lead fields that are not columns of leads_df (e.g. data/leads.xlsx has no
+    ownership_status column) from the lead_json snapshot, when one is present.
+    """
+    missing = [field for field in LEAD_FIELDS if field not in leads_df.columns]
+    if not missing or "lead_json" not in leads_df.columns:
+        return leads_df
+
+    def _parse(raw):
+        if isinstance(raw, dict):
+            return raw
+        try:
+            return json.loads(raw)
+        except Exception:
+            return {}
+
+    snapshots = pd.DataFrame.from_records(
+        [_parse(raw) for raw in leads_df["lead_json"]], index=leads_df.index
+    )
+    leads_df = leads_df.copy()
+    for field in missing:
+        if field in snapshots.columns:
+            leads_df[field] = snapshots[field]
+    return leads_df
+
+
+def _column(leads_df, field):
+    """Returns the field as a Series; a missing column is all-null."""
+    if field not in leads_df.columns:
+        return pd.Series(np.nan, index=leads_df.index, dtype=object)
+    return leads_df[field]
+
+
+class _Categorical:
+    """
+    A text field factorized once, so per-lender membership tests run over the
+    distinct values only and are broadcast back to rows with one take.
+    """
+
+    def __init__(self, leads_df, field):
+        self.codes, uniques = pd.factorize(_column(leads_df, field))
+        self.uniques = list(uniques)
+        self.present = self.codes >= 0
+        self.truthy = self.broadcast([bool(value) for value in self.uniques])
+
+    def broadcast(self, per_unique):
+        # Last slot stands for null cells (code -1)
+        return np.array(list(per_unique) + [False], dtype=bool)[self.codes]
+
+    def isin(self, allowed):
+        return self.broadcast([value in allowed for value in self.uniques])
+
+    def eq(self, other):
+        return self.broadcast([value == other for value in self.uniques])
+
+
+def _float_column(leads_df, field):
+    """Parses a numeric field like logic._parse_float; unparseable values become NaN."""
+    if field not in leads_df.columns:
+        return np.full(len(leads_df), np.nan)
+    column = leads_df[field]
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        values = column.to_numpy(dtype=float, na_value=np.nan)
+        return np.where(np.isfinite(values), values, np.nan)  # like _parse_float: inf is not a number
+    # Object columns: parse each distinct value once, then broadcast
+    codes, uniques = pd.factorize(column)
+    parsed = np.array([_parse_float_or_nan(value) for value in uniques], dtype=float)
+    return np.where(codes >= 0, parsed[codes] if len(parsed) else np.nan, np.nan)
+
+
+def _parse_float_or_nan(value):
+    parsed = logic._parse_float(value)
+    return np.nan if parsed is None else parsed
+
+
+def _ntc_column(leads_df):
+    """Rows where is_ntc is True (not merely truthy, like the scalar 'is True' test)."""
+    column = _column(leads_df, "is_ntc")
+    if pd.api.types.is_bool_dtype(column):
+        return column.to_numpy(dtype=bool, na_value=False)
+    return (column.eq(True) & column.astype(str).eq("True")).to_numpy()
+
+
+def _flag(codes, mask, reason):
+    """ORs reason into codes where mask is set, in place."""
+    np.bitwise_or(codes, reason, out=codes, where=mask)
+
+
+def _parse_pincodes(leads_df):
+    """Returns (status, pincode_int) arrays with the scalar missing/invalid semantics."""
+    column = _column(leads_df, "pincode")
+    codes, uniques = pd.factorize(column)
+    status = np.full(len(uniques) + 1, _PIN_MISSING, dtype=np.int8)  # last slot: null
+    values = np.full(len(uniques) + 1, -1, dtype=np.int64)
+    for i, raw in enumerate(uniques):
+        if not raw:
+            continue
+        try:
+            values[i] = int(raw)
+            status[i] = _PIN_OK
+        except (TypeError, ValueError, OverflowError):
+            status[i] = _PIN_INVALID
+    return status[codes], values[codes]
+
+
+def _serviceable(pincodes, pincode, index_masks):
+    """
+    Vectorized membership of pincode (int array) in a lender's allowed pincodes.
+    index_masks caches the lender bitmasks per PincodeIndex, so the shared index
+    is gathered once per call and each lender only tests its own bit.
+    """
+    if isinstance(pincodes, ServiceablePincodes):
+        index = pincodes.index
+        if id(index) not in index_masks:
+            index_masks[id(index)] = index.masks_for(pincode)
+        return (index_masks[id(index)] & pincodes.bit) != 0
+    allowed = np.fromiter(pincodes, dtype=np.int64, count=len(pincodes))
+    return np.isin(pincode, allowed)
+
+
+def _negative_hits(leads_df, rules):
+    """
+    Returns {id(matcher): bool array} for each distinct negative-industry matcher,
+    matching each distinct business segment once (exactly or fuzzily, as
+    logic.check_eligibility does).
+    """
+    segment = _Categorical(leads_df, "business_segment")
+    normalized = [normalize_industry(value) if value else None for value in segment.uniques]
+    hits = {}
+    for rule in rules:
+        terms = rule.negative_terms
+        if terms is None or id(terms) in hits:
+            continue
+        index = rule.industry_index  # compiled with rules, like the scalar check
+        hits[id(terms)] = segment.broadcast(
+            value is not None and index.negative_hit(terms, value) is not None for value in normalized
+        )
+    return hits
+
+
+def check_eligibility_bulk(leads_df, rules=None):
+    """
+    Scores every lead in leads_df against every lender.
+    Null cells are treated as fields not captured yet, i.e. like keys absent
+    from the lead_data dict passed to logic.check_eligibility.
+    Returns (eligible, reason_codes): two DataFrames indexed like leads_df with
+    one column per lender; reason_codes holds OR-ed logic.REASON_* bits and a
+    lead is eligible for a lender exactly when its code is 0.
+    """
+    rules = logic.COMPILED_RULES if rules is None else rules
+    leads_df = _with_lead_json_fields(leads_df)
+    n = len(leads_df)
+
+    # Parse each field once for all lenders
+    vintage = _float_column(leads_df, "vintage_years")
+    override_vintage = np.where(np.isnan(vintage), 0.0, vintage)
+    turnover = _float_column(leads_df, "yearly_turnover")
+    foir = _float_column(leads_df, "foir")
+    constitution = _Categorical(leads_df, "constitution_type")
+    ownership = _Categorical(leads_df, "ownership_status")
+    loan_type = _Categorical(leads_df, "requested_loan_type")
+    is_ntc = _ntc_column(leads_df)
+    pin_status, pincode = _parse_pincodes(leads_df)
+    pin_missing, pin_invalid, pin_ok = (pin_status == _PIN_MISSING), (pin_status == _PIN_INVALID), (pin_status == _PIN_OK)
+    negative_hits = _negative_hits(leads_df, rules)
+    pincode_masks = {}
+    index_masks = {}
+
+    reason_codes = {}
+    with np.errstate(invalid="ignore"):
+        for rule in rules:
+            codes = np.zeros(n, dtype=np.uint16)
+
+            # 1. Vintage Check
+            _flag(codes, vintage < rule.min_vintage, logic.REASON_VINTAGE)
+
+            # 2. Constitution Check
+            _flag(codes, constitution.present & ~constitution.isin(rule.constitutions), logic.REASON_CONSTITUTION)
+
+            # 3. Turnover Check
+            _flag(codes, turnover < rule.min_turnover, logic.REASON_TURNOVER)
+
+            # 4. FOIR Check
+            _flag(codes, foir > rule.max_foir, logic.REASON_FOIR)
+
+            # 5. Pincode Check
+            if rule.pincodes is not None:
+                key = id(rule.pincodes)
+                if key not in pincode_masks:
+                    pincode_masks[key] = _serviceable(rule.pincodes, pincode, index_masks)
+                _flag(codes, pin_missing, logic.REASON_PINCODE_MISSING)
+                _flag(codes, pin_invalid, logic.REASON_PINCODE_INVALID)
+                _flag(codes, pin_ok & ~pincode_masks[key], logic.REASON_PINCODE_UNSERVICEABLE)
+
+            # 6. Negative industry check
+            if rule.negative_terms is not None:
+                _flag(codes, negative_hits[id(rule.negative_terms)], logic.REASON_NEGATIVE_INDUSTRY)
+
+            # 7. Ownership Status Check (with declared overrides)
+            ownership_ok = ownership.isin(rule.ownership)
+            for status, min_vintage in rule.ownership_overrides.items():
+                ownership_ok |= ownership.eq(status) & (override_vintage >= min_vintage)
+            _flag(codes, ownership.truthy & ~ownership_ok, logic.REASON_OWNERSHIP)
+
+            # 8. NTC check
+            if not rule.ntc_allowed:
+                _flag(codes, is_ntc, logic.REASON_NTC)
+
+            # 9. Requested Loan Type Check
+            _flag(codes, loan_type.truthy & ~loan_type.isin(rule.loan_types), logic.REASON_LOAN_TYPE)
+
+            reason_codes[rule.lender] = codes
+
+    reason_codes = pd.DataFrame(reason_codes, index=leads_df.index)
+    return reason_codes.eq(0), reason_codes
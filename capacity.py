@@ -0,0 +1,120 @@
+# capacity.py
+"""
+Loan capacity per lender: the largest EMI a lead can take on within each
+lender's max_foir, and the loan amount that EMI repays across a grid of
+interest rates and tenures.
+
+    max EMI   = max_foir x monthly turnover - existing monthly obligations (>= 0)
+    max loan  = max EMI x annuity factor(rate, tenure)
+    annuity factor = (1 - (1 + r) ** -n) / r  with r = annual rate / 12, n = months
+
+The annuity factors of a grid are one (rates x tenures) array, computed once
+per grid. Capacity for a lead is then a single broadcast of the lenders' max
+EMIs against it (lead_capacity, cheap enough for every rerun), and
+capacity_bulk does the same over a whole table of leads.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import logic
+from bulk import _float_column
+
+# Default grid: annual interest rates (fractions) x tenures (months)
+INTEREST_RATES = (0.14, 0.16, 0.18, 0.20, 0.22, 0.24)
+TENURES_MONTHS = (12, 24, 36, 48, 60)
+
+# lenders: names in rule order; max_emi: (..., lenders); max_loan: (..., lenders, rates, tenures)
+Capacity = namedtuple("Capacity", ["lenders", "rates", "tenures", "max_emi", "max_loan"])
+
+
+@lru_cache(maxsize=16)
+def _annuity_factors(rates, tenures):
+    monthly = np.asarray(rates, dtype=float)[:, None] / 12
+    months = np.asarray(tenures, dtype=float)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = np.where(monthly > 0, (1 - (1 + monthly) ** -months) / monthly, months)
+    factors.setflags(write=False)
+    return factors
+
+
+def annuity_factors(rates=INTEREST_RATES, tenures=TENURES_MONTHS):
+    """(rates x tenures) array: the loan amount an EMI of 1 repays at each grid point."""
+    return _annuity_factors(tuple(rates), tuple(tenures))
+
+
+def emi(principal, rate, tenure):
+    """Monthly instalment repaying principal at annual rate over tenure months."""
+    return principal / annuity_factors((rate,), (tenure,))[0, 0]
+
+
+def _capacity(monthly_turnover, obligations, eligible, rules, rates, tenures):
+    """monthly_turnover / obligations: (n,) floats (NaN when unknown); eligible: (n, lenders) bools or None."""
+    max_foir = np.array([rule.max_foir for rule in rules])
+    with np.errstate(invalid="ignore"):
+        max_emi = np.clip(max_foir[None, :] * monthly_turnover[:, None] - obligations[:, None], 0, None)
+    max_emi = np.where(np.isnan(max_emi), 0.0, max_emi)
+    if eligible is not None:
+        max_emi = np.where(eligible, max_emi, 0.0)
+    max_loan = max_emi[:, :, None, None] * annuity_factors(rates, tenures)
+    return Capacity(tuple(rule.lender for rule in rules), tuple(rates), tuple(tenures), max_emi, max_loan)
+
+
+def lead_capacity(lead_data, eligible=None, rules=None, rates=INTEREST_RATES, tenures=TENURES_MONTHS):
+    """
+    Capacity of one lead (the lead_data dict from the capture form), or None
+    while its monthly turnover is unknown. eligible optionally names the
+    lenders to size (e.g. those logic.check_eligibility accepts); the others
+    get 0. max_emi has shape (lenders,), max_loan (lenders, rates, tenures).
+    """
+    rules = logic.COMPILED_RULES if rules is None else rules
+    monthly_turnover = logic._parse_float(lead_data.get('monthly_turnover'))
+    if monthly_turnover is None:
+        yearly_turnover = logic._parse_float(lead_data.get('yearly_turnover'))
+        monthly_turnover = yearly_turnover / 12 if yearly_turnover is not None else None
+    if not monthly_turnover:
+        return None
+    obligations = logic._parse_float(lead_data.get('total_obligations'))
+    if obligations is None:
+        foir = logic._parse_float(lead_data.get('foir'))
+        obligations = foir * monthly_turnover if foir is not None else 0.0
+    mask = None
+    if eligible is not None:
+        eligible = set(eligible)
+        mask = np.array([[rule.lender in eligible for rule in rules]])
+    capacity = _capacity(np.array([monthly_turnover]), np.array([obligations]), mask, rules, rates, tenures)
+    return capacity._replace(max_emi=capacity.max_emi[0], max_loan=capacity.max_loan[0])
+
+
+def capacity_bulk(leads_df, eligible=None, rules=None, rates=INTEREST_RATES, tenures=TENURES_MONTHS):
+    """
+    Capacity of every lead in leads_df (columns as in public.bdo_leads).
+    eligible is optionally the lead x lender DataFrame from
+    bulk.check_eligibility_bulk; ineligible pairs get 0. Leads without a
+    turnover get 0 everywhere. max_emi has shape (leads, lenders), max_loan
+    (leads, lenders, rates, tenures): 8 bytes per cell, so pass a smaller
+    grid for very large tables.
+    """
+    rules = logic.COMPILED_RULES if rules is None else rules
+    monthly_turnover = _float_column(leads_df, "monthly_turnover")
+    monthly_turnover = np.where(np.isnan(monthly_turnover), _float_column(leads_df, "yearly_turnover") / 12,
+                                monthly_turnover)
+    obligations = _float_column(leads_df, "total_obligations")
+    foir_obligations = np.nan_to_num(_float_column(leads_df, "foir") * monthly_turnover)
+    obligations = np.where(np.isnan(obligations), foir_obligations, obligations)
+    mask = None
+    if eligible is not None:
+        mask = eligible.reindex(columns=[rule.lender for rule in rules], fill_value=False).to_numpy(dtype=bool)
+    return _capacity(monthly_turnover, obligations, mask, rules, rates, tenures)
+
+
+def capacity_frame(capacity, lender):
+    """One lender's max-loan grid from a single-lead Capacity: rates as rows, tenures as columns."""
+    i = capacity.lenders.index(lender)
+    return pd.DataFrame(
+        capacity.max_loan[i],
+        index=pd.Index([f"{rate:.0%}" for rate in capacity.rates], name="Rate p.a."),
+        columns=pd.Index([f"{months} mo" for months in capacity.tenures], name="Tenure"),
+    )
@@ -0,0 +1,149 @@
+# db.py
+"""
+Thread-safe database connection pool with health checks and reconnects.
+
+The pool works with any DB-API 2.0 driver: it is given a connect() factory
+(psycopg2 in the app, a fake connection in benchmarks) and the exception
+types that can signal a dropped connection.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Keeps between minconn and maxconn open connections.
+
+    - Checkout blocks up to checkout_timeout seconds when all connections are busy.
+    - A connection idle for longer than health_check_interval seconds is pinged
+      with SELECT 1 on checkout and replaced if the ping fails.
+    - run() retries an operation once on a fresh connection when the one it used
+      turns out to be dead (e.g. the socket dropped), so callers never see a
+      stale connection after a network blip. Server-side errors on a live
+      connection (statement timeouts, deadlocks) are raised, not retried.
+    """
+
+    def __init__(self, connect, minconn=1, maxconn=10, checkout_timeout=10.0,
+                 health_check_interval=30.0, disconnect_errors=(Exception,)):
+        if not 0 <= minconn <= maxconn or maxconn < 1:
+            raise ValueError(f"Invalid pool size: minconn={minconn}, maxconn={maxconn}")
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.disconnect_errors = tuple(disconnect_errors)
+        self._idle = queue.LifoQueue()  # (connection, last_used) pairs; LIFO keeps hot ones warm
+        self._slots = threading.BoundedSemaphore(maxconn)
+        for _ in range(minconn):
+            self._idle.put((self._connect(), time.monotonic()))
+
+    @staticmethod
+    def _is_closed(conn):
+        return bool(getattr(conn, "closed", False))
+
+    def _ping(self, conn):
+        try:
+            # A failed statement (e.g. a statement timeout) leaves the transaction
+            # aborted; roll it back first so only a dead connection fails the ping
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+                cur.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _is_dead(self, conn):
+        """After an error from conn: True when the connection is gone, not just the statement."""
+        return self._is_closed(conn) or not self._ping(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self):
+        """Borrows a healthy connection; pair with putconn()."""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolTimeout(f"No database connection available after {self.checkout_timeout}s")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                stale = time.monotonic() - last_used >= self.health_check_interval
+                if not self._is_closed(conn) and (not stale or self._ping(conn)):
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, discard=False):
+        """Returns a borrowed connection; broken ones are closed instead of pooled."""
+        try:
+            if discard or self._is_closed(conn):
+                self._discard(conn)
+            else:
+                try:
+                    conn.rollback()  # never hand out a connection mid-transaction
+                    self._idle.put((conn, time.monotonic()))
+                except Exception:
+                    self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager around getconn()/putconn()."""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except self.disconnect_errors:
+            broken = self._is_dead(conn)
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    def run(self, operation, retries=1):
+        """
+        Calls operation(conn) with a pooled connection and returns its result.
+        Retries on a new connection if the error came from a dead connection;
+        operations must be safe to repeat (idempotent upserts, reads).
+        """
+        attempt = 0
+        while True:
+            conn = self.getconn()
+            try:
+                result = operation(conn)
+            except self.disconnect_errors:
+                dead = self._is_dead(conn)
+                self.putconn(conn, discard=dead)
+                if not dead or attempt >= retries:
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                self.putconn(conn)
+                raise
+            self.putconn(conn)
+            return result
+
+    def closeall(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
@@ -0,0 +1,118 @@
+# draft_cache.py
+"""
+In-process read-through cache of loaded drafts, keyed by mobile number.
+
+Bounded two ways: at most maxsize entries (least recently used are evicted)
+and each entry expires ttl seconds after it was stored, which bounds how long
+a save made by another process (importer, another server) can go unseen.
+Saves made through this process write through with put(), so they are never
+shadowed by an older cached copy.
+
+A load that raced with a save must not cache what it read: take a token with
+begin_load() before querying and pass it to put(); put() drops the value if
+the entry was written or invalidated in the meantime.
+
+Entries are tagged with the policy revision they were scored under and count
+as misses once it changes. Values are stored pickled, so every get() returns
+a fresh copy the caller may edit (unpickling is several times cheaper than
+copy.deepcopy for a draft).
+"""
+import itertools
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class DraftCache:
+    def __init__(self, maxsize=512, ttl=300.0, clock=time.monotonic):
+        if maxsize < 1:
+            raise ValueError(f"Invalid cache size: {maxsize}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, revision, pickled value); most recently used last
+        self._writes = {}  # key -> sequence number of its last write, for begin_load() tokens
+        self._sequence = itertools.count(1)
+        self._forgotten = 0  # _writes default after pruning: no token taken earlier matches it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, revision=None):
+        """A copy of the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_revision, value = entry
+                if expires_at > self._clock() and entry_revision == revision:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return pickle.loads(value)
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def begin_load(self, key):
+        """Token for put(): identifies the last write to key seen before the load started."""
+        with self._lock:
+            return self._writes.get(key, self._forgotten)
+
+    def put(self, key, value, revision=None, token=None):
+        """
+        Stores a copy of value. With a begin_load() token, does nothing if key
+        was written or invalidated since. Returns whether the value was stored.
+        """
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            writes = self._writes.get(key, self._forgotten)
+            if token is not None and token != writes:
+                return False
+            if token is None:
+                self._bump(key)
+            self._entries[key] = (self._clock() + self.ttl, revision, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._bump(key)
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._bump(key)
+            self._entries.clear()
+
+    def _bump(self, key):
+        self._writes[key] = next(self._sequence)
+        if len(self._writes) > 4 * self.maxsize:
+            # Forget keys that are not cached; a load in flight for one of them
+            # then holds a token below _forgotten and skips its put.
+            for stale in [k for k in self._writes if k not in self._entries and k != key]:
+                del self._writes[stale]
+            self._forgotten = next(self._sequence)
+
+    def stats(self):
+        """Counters for monitoring: hits, misses, hit_rate, size, evictions, expirations."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self):
+        return len(self._entries)
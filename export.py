@@ -0,0 +1,300 @@
+# export.py
+"""
+Streaming export of public.bdo_leads to CSV, XLSX or Parquet.
+
+Rows are read through a named (server-side) cursor, chunk_size at a time,
+filtered by status, BDO and updated_at range, and written chunk by chunk:
+CSV as text, XLSX through an openpyxl write-only workbook, Parquet as one row
+group per chunk. Nothing holds more than one chunk of leads, so peak memory
+depends on chunk_size, not on the size of the table.
+
+Used by the sidebar export in ui_capture (download built on click) and from
+the command line (format from the file extension):
+    python export.py leads.xlsx [--status active] [--bdo NAME] [--since 2026-10-01] [--until 2026-11-01]
+"""
+import argparse
+import json
+import math
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+import logic
+
+CHUNK_SIZE = 5000
+LEADS_SHEET = "leads"  # same sheet name as utils.to_excel / data/leads.xlsx
+FORMATS = ("csv", "xlsx", "parquet")
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Exported columns of public.bdo_leads, in file order (lead_json and the
+# reason codes are left out; eligible_lenders is derived from eligibility_mask)
+EXPORT_COLUMNS = (
+    "mobile_number", "firm_name", "bdo_name", "status", "updated_at", "draft_step",
+    "vintage_years", "business_segment", "nature_of_business", "constitution_type", "gender", "age",
+    "co_applicant_details", "monthly_turnover", "yearly_turnover", "total_obligations", "foir",
+    "pincode", "ownership_status", "profit_last_year", "is_ntc", "requested_loan_type", "remarks",
+    "eligibility_mask",
+)
+_NUMBER_COLUMNS = {"draft_step", "vintage_years", "age", "monthly_turnover", "yearly_turnover",
+                   "total_obligations", "foir", "profit_last_year"}
+
+
+# --- READING ---
+def lead_filters(status=None, bdo_name=None, since=None, until=None):
+    """WHERE conditions and parameters for the export filters (updated_at in [since, until))."""
+    clauses, params = [], []
+    for clause, value in (("status = %s", status), ("bdo_name = %s", bdo_name),
+                          ("updated_at >= %s", since), ("updated_at < %s", until)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    return clauses, params
+
+
+def iter_lead_chunks(pool, columns=EXPORT_COLUMNS, chunk_size=CHUNK_SIZE, after_mobile=None, **filters):
+    """
+    Yields DataFrames of at most chunk_size leads in mobile_number order,
+    read through a server-side cursor (only one chunk is held client-side).
+    after_mobile skips leads up to and including that mobile number (resume).
+    """
+    clauses, params = lead_filters(**filters)
+    if after_mobile is not None:
+        clauses.append("mobile_number > %s")
+        params.append(after_mobile)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = f"SELECT {', '.join(columns)} FROM public.bdo_leads{where} ORDER BY mobile_number;"
+    with pool.connection() as conn:
+        try:
+            with conn.cursor(name="export_leads") as cur:
+                cur.itersize = chunk_size
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield pd.DataFrame.from_records([dict(row) for row in rows], columns=list(columns))
+        finally:
+            conn.rollback()  # ends the read transaction the named cursor lived in
+
+
+def _prepare_chunk(df):
+    """Export shape of a chunk: eligible lender names, JSON as text, naive timestamps."""
+    df = df.copy()
+    if "eligibility_mask" in df.columns:
+        df["eligibility_mask"] = pd.to_numeric(df["eligibility_mask"]).astype("Int64")  # NULL for unscored leads
+        names = {}
+
+        def eligible_names(mask):
+            if mask is pd.NA:
+                return None
+            mask = int(mask)
+            if mask not in names:
+                names[mask] = "; ".join(rule.lender for rule in logic.COMPILED_RULES if mask >> rule.eligibility_bit & 1)
+            return names[mask]
+
+        df["eligible_lenders"] = [eligible_names(mask) for mask in df["eligibility_mask"]]
+    if "co_applicant_details" in df.columns:
+        df["co_applicant_details"] = [
+            json.dumps(value, default=str) if isinstance(value, (dict, list)) else value
+            for value in df["co_applicant_details"]
+        ]
+    if "updated_at" in df.columns:
+        updated_at = pd.to_datetime(df["updated_at"], errors="coerce", utc=True)
+        df["updated_at"] = updated_at.dt.tz_localize(None)  # UTC; Excel has no time zones
+    if "is_ntc" in df.columns:
+        df["is_ntc"] = df["is_ntc"].astype("boolean")
+    for column in _NUMBER_COLUMNS & set(df.columns):
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+# --- WRITERS ---
+# Each takes a binary file-like sink; write(df) appends a chunk, close() finishes the file.
+class CsvExportWriter:
+    def __init__(self, sink):
+        self.sink = sink
+        self.header = True
+
+    def write(self, df):
+        self.sink.write(df.to_csv(index=False, header=self.header).encode("utf-8"))
+        self.header = False
+
+    def close(self):
+        if self.header:  # no rows: still write the header
+            self.sink.write(",".join(EXPORT_COLUMNS + ("eligible_lenders",)).encode("utf-8") + b"\n")
+
+
+class XlsxExportWriter:
+    """openpyxl write-only workbook: rows are streamed to a temporary file, not kept as cells."""
+
+    def __init__(self, sink):
+        from openpyxl import Workbook
+        self.sink = sink
+        self.book = Workbook(write_only=True)
+        self.sheet = self.book.create_sheet(LEADS_SHEET)
+        self.header = None
+
+    @staticmethod
+    def _cell(value):
+        if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and math.isnan(value)):
+            return None
+        if isinstance(value, pd.Timestamp):
+            return value.to_pydatetime()
+        if hasattr(value, "item"):  # numpy scalars
+            return value.item()
+        return value
+
+    def write(self, df):
+        if self.header is None:
+            self.header = list(df.columns)
+            self.sheet.append(self.header)
+        for row in df[self.header].itertuples(index=False, name=None):
+            self.sheet.append([self._cell(value) for value in row])
+
+    def close(self):
+        if self.header is None:
+            self.sheet.append(list(EXPORT_COLUMNS) + ["eligible_lenders"])
+        self.book.save(self.sink)
+
+
+class ParquetExportWriter:
+    """One row group per chunk, with a fixed schema so chunks with all-null columns still match."""
+
+    def __init__(self, sink):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+        self.pa, self.pq = pa, pq
+        self.sink = sink
+        self.writer = None
+
+    def _schema(self, df):
+        pa = self.pa
+        fields = []
+        for column in df.columns:
+            if column in _NUMBER_COLUMNS:
+                fields.append(pa.field(column, pa.float64()))
+            elif column == "eligibility_mask":
+                fields.append(pa.field(column, pa.int64()))
+            elif column == "is_ntc":
+                fields.append(pa.field(column, pa.bool_()))
+            elif column == "updated_at":
+                fields.append(pa.field(column, pa.timestamp("us")))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        return pa.schema(fields)
+
+    def write(self, df):
+        if self.writer is None:
+            self.schema = self._schema(df)
+            self.writer = self.pq.ParquetWriter(self.sink, self.schema)
+        for field in self.schema:
+            if self.pa.types.is_string(field.type):
+                df[field.name] = [None if value is None or (isinstance(value, float) and math.isnan(value))
+                                  else str(value) for value in df[field.name]]
+        self.writer.write_table(self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.writer is None:
+            empty = pd.DataFrame(columns=list(EXPORT_COLUMNS) + ["eligible_lenders"])
+            self.writer = self.pq.ParquetWriter(self.sink, self._schema(empty))
+        self.writer.close()
+
+
+WRITERS = {"csv": CsvExportWriter, "xlsx": XlsxExportWriter, "parquet": ParquetExportWriter}
+
+
+# --- EXPORT ---
+def export_leads(pool, sink, fmt, chunk_size=CHUNK_SIZE, progress=None, **filters):
+    """
+    Writes the filtered leads to sink (binary file-like) in fmt ("csv", "xlsx",
+    "parquet"). Returns the number of rows written.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    writer = WRITERS[fmt](sink)
+    rows = 0
+    for chunk in iter_lead_chunks(pool, chunk_size=chunk_size, **filters):
+        writer.write(_prepare_chunk(chunk))
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+    writer.close()
+    return rows
+
+
+def export_to_tempfile(pool, fmt, chunk_size=CHUNK_SIZE, **filters):
+    """Exports into an anonymous temporary file on disk and returns it rewound (for st.download_button)."""
+    sink = tempfile.TemporaryFile()
+    export_leads(pool, sink, fmt, chunk_size, **filters)
+    sink.seek(0)
+    return sink
+
+
+def iter_export_bytes(pool, fmt, chunk_size=CHUNK_SIZE, block_size=1 << 20, **filters):
+    """
+    Yields the export as byte blocks. CSV is produced chunk by chunk as it is
+    read; XLSX and Parquet end with an index, so they are spooled to a
+    temporary file first and then read back in block_size pieces.
+    """
+    if fmt == "csv":
+        header = True
+        for chunk in iter_lead_chunks(pool, chunk_size=chunk_size, **filters):
+            yield _prepare_chunk(chunk).to_csv(index=False, header=header).encode("utf-8")
+            header = False
+        if header:
+            yield ",".join(EXPORT_COLUMNS + ("eligible_lenders",)).encode("utf-8") + b"\n"
+        return
+    with export_to_tempfile(pool, fmt, chunk_size, **filters) as spooled:
+        while True:
+            block = spooled.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def _parse_date(text):
+    return datetime.combine(date.fromisoformat(text), datetime.min.time())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export public.bdo_leads to CSV, XLSX or Parquet.")
+    parser.add_argument("output", help="file to write; .csv, .xlsx or .parquet")
+    parser.add_argument("--status")
+    parser.add_argument("--bdo", dest="bdo_name")
+    parser.add_argument("--since", type=_parse_date, help="updated on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=_parse_date, help="updated before this date (YYYY-MM-DD)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    fmt = Path(args.output).suffix.lower().lstrip(".")
+    if fmt not in FORMATS:
+        parser.error(f"unsupported file type .{fmt}; use one of {', '.join('.' + f for f in FORMATS)}")
+
+    import utils
+    start = time.perf_counter()
+    tmp_path = Path(f"{args.output}.partial")
+    with open(tmp_path, "wb") as sink:
+        rows = export_leads(
+            utils.init_db_pool(), sink, fmt, args.chunk_size,
+            progress=lambda rows: print(f"  {rows:,} leads exported", end="\r", flush=True),
+            status=args.status, bdo_name=args.bdo_name, since=args.since, until=args.until,
+        )
+    shutil.move(tmp_path, args.output)
+    print()
+    print(f"Exported {rows:,} leads to {args.output} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
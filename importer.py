@@ -0,0 +1,229 @@
+# importer.py
+"""
+Bulk import of leads from CSV/XLSX into public.bdo_leads.
+
+Accepts files in the data/leads.xlsx layout (mobile_number, the lead columns
+and/or a lead_json snapshot). Each row is normalized like the capture form
+would store it and upserted (which scores it, see utils._lead_params) in chunks:
+one multi-row INSERT ... ON CONFLICT per chunk, one transaction per chunk.
+Rows that fail validation or are rejected by the database are written to a
+per-row error report instead of aborting the import.
+
+Usage (from the repo root):
+    python importer.py leads.xlsx [--chunk-size 1000] [--status active] [--errors import_errors.csv]
+
+Each row keeps the status in its file's status column; rows without one are
+stored as DEFAULT_STATUS. --status overrides the status of every row.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import utils
+
+CHUNK_SIZE = 1000
+DEFAULT_STATUS = "active"  # for rows with no status of their own
+
+# Columns that are bookkeeping, not lead fields
+_META_COLUMNS = {"lead_json", "status", "updated_at", "eligibility_results", "draft_step"}
+_FLOAT_FIELDS = ("vintage_years", "monthly_turnover", "yearly_turnover", "total_obligations", "foir", "profit_last_year")
+
+
+def read_leads_file(path):
+    """Reads a CSV or XLSX leads file with every cell as text (keeps leading zeros)."""
+    path = Path(path)
+    if path.suffix.lower() in (".xlsx", ".xls"):
+        with pd.ExcelFile(path) as book:
+            sheet = utils.LEADS_SHEET if utils.LEADS_SHEET in book.sheet_names else 0
+            df = book.parse(sheet, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or (isinstance(value, str) and not value.strip())
+
+
+def _clean_digits(value):
+    # Spreadsheets often turn numbers into floats ("9876543210.0")
+    text = str(value).strip()
+    return text[:-2] if text.endswith(".0") else text
+
+
+def normalize_lead(row):
+    """
+    Builds a lead dict (same shape as the capture form's lead_data) from one
+    file row: lead_json first, then any non-blank column on top of it.
+    Raises ValueError with a readable message for invalid rows.
+    """
+    lead = {}
+    raw_json = row.get("lead_json")
+    if not _is_blank(raw_json):
+        try:
+            lead = json.loads(raw_json) if isinstance(raw_json, str) else dict(raw_json)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"lead_json is not valid JSON: {e}")
+        if not isinstance(lead, dict):
+            raise ValueError("lead_json is not a JSON object")
+
+    for column, value in row.items():
+        if column not in _META_COLUMNS and not _is_blank(value):
+            lead[column] = value.strip() if isinstance(value, str) else value
+
+    mobile = _clean_digits(lead.get("mobile_number", ""))
+    if not (mobile.isdigit() and len(mobile) == 10):
+        raise ValueError(f"invalid mobile_number {lead.get('mobile_number')!r}")
+    lead["mobile_number"] = mobile
+
+    if not _is_blank(lead.get("pincode")):
+        pincode = _clean_digits(lead["pincode"])
+        if not (pincode.isdigit() and len(pincode) == 6):
+            raise ValueError(f"invalid pincode {lead['pincode']!r}")
+        lead["pincode"] = pincode
+
+    for field in _FLOAT_FIELDS:
+        if not _is_blank(lead.get(field)):
+            try:
+                lead[field] = float(str(lead[field]).replace(",", ""))
+            except ValueError:
+                raise ValueError(f"{field} is not a number: {lead[field]!r}")
+    if not _is_blank(lead.get("age")):
+        try:
+            lead["age"] = int(float(lead["age"]))
+        except ValueError:
+            raise ValueError(f"age is not a number: {lead['age']!r}")
+    if not _is_blank(lead.get("is_ntc")) and isinstance(lead["is_ntc"], str):
+        lead["is_ntc"] = lead["is_ntc"].strip().lower() in ("true", "yes", "1", "y")
+    if isinstance(lead.get("co_applicant_details"), str):
+        try:
+            lead["co_applicant_details"] = json.loads(lead["co_applicant_details"])
+        except ValueError:
+            pass
+
+    # Derived fields, computed the same way as the capture form
+    monthly = lead.get("monthly_turnover")
+    if lead.get("yearly_turnover") is None and monthly is not None:
+        lead["yearly_turnover"] = monthly * 12
+    if lead.get("foir") is None and monthly and lead.get("total_obligations") is not None:
+        lead["foir"] = lead["total_obligations"] / monthly
+    return lead
+
+
+def row_status(row, status=None):
+    """The status a row is stored with: status when given, else the row's own, else DEFAULT_STATUS."""
+    if status is not None:
+        return status
+    own = row.get("status")
+    return DEFAULT_STATUS if _is_blank(own) else str(own).strip()
+
+
+def _upsert_rows_individually(conn, chunk, errors, disconnect_errors=()):
+    """
+    Fallback when a chunk's multi-row upsert fails: upserts row by row under
+    savepoints so only the offending rows are dropped, then commits the rest.
+    disconnect_errors are raised (the whole chunk is replayed), not recorded.
+    """
+    imported = 0
+    for row_number, lead, status in chunk:
+        with conn.cursor() as cur:
+            cur.execute("SAVEPOINT import_row;")
+        try:
+            utils.upsert_leads(conn, [(lead, status)], commit=False)
+        except disconnect_errors:
+            raise
+        except Exception as e:
+            with conn.cursor() as cur:
+                cur.execute("ROLLBACK TO SAVEPOINT import_row;")
+            errors.append({"row": row_number, "mobile_number": lead.get("mobile_number"), "error": str(e).strip()})
+            continue
+        with conn.cursor() as cur:
+            cur.execute("RELEASE SAVEPOINT import_row;")
+        imported += 1
+    conn.commit()
+    return imported
+
+
+def import_leads(path, pool=None, chunk_size=CHUNK_SIZE, status=None, progress=None):
+    """
+    Imports a leads file. Returns (summary, errors) where errors is a list of
+    {"row", "mobile_number", "error"} dicts; row counts data rows from 1, so
+    it is the spreadsheet row number minus the header.
+    A mobile number repeated in the file keeps its last row. status, when
+    given, replaces every row's own status (see row_status).
+    """
+    pool = utils.init_db_pool() if pool is None else pool
+    df = read_leads_file(path)
+    errors = []
+
+    # Normalize and score; later rows for the same mobile replace earlier ones
+    leads = {}
+    duplicates = 0
+    for row_number, row in enumerate(df.to_dict("records"), start=1):
+        try:
+            lead = normalize_lead(row)
+        except ValueError as e:
+            errors.append({"row": row_number, "mobile_number": row.get("mobile_number"), "error": str(e)})
+            continue
+        if leads.pop(lead["mobile_number"], None) is not None:
+            duplicates += 1
+        leads[lead["mobile_number"]] = (row_number, lead, row_status(row, status))
+
+    rows = list(leads.values())
+    imported = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+
+        def write_chunk(conn, chunk=chunk):
+            # Errors are collected per attempt: pool.run may replay the chunk on a new connection
+            chunk_errors = []
+            try:
+                utils.upsert_leads(conn, [(lead, lead_status) for _, lead, lead_status in chunk])
+                return len(chunk), chunk_errors
+            except pool.disconnect_errors:
+                raise
+            except Exception:
+                conn.rollback()
+                return _upsert_rows_individually(conn, chunk, chunk_errors, pool.disconnect_errors), chunk_errors
+
+        chunk_imported, chunk_errors = pool.run(write_chunk)
+        imported += chunk_imported
+        errors.extend(chunk_errors)
+        if progress:
+            progress(min(start + chunk_size, len(rows)), len(rows))
+
+    summary = {"rows": len(df), "imported": imported, "duplicates": duplicates, "failed": len(errors)}
+    return summary, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import leads into public.bdo_leads.")
+    parser.add_argument("path", help="CSV or XLSX file in the data/leads.xlsx layout")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument("--status", default=None,
+                        help=f"status stored for every imported lead (default: each row's own status, else {DEFAULT_STATUS!r})")
+    parser.add_argument("--errors", default="import_errors.csv", help="where to write the per-row error report")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary, errors = import_leads(
+        args.path, chunk_size=args.chunk_size, status=args.status,
+        progress=lambda done, total: print(f"  {done}/{total} leads written", end="\r"),
+    )
+    print()
+    print(f"Imported {summary['imported']} of {summary['rows']} rows in {time.perf_counter() - start:.1f}s "
+          f"({summary['failed']} failed, {summary['duplicates']} duplicate mobile numbers)")
+    if errors:
+        pd.DataFrame(errors, columns=["row", "mobile_number", "error"]).to_csv(args.errors, index=False)
+        print(f"Wrote per-row errors to {args.errors}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
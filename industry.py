@@ -0,0 +1,466 @@
+# industry.py
+"""
+Negative-industry term sets with a prebuilt multi-pattern matcher, and a
+fuzzy industry index (canonical taxonomy plus every negative-industry list)
+for misspelt segments and as-you-type suggestions.
+"""
+import json
+import math
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import deque, namedtuple
+from pathlib import Path
+
+import numpy as np
+
+TAXONOMY_FILE = Path(os.environ.get("INDUSTRY_TAXONOMY_FILE", "data/industry_taxonomy.json"))
+
+
+def normalize_industry(text):
+    """Lowercase with runs of whitespace collapsed: the form exact containment is checked on."""
+    return " ".join(str(text).lower().split())
+
+
+class NegativeIndustrySet(frozenset):
+    """
+    A frozenset of lowercase negative-industry terms that also carries an
+    Aho–Corasick automaton over them, built once when the CSV is loaded.
+    One pass over a business segment returns every contained term.
+
+    Terms keep their CSV order (first occurrence wins); the "first matched"
+    term reported in reasons is the earliest one in that order.
+    """
+
+    def __new__(cls, terms=()):
+        ordered = tuple(dict.fromkeys(terms))
+        self = super().__new__(cls, ordered)
+        self.terms = ordered
+        self._build(ordered)
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (self.terms,))
+
+    def to_arrays(self):
+        """
+        Flattens the automaton into integer/str arrays (edges, failure links,
+        outputs) so a snapshot can restore it without rebuilding.
+        """
+        edges = [(node, ord(ch), child) for node, children in enumerate(self._goto) for ch, child in children.items()]
+        outputs = [(node, rank) for node, ranks in enumerate(self._out) for rank in ranks]
+        return {
+            "terms": np.array(self.terms, dtype=str),
+            "edges": np.array(edges, dtype=np.int64).reshape(-1, 3),
+            "fail": np.array(self._fail, dtype=np.int64),
+            "outputs": np.array(outputs, dtype=np.int64).reshape(-1, 2),
+        }
+
+    @classmethod
+    def from_arrays(cls, terms, edges, fail, outputs):
+        """Restores a set whose automaton was flattened by to_arrays."""
+        terms = tuple(terms)
+        self = super().__new__(cls, terms)
+        self.terms = terms
+        goto = [{} for _ in range(len(fail))]
+        for node, ch, child in edges.tolist():
+            goto[node][chr(ch)] = child
+        out = [()] * len(fail)
+        for node, rank in outputs.tolist():
+            out[node] += (rank,)
+        self._goto = goto
+        self._fail = fail.tolist()
+        self._out = out
+        return self
+
+    def _build(self, terms):
+        # Trie: goto[node] maps a character to the child node; out[node] holds
+        # the ranks (positions in self.terms) of the terms ending at node.
+        goto = [{}]
+        out = [()]
+        for rank, term in enumerate(terms):
+            node = 0
+            for ch in term:
+                child = goto[node].get(ch)
+                if child is None:
+                    child = len(goto)
+                    goto[node][ch] = child
+                    goto.append({})
+                    out.append(())
+                node = child
+            out[node] += (rank,)
+
+        # Failure links, breadth-first; each node also inherits the outputs of its fallback
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                fallback = fail[node]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(ch, 0)
+                fail[child] = target if target != child else 0
+                out[child] += out[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def _ranks(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        ranks = set()
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                ranks.update(out[node])
+        return ranks
+
+    def find_all(self, normalized_text):
+        """Returns every term contained in normalized_text, in term order."""
+        return tuple(self.terms[rank] for rank in sorted(self._ranks(normalized_text)))
+
+    def first_match(self, normalized_text):
+        """Returns the earliest contained term in term order, or None."""
+        ranks = self._ranks(normalized_text)
+        return self.terms[min(ranks)] if ranks else None
+
+
+# --- FUZZY MATCHING ---
+# Matching works on tokens (alphanumeric runs, lowercased, plural "s" dropped,
+# stopwords removed). A token of the query matches a token of a term exactly,
+# or, when both are long enough and start with the same letter, by edit
+# similarity; candidates for the latter come from a trigram inverted index
+# (keyed by first letter and trigram), so a query never scans the term lists.
+# A negative term is hit when every one of its tokens is matched; its
+# confidence is their mean similarity. Canonical industries are ranked by the
+# same mean weighted by token rarity, so "shop" or "agency" alone ranks low.
+STOPWORDS = frozenset(["a", "an", "and", "at", "by", "etc", "for", "in", "of", "on", "or", "the", "to", "with"])
+MIN_FUZZY_LENGTH = 5        # shorter tokens only match exactly (or by prefix while typing)
+TOKEN_SIMILARITY = 0.75     # minimum edit similarity of a misspelt token
+NEGATIVE_CONFIDENCE = 0.8   # minimum confidence of a fuzzy negative-industry hit
+MIN_CANONICAL_CONFIDENCE = 0.3
+PREFIX_SIMILARITY = 0.9     # a completed prefix ranks just below a typed word
+MAX_PREFIX_EXPANSIONS = 64
+CACHE_SIZE = 4096
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# A ranked canonical industry / the term behind a negative-industry hit
+IndustryCandidate = namedtuple("IndustryCandidate", ["name", "confidence"])
+NegativeHit = namedtuple("NegativeHit", ["term", "confidence", "exact"])
+IndustryMatch = namedtuple("IndustryMatch", ["canonical", "negative"])  # [IndustryCandidate], {lender: NegativeHit}
+
+
+def _stem(token):
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def industry_tokens(text):
+    """Distinct match tokens of text, in order."""
+    tokens = (_stem(token) for token in _TOKEN.findall(str(text).lower()))
+    return tuple(dict.fromkeys(token for token in tokens if token not in STOPWORDS))
+
+
+def _trigrams(token):
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def token_similarity(a, b):
+    """1 - (optimal string alignment distance / longer length): 1.0 for equal tokens."""
+    if a == b:
+        return 1.0
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return 1.0 - previous[-1] / max(len(a), len(b))
+
+
+def token_patterns(term):
+    """
+    POSIX regular expressions (one per token of term) that a lowercased
+    segment must all match to hit term fuzzily: a word with the token's first
+    letter and a length the similarity threshold allows (plus a plural "s").
+    Lets SQL pre-select the rows a term can hit (see rescore).
+    """
+    patterns = []
+    for token in industry_tokens(term):
+        if len(token) >= MIN_FUZZY_LENGTH:
+            low = min(len(token), max(MIN_FUZZY_LENGTH, math.ceil(TOKEN_SIMILARITY * len(token))))
+            high = math.floor(len(token) / TOKEN_SIMILARITY) + 1
+        else:
+            low, high = len(token), len(token) + 1
+        patterns.append(f"(^|[^a-z0-9]){re.escape(token[0])}[a-z0-9]{{{low - 1},{high - 1}}}([^a-z0-9]|$)")
+    return patterns
+
+
+def load_taxonomy(path=None):
+    """[(canonical name, aliases)] from the taxonomy JSON file; empty (with a message) when missing."""
+    path = TAXONOMY_FILE if path is None else Path(path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+    except FileNotFoundError:
+        print(f"Industry taxonomy not found: {path}. Suggestions will only use the negative-industry lists.")
+        return []
+    return [(entry["name"], tuple(entry.get("aliases", ()))) for entry in document["industries"]]
+
+
+class IndustryIndex:
+    """
+    Token/trigram inverted index over a canonical industry taxonomy and the
+    lenders' NegativeIndustrySets, built once per policy load. Answers:
+        match(text)        ranked canonical industries and per-lender negative hits
+        negative_hit(terms, text)
+                           the hit of one NegativeIndustrySet (used by the eligibility check)
+        suggest(prefix)    canonical names for a partly typed segment
+    Results are cached per text (bounded), so repeated segments cost one dict
+    lookup. The token tables are built on the first fuzzy lookup (a few ms), so
+    importing logic stays fast and exact hits never wait for them.
+    """
+
+    def __init__(self, taxonomy=(), negative_industry_sets=None):
+        negative_industry_sets = negative_industry_sets or {}
+        self.names = tuple(name for name, _ in taxonomy)
+        self._taxonomy = tuple(taxonomy)
+        self._sets = []                 # distinct NegativeIndustrySets
+        self._set_positions = {}        # id(set) -> position in _sets
+        self._lenders = {}              # lender -> position in _sets
+        for lender, terms in negative_industry_sets.items():
+            if id(terms) not in self._set_positions:
+                self._set_positions[id(terms)] = len(self._sets)
+                self._sets.append(terms)
+            self._lenders[lender] = self._set_positions[id(terms)]
+        self._built = False
+        self._build_lock = threading.Lock()
+        self._similar_cache = {}
+        self._match_cache = {}
+        self._result_cache = {}
+        self._suggest_cache = {}
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._build_lock:
+                if not self._built:
+                    self._build()
+                    self._built = True
+
+    def _build(self):
+        # Entries: (canonical name or set position, text, vocabulary ids of its tokens)
+        self._entries = []
+        for name, aliases in self._taxonomy:
+            for text in (name,) + tuple(aliases):
+                self._add_entry(name, text)
+        for position, terms in enumerate(self._sets):
+            for term in terms.terms:
+                self._add_entry(position, term)
+
+        self._vocab = []
+        self._vocab_ids = {}
+        self._postings = []             # vocabulary id -> entry ids
+        self._grams = {}                # (first letter, trigram) -> vocabulary ids of fuzzy-matchable tokens
+        self._gram_counts = []          # vocabulary id -> number of trigrams
+        for entry_id, (key, text, tokens) in enumerate(self._entries):
+            ids = []
+            for token in tokens:
+                vid = self._vocab_ids.get(token)
+                if vid is None:
+                    vid = self._vocab_ids[token] = len(self._vocab)
+                    self._vocab.append(token)
+                    self._postings.append([])
+                    grams = _trigrams(token)
+                    self._gram_counts.append(len(grams))
+                    if len(token) >= MIN_FUZZY_LENGTH:
+                        for gram in grams:
+                            self._grams.setdefault((token[0], gram), []).append(vid)
+                if not self._postings[vid] or self._postings[vid][-1] != entry_id:
+                    self._postings[vid].append(entry_id)
+                ids.append(vid)
+            self._entries[entry_id] = (key, text, tuple(ids))
+        self._sorted_vocab = sorted(self._vocab)
+        # Rarity weight per token (smoothed inverse document frequency) and per entry
+        self._weights = [math.log(1 + len(self._entries) / len(postings)) for postings in self._postings]
+        self._entry_weights = [sum(self._weights[vid] for vid in ids) for _, _, ids in self._entries]
+
+    def _add_entry(self, key, text):
+        tokens = industry_tokens(text)
+        if tokens:
+            self._entries.append((key, text, tokens))
+
+    def _similar(self, token, prefix=False):
+        """[(vocabulary id, similarity)] of the vocabulary tokens token matches."""
+        cache_key = (token, prefix)
+        cached = self._similar_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        found = {}
+        vid = self._vocab_ids.get(token)
+        if vid is not None:
+            found[vid] = 1.0
+        if len(token) >= MIN_FUZZY_LENGTH:
+            grams = _trigrams(token)
+            shared = {}
+            first = token[0]
+            for gram in grams:
+                for candidate in self._grams.get((first, gram), ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            gram_counts = self._gram_counts
+            for candidate, count in shared.items():
+                # Trigram Dice coefficient and length first: only plausible candidates pay for the edit distance
+                if candidate in found or 2 * count / (len(grams) + gram_counts[candidate]) < 0.5:
+                    continue
+                other = self._vocab[candidate]
+                if abs(len(other) - len(token)) > (1.0 - TOKEN_SIMILARITY) * max(len(other), len(token)):
+                    continue
+                similarity = token_similarity(token, other)
+                if similarity >= TOKEN_SIMILARITY:
+                    found[candidate] = similarity
+        if prefix:
+            vocab = self._sorted_vocab
+            start = bisect_left(vocab, token)
+            for other in vocab[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not other.startswith(token):
+                    break
+                candidate = self._vocab_ids[other]
+                found[candidate] = max(found.get(candidate, 0.0), PREFIX_SIMILARITY)
+        result = tuple(found.items())
+        if len(self._similar_cache) >= CACHE_SIZE:
+            self._similar_cache.clear()
+        self._similar_cache[cache_key] = result
+        return result
+
+    def _matches(self, tokens, prefix=False):
+        """
+        {entry id: ({vocabulary id: best similarity}, query tokens explained)}
+        for the entries sharing a token with the query.
+        """
+        found = {}
+        for position, token in enumerate(tokens):
+            last = prefix and position == len(tokens) - 1
+            for vid, similarity in self._similar(token, last):
+                for entry_id in self._postings[vid]:
+                    entry = found.get(entry_id)
+                    if entry is None:
+                        entry = found[entry_id] = ({}, set())
+                    matches, explained = entry
+                    if similarity > matches.get(vid, 0.0):
+                        matches[vid] = similarity
+                    explained.add(position)
+        return found
+
+    def _canonical(self, found, query_size, limit):
+        weights = self._weights
+        ranked = {}
+        for entry_id, (matches, explained) in found.items():
+            key = self._entries[entry_id][0]
+            if not isinstance(key, str):
+                continue
+            confidence = sum(weights[vid] * similarity for vid, similarity in matches.items()) / self._entry_weights[entry_id]
+            coverage = len(explained) / query_size
+            # Contained aliases first; among them the ones explaining more of the query
+            rank = (confidence * (0.75 + 0.25 * coverage), coverage)
+            if rank > ranked.get(key, (0.0, 0.0)):
+                ranked[key] = rank
+        ordered = sorted(ranked.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        return [IndustryCandidate(name, round(rank[0], 3)) for name, rank in ordered[:limit]
+                if rank[0] >= MIN_CANONICAL_CONFIDENCE]
+
+    def _fuzzy_negative(self, text):
+        """{set position: NegativeHit} of fuzzy (token) negative hits for text."""
+        return self._fuzzy_matches(text)[0]
+
+    def _fuzzy_matches(self, text):
+        """
+        (fuzzy negative hits, _matches result, query token count) for text,
+        cached per text. Callers use the returned tuple, never a second cache
+        read: another thread may clear the cache in between.
+        """
+        cached = self._match_cache.get(text)
+        if cached is not None:
+            return cached
+        self._ensure_built()
+        tokens = industry_tokens(text)
+        found = self._matches(tokens)
+        best = {}
+        for entry_id, (matches, _) in found.items():
+            key, term, ids = self._entries[entry_id]
+            if isinstance(key, str) or len(matches) < len(ids):
+                continue
+            confidence = sum(matches.values()) / len(ids)
+            if confidence < NEGATIVE_CONFIDENCE:
+                continue
+            # Most confident term; ties go to the earliest term in CSV order (like
+            # first_match). Entries are added in term order, but found is not in entry order
+            rank = (confidence, -entry_id)
+            if key not in best or rank > best[key][0]:
+                best[key] = (rank, term)
+        hits = {key: NegativeHit(term, round(rank[0], 3), False) for key, (rank, term) in best.items()}
+        result = (hits, found, len(tokens))
+        if len(self._match_cache) >= CACHE_SIZE:
+            self._match_cache.clear()
+        self._match_cache[text] = result
+        return result
+
+    def negative_hit(self, terms, normalized_text):
+        """
+        The NegativeHit of NegativeIndustrySet terms for a segment (as returned
+        by normalize_industry), or None: exact containment (confidence 1.0)
+        first, else the best fuzzy hit. Sets this index was not built over only
+        get the exact check.
+        """
+        term = terms.first_match(normalized_text)
+        if term is not None:
+            return NegativeHit(term, 1.0, True)
+        position = self._set_positions.get(id(terms))
+        if position is None:
+            return None
+        return self._fuzzy_negative(normalized_text).get(position)
+
+    def match(self, text, limit=5):
+        """IndustryMatch for a business segment: ranked canonical industries and {lender: NegativeHit}."""
+        normalized = normalize_industry(text)
+        key = (normalized, limit)
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+        fuzzy, found, query_size = self._fuzzy_matches(normalized)
+        set_hits = []
+        for position, terms in enumerate(self._sets):
+            term = terms.first_match(normalized)
+            set_hits.append(NegativeHit(term, 1.0, True) if term is not None else fuzzy.get(position))
+        negative = {lender: set_hits[position] for lender, position in self._lenders.items()
+                    if set_hits[position] is not None}
+        result = IndustryMatch(self._canonical(found, query_size, limit), negative)
+        if len(self._result_cache) >= CACHE_SIZE:
+            self._result_cache.clear()
+        self._result_cache[key] = result
+        return result
+
+    def suggest(self, prefix, limit=8):
+        """Canonical names for a partly typed segment (its last word may be incomplete)."""
+        tokens = industry_tokens(prefix)
+        if not tokens:
+            return []
+        key = (tokens, limit)
+        cached = self._suggest_cache.get(key)
+        if cached is None:
+            self._ensure_built()
+            ranked = self._canonical(self._matches(tokens, prefix=True), len(tokens), limit)
+            # Drop the tail that only shares a short prefix with the text
+            cached = [candidate.name for candidate in ranked if candidate.confidence >= ranked[0].confidence / 2]
+            if len(self._suggest_cache) >= CACHE_SIZE:
+                self._suggest_cache.clear()
+            self._suggest_cache[key] = cached
+        return cached
@@ -1,286 +1,926 @@
-import utils
-
-# Load the pincode sets ONCE
-SERVICEABLE_PINCODES = utils.load_pincode_sets()
-NEGATIVE_INDUSTRIES = utils.load_negative_industry_sets()
-
-# --- LENDER POLICY RULES (JSON stored as Python Dictionary) ---
-POLICY_RULES = {
-    "Indifi (Term Loan)": {
-        "min_vintage_years": 1,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd","Public Ltd"],
-        "min_yearly_turnover": 4000000,
-        "max_foir": 0.30,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Indifi (Term Loan)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned", "Both Rented"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Indifi (Term Loan)", set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Bajaj (Term Loan)": {
-        "min_vintage_years": 3,
-        "allowed_constitutions" : ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 2000000,
-        "max_foir": 0.17,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Bajaj (Term Loan)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned","Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Bajaj (Term Loan)",set()),
-        "ntc_allowed": True,
-        "allowed_loan_types": ["Term Loan", "DLOD", "LAP"]
-    },
-    "Bajaj (STBL Lite T/O < 50L)": {
-        "min_vintage_years": 1,
-        "allowed_constitutions" : ["Sole Proprietor"],
-        "min_yearly_turnover": 1000000,
-        "max_foir": 0.17,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Bajaj (STBL Lite T/O < 50L)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned","Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Bajaj (STBL Lite T/O < 50L)",set()),
-        "ntc_allowed": True,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Bajaj (STBL T/O > 50L)": {
-        "min_vintage_years": 1,
-        "allowed_constitutions" : ["Sole Proprietor"],
-        "min_yearly_turnover": 5000000,
-        "max_foir": 0.17,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Bajaj (STBL T/O > 50L)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned","Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Bajaj (STBL T/O > 50L)",set()),
-        "ntc_allowed": True,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Flexi (Term Loan)": {
-        "min_vintage_years": 2,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 2400000,
-        "max_foir": 0.30,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Flexi (Term Loan)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Flexi (Term Loan)",set()),
-        "ntc_allowed": True,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Kotak (Term Loan)":{
-        "min_vintage_years": 3,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 5000000,
-        "max_foir": 0.30,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Kotak (Term Loan)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Kotak (Term Loan)",set()),
-        "ntc_allowed": True,
-        "allowed_loan_types": ["Term Loan", "LAP", "OD"]
-    },
-    "Kotak (CA Program)":{
-        "min_vintage_years": 1,
-        "allowed_constitutions": ["Sole Proprietor", "CA"],
-        "min_yearly_turnover": 5000000,
-        "max_foir": 0.30,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Kotak (CA Program)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Kotak (CA Program)",set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "L&T (Term Loan)":{
-        "min_vintage_years": 3,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 10000000,
-        "max_foir": 0.30,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("L&T (Term Loan)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("L&T (Term Loan)",set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan","DLOD"]
-    },
-    "L&T (CA Program)":{
-        "min_vintage_years": 3,
-        "allowed_constitutions": ["Sole Proprietor", "CA"],
-        "min_yearly_turnover": 5000000,
-        "max_foir": 0.30,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("L&T (CA Program)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("L&T (CA Program)",set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Hero (Term Loan)":{
-        "min_vintage_years": 3,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 5000000,
-        "max_foir": 0.30,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Hero (Term Loan)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Hero (Term Loan)",set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Credit Saison (SBA Program)":{
-        "min_vintage_years": 3,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 1000000,
-        "max_foir": 0.50,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Credit Saison (SBA Program)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Credit Saison (SBA Program)",set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Credit Saison (UBL Program)":{
-        "min_vintage_years": 3,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 10000000,
-        "max_foir": 0.50,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Credit Saison (UBL Program)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Credit Saison (UBL Program)",set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan"]
-    },
-    "Axis Bank (Term Loan)":{
-        "min_vintage_years": 3,
-        "allowed_constitutions": ["Sole Proprietor", "Partnership", "LLP", "Private Ltd", "Public Ltd"],
-        "min_yearly_turnover": 6000000,
-        "max_foir": 0.50,
-        "allowed_pincodes": SERVICEABLE_PINCODES.get("Axis Bank (Term Loan)", set()),
-        "allowed_ownership": ["Both Owned", "Residence Owned", "Office Owned","Residence Owned in Other City"],
-        "negative_industry": NEGATIVE_INDUSTRIES.get("Kotak (Term Loan)",set()),
-        "ntc_allowed": False,
-        "allowed_loan_types": ["Term Loan"]
-    }
+import math
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import metrics
+import policy_data
+from industry import IndustryIndex, NegativeIndustrySet, load_taxonomy, normalize_industry
+from pincodes import PincodePrefixIndex, ServiceablePincodes, load_pincode_master
+
+# --- LENDER POLICY RULES ---
+# Defined in data/policies.json (see policy_data); POLICY_RULES keeps the
+# original dictionary shape, with each lender's pincode set and
+# negative-industry matcher in place of its file names.
+def build_policy_rules(policy):
+    """Builds the POLICY_RULES dictionary from a loaded policy_data.Policy."""
+    policy_rules = {}
+    for lender, fields in policy.lenders.items():
+        rules = {key: value for key, value in fields.items()
+                 if key not in ("description", "pincode_file", "negative_industry_file")}
+        if "pincode_file" in fields:
+            rules["allowed_pincodes"] = policy.pincode_sets.get(lender, set())
+        if "negative_industry_file" in fields:
+            rules["negative_industry"] = policy.negative_industry_sets.get(lender, set())
+        policy_rules[lender] = rules
+    return policy_rules
+
+
+POLICY = policy_data.load_policy()
+SERVICEABLE_PINCODES = POLICY.pincode_sets
+NEGATIVE_INDUSTRIES = POLICY.negative_industry_sets
+POLICY_RULES = build_policy_rules(POLICY)
+
+
+# --- COMPILED RULE TABLE ---
+# POLICY_RULES is compiled ONCE per policy version into an immutable table so
+# that check_eligibility does not re-read the dictionaries on every Streamlit rerun.
+VINTAGE_TIP_TOLERANCE_YEARS = 0.25  # 3 months
+
+CompiledRule = namedtuple("CompiledRule", [
+    "lender",
+    "eligibility_bit",      # the lender's bit in stored eligibility masks
+    "min_vintage",          # float threshold
+    "min_vintage_label",    # threshold as written in POLICY_RULES, for messages
+    "vintage_tip_floor",    # vintages in [floor, min) get a deviation tip
+    "constitutions",        # frozenset
+    "min_turnover",         # float threshold
+    "min_turnover_label",   # e.g. "₹40,00,000" style label, pre-formatted
+    "max_foir",             # float threshold
+    "max_foir_label",       # e.g. "30%"
+    "pincodes",             # set of ints, or None if the lender has no pincode rule
+    "negative_terms",       # NegativeIndustrySet matcher, or None if no industry rule
+    "ownership",            # frozenset
+    "ownership_overrides",  # {ownership_status: min_vintage_years}
+    "ntc_allowed",          # bool
+    "loan_types",           # frozenset
+    "industry_index",       # IndustryIndex built over this table's negative_terms (fuzzy hits)
+])
+
+# Lead fields parsed once per check_eligibility call
+ParsedLead = namedtuple("ParsedLead", [
+    "vintage",              # float or None
+    "override_vintage",     # vintage used by ownership overrides (missing -> 0)
+    "has_constitution",
+    "constitution",         # hashable key for membership tests
+    "constitution_reason",
+    "turnover",             # float or None
+    "foir",                 # float or None
+    "pincode",              # int, or None when missing/invalid
+    "pincode_reason",       # reason when missing/invalid, else "not serviceable" text
+    "pincode_code",         # REASON_PINCODE_* bit matching pincode_reason
+    "industry",             # raw business segment (truthy) or None
+    "normalized_industry",
+    "ownership",            # raw ownership status
+    "ownership_key",        # hashable key for membership tests
+    "is_ntc",
+    "loan_type",            # raw requested loan type (truthy) or None
+    "loan_type_key",
+    "pretty_loan_type",
+])
+
+# --- REASON CODES ---
+# One bit per failed check, in check order. Used where the English reasons
+# are not needed (bulk scoring); the codes of a lender are OR-ed together.
+REASON_VINTAGE = 1 << 0
+REASON_CONSTITUTION = 1 << 1
+REASON_TURNOVER = 1 << 2
+REASON_FOIR = 1 << 3
+REASON_PINCODE_MISSING = 1 << 4
+REASON_PINCODE_INVALID = 1 << 5
+REASON_PINCODE_UNSERVICEABLE = 1 << 6
+REASON_NEGATIVE_INDUSTRY = 1 << 7
+REASON_OWNERSHIP = 1 << 8
+REASON_NTC = 1 << 9
+REASON_LOAN_TYPE = 1 << 10
+
+REASON_LABELS = {
+    REASON_VINTAGE: "vintage",
+    REASON_CONSTITUTION: "constitution",
+    REASON_TURNOVER: "turnover",
+    REASON_FOIR: "foir",
+    REASON_PINCODE_MISSING: "pincode_missing",
+    REASON_PINCODE_INVALID: "pincode_invalid",
+    REASON_PINCODE_UNSERVICEABLE: "pincode_unserviceable",
+    REASON_NEGATIVE_INDUSTRY: "negative_industry",
+    REASON_OWNERSHIP: "ownership",
+    REASON_NTC: "ntc",
+    REASON_LOAN_TYPE: "loan_type",
+}
+
+
+# Fallback text when a reason cannot be spelled out from the lead (e.g. a stored
+# code whose negative term was since removed), see _reason_text
+REASON_MESSAGES = {
+    REASON_VINTAGE: "Business vintage is below the lender's minimum.",
+    REASON_CONSTITUTION: "Constitution type is not supported.",
+    REASON_TURNOVER: "Yearly turnover is below the lender's minimum.",
+    REASON_FOIR: "FOIR is above the lender's maximum.",
+    REASON_PINCODE_MISSING: "Pincode is missing.",
+    REASON_PINCODE_INVALID: "Pincode is invalid.",
+    REASON_PINCODE_UNSERVICEABLE: "Pincode is not in a serviceable area.",
+    REASON_NEGATIVE_INDUSTRY: "Industry is on the lender's negative list.",
+    REASON_OWNERSHIP: "Ownership status is not supported.",
+    REASON_NTC: "New to Credit (NTC) customers are not supported.",
+    REASON_LOAN_TYPE: "Requested loan type is not offered by the lender.",
 }
 
 
+def describe_reason_codes(codes):
+    """Returns the check labels set in a reason-code bitmask, in check order."""
+    return [label for bit, label in REASON_LABELS.items() if codes & bit]
+
+
+_UNHASHABLE = object()
+
+
+def _hashable(value):
+    """Returns value if it can be used in a frozenset lookup, else a sentinel that matches nothing."""
+    try:
+        hash(value)
+    except TypeError:
+        return _UNHASHABLE
+    return value
+
+
+def _parse_float(value):
+    """value as a finite float, or None when it is missing or not a number (e.g. a list, "abc", inf)."""
+    if value is None:
+        return None
+    try:
+        parsed = float(value)
+    except Exception:
+        return None
+    return parsed if math.isfinite(parsed) else None
+
+
+def compile_policy_rules(policy_rules, taxonomy=None):
+    """
+    Compiles the POLICY_RULES dictionary into a tuple of CompiledRule entries
+    (frozensets, float thresholds and pre-formatted message labels). Every
+    entry carries the IndustryIndex built over this table's negative-industry
+    matchers (and taxonomy, read from TAXONOMY_FILE when None), so fuzzy
+    matching always uses the index of the rules being evaluated.
+    """
+    compiled = []
+    shared_terms = {}  # identical negative-industry lists share one tuple
+    for lender, rules in policy_rules.items():
+        min_vintage = rules.get('min_vintage_years', 0)
+        min_turnover = rules.get('min_yearly_turnover', 0)
+        max_foir = rules.get('max_foir', 1.0)
+        negative = rules.get('negative_industry')
+        if negative is not None and not isinstance(negative, NegativeIndustrySet):
+            # Plain sets/lists get a matcher too; identical ones share it
+            negative = tuple(negative)
+            negative = shared_terms.setdefault(negative, NegativeIndustrySet(negative))
+        overrides = {
+            status: float(override.get('min_vintage_years', 0))
+            for status, override in rules.get('ownership_overrides', {}).items()
+        }
+        compiled.append(CompiledRule(
+            lender=lender,
+            eligibility_bit=rules['eligibility_bit'],
+            min_vintage=float(min_vintage),
+            min_vintage_label=f"{min_vintage}",
+            vintage_tip_floor=max(0.0, min_vintage - VINTAGE_TIP_TOLERANCE_YEARS),
+            constitutions=frozenset(rules.get('allowed_constitutions', [])),
+            min_turnover=float(min_turnover),
+            min_turnover_label=f"₹{min_turnover:,}",
+            max_foir=float(max_foir),
+            max_foir_label=f"{max_foir:.0%}",
+            pincodes=rules['allowed_pincodes'] if 'allowed_pincodes' in rules else None,
+            negative_terms=negative,
+            ownership=frozenset(rules.get('allowed_ownership', [])),
+            ownership_overrides=MappingProxyType(overrides),
+            ntc_allowed=bool(rules.get('ntc_allowed', False)),
+            loan_types=frozenset(rules.get('allowed_loan_types', ["Term Loan"])),
+            industry_index=None,
+        ))
+    index = IndustryIndex(load_taxonomy() if taxonomy is None else taxonomy,
+                          {rule.lender: rule.negative_terms for rule in compiled if rule.negative_terms is not None})
+    return tuple(rule._replace(industry_index=index) for rule in compiled)
+
+
+def rules_industry_index(rules):
+    """The IndustryIndex compiled with rules (an empty-list index for an empty table)."""
+    return rules[0].industry_index if rules else IndustryIndex(load_taxonomy())
+
+
+COMPILED_RULES = compile_policy_rules(POLICY_RULES)
+
+# Fuzzy industry matching over the taxonomy and every negative-industry list
+# (misspelt segments, UI suggestions): the index compiled with COMPILED_RULES,
+# swapped with them on reload
+INDUSTRY_INDEX = rules_industry_index(COMPILED_RULES)
+
+# Pincode autocomplete over every serviceable pincode (lender counts), joined
+# with the optional pincode master (district / state); rebuilt on reload
+PINCODE_MASTER = load_pincode_master()
+PINCODE_INDEX = PincodePrefixIndex.from_pincode_sets(SERVICEABLE_PINCODES, PINCODE_MASTER)
+
+
+# --- POLICY HOT RELOAD ---
+_reload_lock = threading.Lock()
+_watcher = None
+
+
+def reload_policy():
+    """
+    Reads the policy file and data files again, compiles them and swaps the
+    result in. Everything is built off to the side first; the swap is a single
+    rebinding of COMPILED_RULES, so an evaluation in flight finishes on the
+    table it started with and the next one uses the new table. Raises and keeps
+    the current rules if the new file is invalid.
+    """
+    global POLICY, SERVICEABLE_PINCODES, NEGATIVE_INDUSTRIES, POLICY_RULES, COMPILED_RULES, INDUSTRY_INDEX, PINCODE_INDEX
+    with _reload_lock:
+        policy = policy_data.reload_policy()
+        policy_rules = build_policy_rules(policy)
+        compiled = compile_policy_rules(policy_rules)
+        industry_index = rules_industry_index(compiled)
+        pincode_index = PincodePrefixIndex.from_pincode_sets(policy.pincode_sets, PINCODE_MASTER)
+        POLICY, SERVICEABLE_PINCODES, NEGATIVE_INDUSTRIES = policy, policy.pincode_sets, policy.negative_industry_sets
+        POLICY_RULES = policy_rules
+        INDUSTRY_INDEX = industry_index
+        PINCODE_INDEX = pincode_index
+        COMPILED_RULES = compiled
+    print(f"Reloaded lender policies (revision {policy.revision}, {len(compiled)} lenders)")
+    return compiled
+
+
+def start_policy_watcher(interval=5.0):
+    """
+    Starts (once per process) a background thread that reloads the policies
+    when data/policies.json or one of its data files changes.
+    """
+    global _watcher
+    with _reload_lock:
+        if _watcher is None:
+            _watcher = policy_data.PolicyWatcher(reload_policy, interval=interval).start()
+    return _watcher
+
+
+def parse_lead(lead_data):
+    """
+    Parses and normalizes the lead fields used by the policy checks, once per call.
+    Values of the wrong type (lists, objects, non-numeric text) count as
+    invalid or missing, so any JSON lead can be parsed.
+    """
+    vintage = _parse_float(lead_data.get('vintage_years'))
+
+    has_constitution = 'constitution_type' in lead_data
+    constitution = lead_data.get('constitution_type')
+
+    pincode_raw = lead_data.get('pincode')
+    pincode = None
+    if not pincode_raw:
+        pincode_reason, pincode_code = "Pincode is missing.", REASON_PINCODE_MISSING
+    else:
+        try:
+            pincode = int(pincode_raw)
+            pincode_reason = f"Pincode {pincode_raw} is not in a serviceable area."
+            pincode_code = REASON_PINCODE_UNSERVICEABLE
+        except (TypeError, ValueError, OverflowError):
+            # Not a number, or not a scalar at all (e.g. a list in a JSON request)
+            pincode_reason, pincode_code = f"Pincode '{pincode_raw}' is invalid.", REASON_PINCODE_INVALID
+
+    industry = lead_data.get('business_segment') or None
+    ownership = lead_data.get('ownership_status')
+    loan_type = lead_data.get('requested_loan_type') or None
+
+    return ParsedLead(
+        vintage=vintage,
+        override_vintage=vintage if vintage is not None else 0,
+        has_constitution=has_constitution,
+        constitution=_hashable(constitution),
+        constitution_reason=f"Constitution type '{constitution}' is not supported." if has_constitution else None,
+        turnover=_parse_float(lead_data.get('yearly_turnover')),
+        foir=_parse_float(lead_data.get('foir')),
+        pincode=pincode,
+        pincode_reason=pincode_reason,
+        pincode_code=pincode_code,
+        industry=industry,
+        normalized_industry=normalize_industry(industry) if industry else None,
+        ownership=ownership,
+        ownership_key=_hashable(ownership),
+        is_ntc=lead_data.get('is_ntc') is True,
+        loan_type=loan_type,
+        loan_type_key=_hashable(loan_type),
+        pretty_loan_type="Loan Against Property (LAP)" if loan_type == "LAP" else loan_type,
+    )
+
+
 # --- ELIGIBILITY CHECKING LOGIC ---
+def _is_serviceable(pincodes, pincode, lookups):
+    """
+    Pincode membership; with a lookups dict, the shared PincodeIndex mask of the
+    lead's pincode is read once per call and each lender only tests its bit.
+    """
+    if lookups is not None and isinstance(pincodes, ServiceablePincodes):
+        key = id(pincodes.index)
+        mask = lookups.get(key)
+        if mask is None:
+            mask = lookups[key] = pincodes.index.mask_for(pincode)
+        return mask & pincodes.bit
+    return pincode in pincodes
+
+
+# One function per policy check: each returns its REASON_* bit when the lead
+# fails it, else 0. The English sentences are only built on demand (see
+# EligibilityResult).
+def _check_vintage(rule, lead, lookups):
+    vintage = lead.vintage
+    if vintage is not None and vintage < rule.min_vintage:
+        return REASON_VINTAGE
+    return 0
+
+
+def _check_constitution(rule, lead, lookups):
+    if lead.has_constitution and lead.constitution not in rule.constitutions:
+        return REASON_CONSTITUTION
+    return 0
+
+
+def _check_turnover(rule, lead, lookups):
+    if lead.turnover is not None and lead.turnover < rule.min_turnover:
+        return REASON_TURNOVER
+    return 0
+
+
+def _check_foir(rule, lead, lookups):
+    if lead.foir is not None and lead.foir > rule.max_foir:
+        return REASON_FOIR
+    return 0
+
+
+def _check_pincode(rule, lead, lookups):
+    if rule.pincodes is not None and (lead.pincode is None or not _is_serviceable(rule.pincodes, lead.pincode, lookups)):
+        return lead.pincode_code
+    return 0
+
+
+def _negative_hit(rule, lead, lookups):
+    # The index compiled with rule, never the INDUSTRY_INDEX of a newer reload
+    terms = rule.negative_terms
+    if lookups is None:
+        return rule.industry_index.negative_hit(terms, lead.normalized_industry)
+    if id(terms) not in lookups:
+        lookups[id(terms)] = rule.industry_index.negative_hit(terms, lead.normalized_industry)
+    return lookups[id(terms)]
+
+
+def _check_negative_industry(rule, lead, lookups):
+    # Containment match, else a confident fuzzy (misspelt) match
+    if rule.negative_terms is None or lead.normalized_industry is None:
+        return 0
+    if _negative_hit(rule, lead, lookups) is not None:
+        return REASON_NEGATIVE_INDUSTRY
+    return 0
+
+
+def _check_ownership(rule, lead, lookups):
+    # Declared overrides, e.g. Flexi "Both Rented"
+    if lead.ownership and lead.ownership_key not in rule.ownership:
+        min_override_vintage = rule.ownership_overrides.get(lead.ownership_key)
+        if min_override_vintage is None or not lead.override_vintage >= min_override_vintage:
+            return REASON_OWNERSHIP
+    return 0
+
+
+def _check_ntc(rule, lead, lookups):
+    if lead.is_ntc and not rule.ntc_allowed:
+        return REASON_NTC
+    return 0
+
+
+def _check_loan_type(rule, lead, lookups):
+    if lead.loan_type is not None and lead.loan_type_key not in rule.loan_types:
+        return REASON_LOAN_TYPE
+    return 0
+
+
+# (check, ParsedLead fields it reads), in the order reasons are reported
+POLICY_CHECKS = (
+    (_check_vintage, ("vintage",)),
+    (_check_constitution, ("has_constitution", "constitution")),
+    (_check_turnover, ("turnover",)),
+    (_check_foir, ("foir",)),
+    (_check_pincode, ("pincode", "pincode_code")),
+    (_check_negative_industry, ("normalized_industry",)),
+    (_check_ownership, ("ownership", "ownership_key", "override_vintage")),
+    (_check_ntc, ("is_ntc",)),
+    (_check_loan_type, ("loan_type", "loan_type_key")),
+)
+_CHECK_FUNCTIONS = tuple(check for check, _ in POLICY_CHECKS)
+
+
+def reason_code(rule, lead, lookups=None):
+    """
+    Runs the nine policy checks of one compiled rule against a parsed lead and
+    returns the OR-ed REASON_* bits of the failed ones; 0 when eligible.
+    lookups optionally caches per-lead results shared between lenders (the
+    negative-industry hit per matcher, the pincode mask per index), so lenders
+    sharing one negative-industry list only scan it once per lead.
+    """
+    code = 0
+    for check in _CHECK_FUNCTIONS:
+        code |= check(rule, lead, lookups)
+    return code
+
+
+def reason_codes(rules, lead, lookups=None):
+    """
+    reason_code of a parsed lead for each rule, in rules order. With metrics
+    enabled, every check is timed and counted per lender (see _profiled_codes).
+    """
+    lookups = {} if lookups is None else lookups
+    if metrics.ENABLED:
+        return _profiled_codes(rules, lead, lookups)
+    return [reason_code(rule, lead, lookups) for rule in rules]
+
+
+# --- PROFILING ---
+# Per (lender, check) runs, rejections and time for metrics; only used while
+# metrics.ENABLED, so the plain path above stays untimed.
+CHECK_NAMES = tuple(check.__name__.replace("_check_", "") for check in _CHECK_FUNCTIONS)
+
+
+def _profiled_codes(rules, lead, lookups):
+    timer_ns = _TIMER_NS
+    codes = []
+    stats = []
+    for rule in rules:
+        code = 0
+        ns = []
+        failed = []
+        for check in _CHECK_FUNCTIONS:
+            start = time.perf_counter_ns()
+            bit = check(rule, lead, lookups)
+            ns.append(time.perf_counter_ns() - start - timer_ns)
+            failed.append(bit)
+            code |= bit
+        codes.append(code)
+        stats.append((rule.lender, ns, failed))
+    metrics.REGISTRY.record_checks(CHECK_NAMES, stats)
+    return codes
+
+
+# --- RESULT TEXT ---
+# One formatter per REASON_* bit: the English sentence for that failed check,
+# or None when the lead no longer spells it out (REASON_MESSAGES is used then).
+def _vintage_reason(rule, lead):
+    if lead.vintage is not None:
+        return f"Business vintage is {lead.vintage:.2f} years (requires {rule.min_vintage_label}+ years)."
+    return None
+
+
+def _turnover_reason(rule, lead):
+    if lead.turnover is not None:
+        return f"Yearly turnover is ₹{int(lead.turnover):,} (requires {rule.min_turnover_label}+)."
+    return None
+
+
+def _foir_reason(rule, lead):
+    if lead.foir is not None:
+        return f"FOIR is {lead.foir:.0%} (max allowed is {rule.max_foir_label})."
+    return None
+
+
+def _negative_industry_reason(rule, lead):
+    if rule.negative_terms is None or lead.normalized_industry is None:
+        return None
+    hit = _negative_hit(rule, lead, None)
+    if hit is None:
+        return None
+    if hit.exact:
+        return f"Industry '{lead.industry}' is negative (contains '{hit.term}')."
+    return f"Industry '{lead.industry}' is negative (close to '{hit.term}', {hit.confidence:.0%} match)."
+
+
+def _ownership_reason(rule, lead):
+    return f"Ownership status '{lead.ownership}' is not supported." if lead.ownership else None
+
+
+def _loan_type_reason(rule, lead):
+    if lead.loan_type is not None:
+        return f"Requested loan type '{lead.pretty_loan_type}' is not offered by {rule.lender}."
+    return None
+
+
+def _pincode_reason(rule, lead):
+    return lead.pincode_reason
+
+
+_REASON_FORMATTERS = {
+    REASON_VINTAGE: _vintage_reason,
+    REASON_CONSTITUTION: lambda rule, lead: lead.constitution_reason,
+    REASON_TURNOVER: _turnover_reason,
+    REASON_FOIR: _foir_reason,
+    REASON_PINCODE_MISSING: _pincode_reason,
+    REASON_PINCODE_INVALID: _pincode_reason,
+    REASON_PINCODE_UNSERVICEABLE: _pincode_reason,
+    REASON_NEGATIVE_INDUSTRY: _negative_industry_reason,
+    REASON_OWNERSHIP: _ownership_reason,
+    REASON_NTC: lambda rule, lead: "New to Credit (NTC) customers are not supported.",
+    REASON_LOAN_TYPE: _loan_type_reason,
+}
+
+_PINCODE_REASONS = REASON_PINCODE_MISSING | REASON_PINCODE_INVALID | REASON_PINCODE_UNSERVICEABLE
+_code_bits = {}  # reason code -> its REASON_* bits in check order
+
+
+def _reason_texts(rule, lead, code):
+    """The reasons list of a result: one sentence per failed check, in check order."""
+    if code == 0:
+        return ["All criteria passed."]
+    bits = _code_bits.get(code)
+    if bits is None:
+        bits = _code_bits[code] = tuple(bit for bit in REASON_LABELS if code & bit)
+    reasons = []
+    for bit in bits:
+        reason = _REASON_FORMATTERS[bit](rule, lead)
+        # A stored pincode code can disagree with a lead edited since
+        if reason is None or (bit & _PINCODE_REASONS and bit != lead.pincode_code):
+            reason = REASON_MESSAGES[bit]
+        reasons.append(reason)
+    return reasons
+
+
+def _tip_texts(rule, lead, code):
+    # The tip needs a failed vintage check
+    tip = _vintage_tip(rule, lead) if code & REASON_VINTAGE else None
+    return [tip] if tip is not None else []
+
+
+def _result_dict(rule, lead, code):
+    """The {eligible, reasons, tips} dictionary for one lender."""
+    return {
+        "eligible": code == 0,
+        "reasons": _reason_texts(rule, lead, code),
+        "tips": _tip_texts(rule, lead, code),  # empty list if none
+    }
+
+
+def _vintage_tip(rule, lead):
+    # Vintage within the last 3 months below the min requirement (tip only)
+    vintage = lead.vintage
+    if vintage is not None and rule.vintage_tip_floor <= vintage < rule.min_vintage:
+        return (
+            f"Tip: Vintage is {vintage:.2f} years — close to the {rule.min_vintage_label}-year requirement. "
+            "If additional evidence (e.g., earlier business documents) is available or if the underwriter "
+            "considers associated/previous business history, a deviation may be considered."
+        )
+    return None
+
+
+class EligibilityResult(Mapping):
+    """
+    One lender's outcome for a lead: the REASON_* code plus the rule and parsed
+    lead it came from. eligible is a plain comparison; reasons and tips are
+    formatted the first time they are read. Reads like the
+    {eligible, reasons, tips} dictionary check_eligibility returns
+    (result["reasons"], result.get("tips", [])); as_dict() copies it into one.
+    """
+    __slots__ = ("rule", "lead", "code", "_reasons", "_tips")
+
+    def __init__(self, rule, lead, code):
+        self.rule = rule
+        self.lead = lead
+        self.code = code
+        self._reasons = None
+        self._tips = None
+
+    @property
+    def lender(self):
+        return self.rule.lender
+
+    @property
+    def eligible(self):
+        return self.code == 0
+
+    @property
+    def reasons(self):
+        if self._reasons is None:
+            self._reasons = _reason_texts(self.rule, self.lead, self.code)
+        return self._reasons
+
+    @property
+    def tips(self):
+        if self._tips is None:
+            self._tips = _tip_texts(self.rule, self.lead, self.code)
+        return self._tips
+
+    def as_dict(self):
+        return {"eligible": self.eligible, "reasons": self.reasons, "tips": self.tips}
+
+    def __getitem__(self, key):
+        if key == "eligible":
+            return self.eligible
+        if key == "reasons":
+            return self.reasons
+        if key == "tips":
+            return self.tips
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("eligible", "reasons", "tips"))
+
+    def __len__(self):
+        return 3
+
+    def __repr__(self):
+        return f"EligibilityResult({self.lender!r}, eligible={self.eligible}, code={self.code:#x})"
+
+
+def evaluate_rule(rule, lead, lookups=None):
+    """
+    Runs the nine policy checks of one compiled rule against a parsed lead
+    (see reason_code). Returns the {eligible, reasons, tips} dictionary for the lender.
+    """
+    return _result_dict(rule, lead, reason_code(rule, lead, lookups))
+
+
+def evaluate_lead(lead_data, rules=None):
+    """
+    Like check_eligibility, but returns {lender: EligibilityResult}: callers that
+    only need the flags or codes never pay for the reason text.
+    """
+    rules = COMPILED_RULES if rules is None else rules
+    lead = parse_lead(lead_data)
+    codes = reason_codes(rules, lead)
+    return {rule.lender: EligibilityResult(rule, lead, code) for rule, code in zip(rules, codes)}
+
+
+# --- SHORT-CIRCUIT MODE ---
+# For callers that only need to know whether a lender accepts a lead (ranking,
+# bulk filtering): each lender's checks run in the order most likely to reject
+# the lead cheaply and stop at the first failure. Full diagnostics
+# (check_eligibility, IncrementalEligibility) are unaffected.
+def _timer_overhead_ns(rounds=200):
+    """Cost of one perf_counter_ns() pair, subtracted from sampled check timings."""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        ns = time.perf_counter_ns() - start
+        best = ns if best is None else min(best, ns)
+    return best
+
+
+_TIMER_NS = _timer_overhead_ns()
+
+
+class CheckOrder:
+    """
+    Runtime counters behind the short-circuit order. One lead in sample_every
+    runs every check, timed, for every lender: that gives each check's cost and
+    each lender's rejection rate per check without favouring the checks that
+    happen to run first. Every reorder_every samples the lenders' orders are
+    recomputed by expected cost per rejection (cost / rejection rate, lowest
+    first). A policy reload (new rules table) resets the counters.
+    """
+
+    def __init__(self, sample_every=64, reorder_every=32):
+        self.sample_every = sample_every
+        self.reorder_every = reorder_every
+        self._lock = threading.Lock()
+        self._timer_ns = _TIMER_NS
+        self._reset(None)
+
+    def _reset(self, rules):
+        self._rules = rules
+        self.calls = 0
+        self.samples = 0
+        self.rejections = {}                   # lender -> rejections per check (POLICY_CHECKS order)
+        self.check_ns = [0] * len(POLICY_CHECKS)  # time spent per check while sampling
+        self.check_runs = [0] * len(POLICY_CHECKS)
+        self.orders = {}                       # lender -> check functions; default POLICY_CHECKS order
+
+    def should_sample(self, rules):
+        if rules is not self._rules:
+            with self._lock:
+                if rules is not self._rules:
+                    self._reset(rules)
+        self.calls += 1
+        return bool(self.sample_every) and self.calls % self.sample_every == 1
+
+    def sample(self, rules, lead, lookups):
+        """Runs and times every check for every lender; returns the reason codes in rules order."""
+        codes = []
+        elapsed = [0] * len(POLICY_CHECKS)
+        failed = []
+        for rule in rules:
+            code = 0
+            rule_failed = []
+            for i, check in enumerate(_CHECK_FUNCTIONS):
+                start = time.perf_counter_ns()
+                bit = check(rule, lead, lookups)
+                elapsed[i] += time.perf_counter_ns() - start - self._timer_ns
+                if bit:
+                    code |= bit
+                    rule_failed.append(i)
+            codes.append(code)
+            failed.append(rule_failed)
+
+        with self._lock:
+            if rules is self._rules:
+                for i, ns in enumerate(elapsed):
+                    self.check_ns[i] += ns
+                    self.check_runs[i] += len(rules)
+                for rule, rule_failed in zip(rules, failed):
+                    counts = self.rejections.setdefault(rule.lender, [0] * len(POLICY_CHECKS))
+                    for i in rule_failed:
+                        counts[i] += 1
+                self.samples += 1
+                if self.samples % self.reorder_every == 0:
+                    self._reorder()
+        return codes
+
+    def _reorder(self):
+        costs = [max(ns / runs, 1.0) if runs else 1.0 for ns, runs in zip(self.check_ns, self.check_runs)]
+        orders = {}
+        for lender, counts in self.rejections.items():
+            # Smoothed, so checks that never rejected still get a finite rank
+            rates = [(count + 1) / (self.samples + 2) for count in counts]
+            ranked = sorted(range(len(POLICY_CHECKS)), key=lambda i: costs[i] / rates[i])
+            orders[lender] = tuple(_CHECK_FUNCTIONS[i] for i in ranked)
+        self.orders = orders  # swapped whole; readers never see a partial update
+
+    def describe(self):
+        """{lender: [(check name, rejection rate, mean ns), ...]} in the current order."""
+        with self._lock:
+            costs = [ns / runs if runs else None for ns, runs in zip(self.check_ns, self.check_runs)]
+            result = {}
+            for lender, counts in self.rejections.items():
+                order = self.orders.get(lender, _CHECK_FUNCTIONS)
+                result[lender] = [
+                    (check.__name__.replace("_check_", ""), counts[_CHECK_FUNCTIONS.index(check)] / max(self.samples, 1),
+                     costs[_CHECK_FUNCTIONS.index(check)])
+                    for check in order
+                ]
+            return result
+
+
+CHECK_ORDER = CheckOrder()
+
+
+def eligibility_flags(lead_data, rules=None, check_order=None):
+    """
+    Short-circuit mode: {lender: eligible} for lead_data, stopping each lender
+    at its first failing check (order from check_order, CHECK_ORDER by default).
+    """
+    rules = COMPILED_RULES if rules is None else rules
+    check_order = CHECK_ORDER if check_order is None else check_order
+    lead = parse_lead(lead_data)
+    lookups = {}
+    if check_order.should_sample(rules):
+        codes = check_order.sample(rules, lead, lookups)
+        return {rule.lender: code == 0 for rule, code in zip(rules, codes)}
+
+    orders = check_order.orders
+    flags = {}
+    for rule in rules:
+        eligible = True
+        for check in orders.get(rule.lender, _CHECK_FUNCTIONS):
+            if check(rule, lead, lookups):
+                eligible = False
+                break
+        flags[rule.lender] = eligible
+    return flags
+
+
+# --- STORED ELIGIBILITY ---
+# public.bdo_leads keeps eligibility as eligibility_mask (bigint, bit
+# rule.eligibility_bit set when eligible) and eligibility_codes (smallint[],
+# the lender's REASON_* bits at index eligibility_bit, NULL for unused bits);
+# the English reasons are rebuilt from the codes for display.
+def encode_eligibility(codes, rules=None):
+    """
+    Packs {lender: reason code} into the stored (eligibility_mask, eligibility_codes)
+    pair. Lenders missing from codes are left NULL (not scored).
+    """
+    rules = COMPILED_RULES if rules is None else rules
+    mask = 0
+    stored = [None] * (max((rule.eligibility_bit for rule in rules), default=-1) + 1)
+    for rule in rules:
+        code = codes.get(rule.lender)
+        if code is None:
+            continue
+        stored[rule.eligibility_bit] = code
+        if code == 0:
+            mask |= 1 << rule.eligibility_bit
+    return mask, stored
+
+
+def eligibility_columns(lead_data, rules=None):
+    """Scores lead_data against every lender; returns (eligibility_mask, eligibility_codes)."""
+    rules = COMPILED_RULES if rules is None else rules
+    lead = parse_lead(lead_data)
+    codes = reason_codes(rules, lead)
+    return encode_eligibility({rule.lender: code for rule, code in zip(rules, codes)}, rules)
+
+
+def stored_reason_codes(eligibility_codes, rules=None):
+    """Unpacks a stored eligibility_codes array into {lender: reason code} (scored lenders only)."""
+    rules = COMPILED_RULES if rules is None else rules
+    eligibility_codes = eligibility_codes or []
+    return {
+        rule.lender: eligibility_codes[rule.eligibility_bit] for rule in rules
+        if rule.eligibility_bit < len(eligibility_codes) and eligibility_codes[rule.eligibility_bit] is not None
+    }
+
+
+def describe_eligibility(lead_data, eligibility_codes, rules=None):
+    """
+    Rebuilds the check_eligibility dictionary ({lender: {eligible, reasons, tips}})
+    of a stored lead from its eligibility_codes and lead data, for display.
+    """
+    rules = COMPILED_RULES if rules is None else rules
+    codes = stored_reason_codes(eligibility_codes, rules)
+    lead = parse_lead(lead_data)
+    return {rule.lender: _result_dict(rule, lead, codes[rule.lender]) for rule in rules if rule.lender in codes}
+
+
+def _or_codes(codes):
+    code = 0
+    for bit in codes:
+        code |= bit
+    return code
+
+
+class IncrementalEligibility:
+    """
+    check_eligibility for a lead that is edited over time (the capture form).
+
+    Keeps the parsed lead and every lender's per-check outcome. update() returns
+    the previous results untouched when no rule-relevant field changed, and
+    otherwise re-runs only the checks that read a changed field.
+    """
+
+    def __init__(self):
+        self._rules = None
+        self._lead = None
+        self._outcomes = None  # [rule][check] -> REASON_* bit or 0
+        self.results = None
+        self.checks_run = 0
+        self.checks_reused = 0
+
+    def update(self, lead_data):
+        """Returns {lender: EligibilityResult} for lead_data (read like check_eligibility's dicts)."""
+        lead = parse_lead(lead_data)
+        rules = COMPILED_RULES
+        if rules is not self._rules or self._lead is None:
+            changed = range(len(POLICY_CHECKS))
+            self._outcomes = [[0] * len(POLICY_CHECKS) for _ in rules]
+        elif lead == self._lead:
+            self.checks_reused += len(rules) * len(POLICY_CHECKS)
+            return self.results
+        else:
+            previous = self._lead
+            changed = [i for i, (_, fields) in enumerate(POLICY_CHECKS)
+                       if any(getattr(lead, f) != getattr(previous, f) for f in fields)]
+
+        lookups = {}
+        if metrics.ENABLED:
+            self._profiled_update(rules, lead, lookups, changed)
+        else:
+            for outcomes, rule in zip(self._outcomes, rules):
+                for i in changed:
+                    outcomes[i] = POLICY_CHECKS[i][0](rule, lead, lookups)
+        self.checks_run += len(rules) * len(changed)
+        self.checks_reused += len(rules) * (len(POLICY_CHECKS) - len(changed))
+
+        self._rules = rules
+        self._lead = lead
+        # New result objects: their text is formatted from the new lead when read
+        self.results = {
+            rule.lender: EligibilityResult(rule, lead, _or_codes(outcomes))
+            for rule, outcomes in zip(rules, self._outcomes)
+        }
+        return self.results
+
+    def _profiled_update(self, rules, lead, lookups, changed):
+        """The update loop, timed per (lender, check) for metrics; reused checks are not counted."""
+        timer_ns = _TIMER_NS
+        stats = []
+        for outcomes, rule in zip(self._outcomes, rules):
+            ns = [0] * len(POLICY_CHECKS)
+            failed = [None] * len(POLICY_CHECKS)
+            for i in changed:
+                start = time.perf_counter_ns()
+                outcomes[i] = failed[i] = POLICY_CHECKS[i][0](rule, lead, lookups)
+                ns[i] = time.perf_counter_ns() - start - timer_ns
+            stats.append((rule.lender, ns, failed))
+        metrics.REGISTRY.record_checks(CHECK_NAMES, stats)
+
+
 def check_eligibility(lead_data):
     """
     Checks the lead data against all lender policies.
     Returns a dictionary with eligibility status, failure reasons and tips for each lender.
     """
-    results = {}
-    for lender, rules in POLICY_RULES.items():
-        is_eligible = True
-        reasons = []
-        tips = []
-
-        # 1. Vintage Check
-        if 'vintage_years' in lead_data and lead_data['vintage_years'] is not None:
-            try:
-                vintage = float(lead_data['vintage_years'])
-            except Exception:
-                vintage = None
-
-            if vintage is not None:
-                min_vintage = rules.get('min_vintage_years', 0)
-                if vintage < min_vintage:
-                    is_eligible = False
-                    reasons.append(f"Business vintage is {vintage:.2f} years (requires {min_vintage}+ years).")
-
-                # Tip logic: if vintage is within last 3 months (0.25 years) below the min requirement
-                # e.g., for min_vintage 3 -> tip if vintage between 2.75 and 3.0
-                tolerance_years = 0.25  # 3 months
-                lower_bound = max(0.0, min_vintage - tolerance_years)
-                if lower_bound <= vintage < min_vintage:
-                    # Add a tip only (do not mark as failed)
-                    tips.append(
-                        f"Tip: Vintage is {vintage:.2f} years — close to the {min_vintage}-year requirement. "
-                        "If additional evidence (e.g., earlier business documents) is available or if the underwriter "
-                        "considers associated/previous business history, a deviation may be considered."
-                    )
-
-        # 2. Constitution Check
-        if 'constitution_type' in lead_data and lead_data['constitution_type'] not in rules.get('allowed_constitutions', []):
-            is_eligible = False
-            reasons.append(f"Constitution type '{lead_data['constitution_type']}' is not supported.")
-
-        # 3. Turnover Check
-        if 'yearly_turnover' in lead_data and lead_data['yearly_turnover'] is not None:
-            try:
-                yearly_turnover = float(lead_data['yearly_turnover'])
-            except Exception:
-                yearly_turnover = None
-            if yearly_turnover is not None and yearly_turnover < rules.get('min_yearly_turnover', 0):
-                is_eligible = False
-                reasons.append(f"Yearly turnover is ₹{int(yearly_turnover):,} (requires ₹{rules['min_yearly_turnover']:,}+).")
-
-        # 4. FOIR Check
-        if 'foir' in lead_data and lead_data['foir'] is not None:
-            try:
-                foir_val = float(lead_data['foir'])
-            except Exception:
-                foir_val = None
-            if foir_val is not None and foir_val > rules.get('max_foir', 1.0):
-                is_eligible = False
-                reasons.append(f"FOIR is {foir_val:.0%} (max allowed is {rules['max_foir']:.0%}).")
-
-        # 5. Pincode Check
-        if 'allowed_pincodes' in rules:
-            user_pincode_str = lead_data.get('pincode')
-            if not user_pincode_str:
-                is_eligible = False
-                reasons.append("Pincode is missing.")
-            else:
-                try:
-                    user_pincode_int = int(user_pincode_str)
-                    if user_pincode_int not in rules['allowed_pincodes']:
-                        is_eligible = False
-                        reasons.append(f"Pincode {user_pincode_str} is not in a serviceable area.")
-                except ValueError:
-                    is_eligible = False
-                    reasons.append(f"Pincode '{user_pincode_str}' is invalid.")
-
-        # 6. Negative industry check (containment match)
-        if 'negative_industry' in rules:
-            user_industry = lead_data.get('business_segment')
-            if user_industry:
-                normalized_industry = user_industry.strip().lower()
-                for negative_term in rules['negative_industry']:
-                    if negative_term in normalized_industry:
-                        is_eligible = False
-                        reasons.append(f"Industry '{user_industry}' is negative (contains '{negative_term}').")
-                        break
-
-        # 7. Ownership Status Check
-        ownership = lead_data.get('ownership_status')
-        allowed_ownership = rules.get('allowed_ownership', [])
-        # Default check
-        ownership_allowed = ownership in allowed_ownership
-        # --- FLEXI SPECIAL RULE ---
-        if lender == "Flexi (Term Loan)":
-            if ownership == "Both Rented":
-                try:
-                    vintage = float(lead_data.get('vintage_years', 0))
-                except Exception:
-                    vintage = 0
-                if vintage >= 2:
-                    ownership_allowed = True  # override
-
-        # Final validation
-        if ownership and not ownership_allowed:
-            is_eligible = False
-            reasons.append(f"Ownership status '{ownership}' is not supported.")
-
-        # 8. NTC check
-        if 'is_ntc' in lead_data and lead_data['is_ntc'] is True:
-            if not rules.get('ntc_allowed', False):
-                is_eligible = False
-                reasons.append("New to Credit (NTC) customers are not supported.")
-
-        # 9. Requested Loan Type Check
-        requested_loan_type = lead_data.get('requested_loan_type')
-        if requested_loan_type:
-            allowed = rules.get('allowed_loan_types', ["Term Loan"])
-            if requested_loan_type not in allowed:
-                is_eligible = False
-                pretty_requested = "Loan Against Property (LAP)" if requested_loan_type == "LAP" else requested_loan_type
-                reasons.append(f"Requested loan type '{pretty_requested}' is not offered by {lender}.")
-
-        # Finalize
-        results[lender] = {
-            "eligible": is_eligible,
-            "reasons": reasons if not is_eligible else ["All criteria passed."],
-            "tips": tips  # empty list if none
-        }
-
-    return results
\ No newline at end of file
+    rules = COMPILED_RULES
+    lead = parse_lead(lead_data)
+    codes = reason_codes(rules, lead)
+    return {rule.lender: _result_dict(rule, lead, code) for rule, code in zip(rules, codes)}
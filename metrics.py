@@ -0,0 +1,249 @@
+# metrics.py
+"""
+Optional runtime metrics, exported in the Prometheus text format.
+
+Off unless the ELIGIBILITY_METRICS environment variable is set (to anything
+but "" or "0") or enable() is called. Instrumented code checks ENABLED once
+per call and otherwise runs its plain path, so disabled metrics cost one
+global read per lead, save or rerun.
+
+What is recorded (labels in braces):
+    eligibility_check_runs_total{lender,check}        checks run by check_eligibility & co.
+    eligibility_check_rejections_total{lender,check}  of those, how many rejected the lead
+    eligibility_check_seconds_total{lender,check}     time spent in the check
+    eligibility_policy_load_seconds{part}             duration of the last policy load, per part
+    eligibility_db_seconds{op}                        histogram: save_leads, load_draft
+    eligibility_draft_cache_total{result}             load_draft_from_db hits and misses
+    eligibility_rerun_seconds{page}                   histogram: Streamlit script runs
+
+Exposed by service.py at GET /metrics (per worker process) and, in the
+Streamlit app, written every ELIGIBILITY_METRICS_INTERVAL seconds to
+$ELIGIBILITY_METRICS_FILE (node_exporter textfile collector format).
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.environ.get("ELIGIBILITY_METRICS", "") not in ("", "0")
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HELP = {
+    "eligibility_check_runs_total": ("counter", "Policy checks run, per lender and check."),
+    "eligibility_check_rejections_total": ("counter", "Policy checks that rejected the lead, per lender and check."),
+    "eligibility_check_seconds_total": ("counter", "Time spent in policy checks, per lender and check."),
+    "eligibility_policy_load_seconds": ("gauge", "Duration of the last policy load, per part."),
+    "eligibility_db_seconds": ("histogram", "Database call latency."),
+    "eligibility_draft_cache_total": ("counter", "Draft cache lookups by result."),
+    "eligibility_rerun_seconds": ("histogram", "Streamlit script run duration."),
+}
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Thread-safe counters and histograms keyed by (metric name, sorted label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self._checks = {}  # lender -> [runs, rejections, ns] lists in check order
+            self._check_names = ()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(seconds)
+
+    def record_checks(self, check_names, lender_stats):
+        """
+        Adds one lead's per-check outcomes: lender_stats is [(lender, ns, failed)]
+        with ns the nanoseconds per check and failed the REASON_* bit per check
+        (0 when passed, None when the check did not run).
+        """
+        with self._lock:
+            if check_names != self._check_names:
+                self._checks = {}
+                self._check_names = check_names
+            size = len(check_names)
+            for lender, ns, failed in lender_stats:
+                stats = self._checks.get(lender)
+                if stats is None:
+                    stats = self._checks[lender] = [[0] * size, [0] * size, [0] * size]
+                runs, rejections, elapsed = stats
+                for i in range(size):
+                    if failed[i] is None:
+                        continue
+                    runs[i] += 1
+                    elapsed[i] += ns[i]
+                    if failed[i]:
+                        rejections[i] += 1
+
+    def check_stats(self):
+        """{(lender, check): (runs, rejections, seconds)}."""
+        with self._lock:
+            return {
+                (lender, name): (runs[i], rejections[i], elapsed[i] / 1e9)
+                for lender, (runs, rejections, elapsed) in self._checks.items()
+                for i, name in enumerate(self._check_names)
+            }
+
+    def render(self, gauges=None):
+        """The registry (plus gauges: {(name, labels tuple): value}) in the Prometheus text format."""
+        samples = {}  # metric name -> lines
+
+        def add(name, labels, value, suffix=""):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            samples.setdefault(name, []).append(f"{name}{suffix}{{{label_text}}} {_number(value)}"
+                                                if label_text else f"{name}{suffix} {_number(value)}")
+
+        for (lender, check), (runs, rejections, seconds) in sorted(self.check_stats().items()):
+            labels = (("check", check), ("lender", lender))
+            add("eligibility_check_runs_total", labels, runs)
+            add("eligibility_check_rejections_total", labels, rejections)
+            add("eligibility_check_seconds_total", labels, seconds)
+        for (name, labels), value in sorted((gauges or {}).items()):
+            add(name, labels, value)
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [(key, list(h.counts), h.sum, h.count) for key, h in sorted(self._histograms.items())]
+        for (name, labels), value in counters:
+            add(name, labels, value)
+        for (name, labels), counts, total, count in histograms:
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += bucket
+                add(name, labels + (("le", "+Inf" if bound == float("inf") else repr(bound)),), cumulative, "_bucket")
+            add(name, labels, total, "_sum")
+            add(name, labels, count, "_count")
+
+        lines = []
+        for name, metric_lines in samples.items():
+            kind, text = _HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(metric_lines)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+
+# --- RECORDING (no-ops while disabled) ---
+def inc(name, value=1, **labels):
+    if ENABLED:
+        REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    if ENABLED:
+        REGISTRY.observe(name, seconds, **labels)
+
+
+class timed:
+    """Context manager observing the block's duration into histogram name (when enabled)."""
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter() if ENABLED else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            REGISTRY.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+# --- EXPORT ---
+def render():
+    """Current metrics, including the durations of the last policy load."""
+    import policy_data
+    gauges = {("eligibility_policy_load_seconds", (("part", part),)): seconds
+              for part, seconds in policy_data.LOAD_TIMINGS.items()}
+    return REGISTRY.render(gauges)
+
+
+def write_file(path):
+    """Writes render() to path atomically (temp file + rename), as textfile collectors expect."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class FileDumper:
+    """Background thread writing the metrics to path every interval seconds."""
+
+    def __init__(self, path, interval=15.0):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                write_file(self.path)
+            except OSError as e:
+                print(f"Could not write metrics to {self.path}: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        write_file(self.path)  # final state
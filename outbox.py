@@ -0,0 +1,279 @@
+# outbox.py
+"""
+Durable write-behind queue for lead saves.
+
+Saves are committed to a local SQLite file and acknowledged immediately; a
+background thread drains them to the database in batches. A row is deleted
+only after the database accepted it (or a newer save of the same lead), so
+nothing queued is lost if the process crashes: mobile numbers claimed by a
+dead worker become due again when their lease runs out. Several processes
+may share one outbox file.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+PENDING = "pending"
+SYNCED = "synced"
+RETRYING = "retrying"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mobile_number TEXT NOT NULL,
+    status TEXT NOT NULL,
+    lead_json TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at, id);
+CREATE INDEX IF NOT EXISTS outbox_mobile ON outbox (mobile_number, id);
+CREATE TABLE IF NOT EXISTS leases (
+    mobile_number TEXT PRIMARY KEY,
+    leased_until REAL NOT NULL,
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    mobile_number TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+"""
+
+
+class LeadOutbox:
+    """
+    flush(items) receives a list of (lead_dict, status) with at most one item
+    per mobile number (the latest save) and must raise on failure; it has to be
+    idempotent because a batch may be replayed after a crash, or row by row
+    after a batch failure.
+    """
+
+    def __init__(self, path, flush, batch_size=100, lease_seconds=60.0,
+                 retry_base_seconds=1.0, retry_max_seconds=300.0, poll_seconds=5.0):
+        self.path = Path(path)
+        self.flush = flush
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.execute("PRAGMA synchronous=FULL;")  # an acknowledged save survives power loss
+        self._db.executescript(_SCHEMA)
+        with self._transaction() as db:
+            # Outbox files created before leases had an owner
+            if "owner" not in {row[1] for row in db.execute("PRAGMA table_info(leases);")}:
+                db.execute("ALTER TABLE leases ADD COLUMN owner TEXT;")
+        self._owner = uuid.uuid4().hex  # tells this outbox's leases from other processes'
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes SQLite's write lock up front, so concurrent
+        # processes sharing the file serialize instead of failing mid-transaction
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE;")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK;")
+                raise
+            self._db.execute("COMMIT;")
+
+    # --- PRODUCER SIDE ---
+    def enqueue(self, lead_dict, status="draft"):
+        """Durably queues a save; returns once it is committed locally."""
+        mobile = str(lead_dict.get('mobile_number'))
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO outbox (mobile_number, status, lead_json, enqueued_at, next_attempt_at) VALUES (?, ?, ?, ?, ?);",
+                (mobile, status, json.dumps(lead_dict, default=str), now, now),
+            )
+            self._set_state(mobile, PENDING, now, None)
+        self._wakeup.set()
+
+    def sync_state(self, mobile):
+        """Returns (state, last_error) for a mobile number, or (None, None) if never queued."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state, last_error FROM sync_state WHERE mobile_number = ?;", (str(mobile),)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def pending_lead(self, mobile):
+        """Latest queued-but-unsynced (lead_dict, status) for a mobile number, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT lead_json, status FROM outbox WHERE mobile_number = ? ORDER BY id DESC LIMIT 1;", (str(mobile),)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def pending_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox;").fetchone()[0]
+
+    # --- CONSUMER SIDE ---
+    def _set_state(self, mobile, state, now, error):
+        self._db.execute(
+            "INSERT INTO sync_state (mobile_number, state, updated_at, last_error) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (mobile_number) DO UPDATE SET state = excluded.state, "
+            "updated_at = excluded.updated_at, last_error = excluded.last_error;",
+            (mobile, state, now, error),
+        )
+
+    def _claim_batch(self):
+        """
+        Leases up to batch_size due rows so no other worker drains them meanwhile.
+        Only the newest row of a mobile number is claimed, and only while no
+        other worker holds that number: an older save is never sent after (or
+        alongside) a newer one, it is dropped once a newer one is synced.
+        Leases last lease_seconds; see _renew_leases.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id, mobile_number, status, lead_json, attempts FROM outbox AS o "
+                "WHERE next_attempt_at <= ? "
+                "AND id = (SELECT MAX(id) FROM outbox WHERE mobile_number = o.mobile_number) "
+                "AND NOT EXISTS (SELECT 1 FROM leases WHERE mobile_number = o.mobile_number AND leased_until > ?) "
+                "ORDER BY id LIMIT ?;",
+                (now, now, self.batch_size),
+            ).fetchall()
+            db.executemany(
+                "INSERT INTO leases (mobile_number, leased_until, owner) VALUES (?, ?, ?) "
+                "ON CONFLICT (mobile_number) DO UPDATE SET leased_until = excluded.leased_until, "
+                "owner = excluded.owner;",
+                [(row[1], now + self.lease_seconds, self._owner) for row in rows],
+            )
+        return rows
+
+    def _renew_leases(self, rows):
+        """
+        Extends this outbox's leases on rows by lease_seconds and returns the rows
+        whose lease it still held. Once a lease has run out another worker may
+        have claimed the number and synced a newer save, so a row that lost its
+        lease must not be flushed.
+        """
+        now = time.time()
+        kept = []
+        with self._transaction() as db:
+            for row in rows:
+                renewed = db.execute(
+                    "UPDATE leases SET leased_until = ? WHERE mobile_number = ? AND owner = ? AND leased_until > ?;",
+                    (now + self.lease_seconds, row[1], self._owner, now),
+                ).rowcount
+                if renewed:
+                    kept.append(row)
+        return kept
+
+    def _settle(self, synced, failed, failed_state):
+        """
+        Records a drained batch. synced: rows the database accepted, deleted with
+        every older row of their mobile number. failed: (row, error) pairs, backed
+        off and reported as failed_state. Returns the number of rows deleted.
+        """
+        now = time.time()
+        deleted = 0
+        with self._transaction() as db:
+            for row_id, mobile, _, _, _ in synced:
+                deleted += db.execute(
+                    "DELETE FROM outbox WHERE mobile_number = ? AND id <= ?;", (mobile, row_id)
+                ).rowcount
+                # A newer save may have been queued while this batch was in flight
+                newer = db.execute("SELECT 1 FROM outbox WHERE mobile_number = ? LIMIT 1;", (mobile,)).fetchone()
+                if not newer:
+                    self._set_state(mobile, SYNCED, now, None)
+            for (row_id, mobile, _, _, attempts), error in failed:
+                # Exponential backoff per row, capped at retry_max_seconds
+                delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempts)
+                db.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?;",
+                    (attempts + 1, now + delay, error, row_id),
+                )
+                self._set_state(mobile, failed_state, now, error)
+            db.executemany("DELETE FROM leases WHERE mobile_number = ? AND owner = ?;",
+                           [(row[1], self._owner) for row in synced] +
+                           [(row[1], self._owner) for row, _ in failed])
+        return deleted
+
+    def _flush_rows(self, rows):
+        """Calls flush with rows; returns None on success, else the error text."""
+        try:
+            self.flush([(json.loads(lead_json), status) for _, _, status, lead_json, _ in rows])
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+        return None
+
+    def drain_once(self):
+        """
+        Flushes one batch. Returns the number of rows it settled (0 when nothing
+        was due, or when the whole batch has to be retried).
+
+        When a batch fails, its rows are flushed one at a time so that a row the
+        database keeps rejecting does not hold back the others. A row that fails
+        while others went through is reported as FAILED (this save is the
+        problem) and backed off on its own; when every row fails the database
+        is likely unreachable and they are all RETRYING. The fallback can outlast
+        the batch's leases, so each row's lease is renewed before it is flushed
+        and a row whose lease was lost is left to the worker that now holds it.
+        """
+        rows = self._claim_batch()
+        if not rows:
+            return 0
+        error = self._flush_rows(rows)
+        if error is None:
+            return self._settle(rows, [], None)
+        if len(rows) == 1:
+            self._settle([], [(rows[0], error)], RETRYING)
+            return 0
+
+        synced, failed = [], []
+        for row in rows:
+            if not self._renew_leases([row]):
+                continue
+            row_error = self._flush_rows([row])
+            if row_error is None:
+                synced.append(row)
+            else:
+                failed.append((row, row_error))
+        return self._settle(synced, failed, FAILED if synced else RETRYING)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                settled = self.drain_once()
+            except Exception as e:
+                print(f"Lead outbox worker error: {e}")
+                settled = 0
+            if not settled:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def start(self):
+        """Starts the background drain thread (idempotent)."""
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="lead-outbox", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
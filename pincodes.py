@@ -0,0 +1,294 @@
+# pincodes.py
+"""
+Shared serviceability index over all lender pincode lists.
+
+Indian pincodes are 6-digit numbers, so one NumPy array with a slot per
+possible pincode holds a bitmask of the lenders serving it. Every lender's
+allowed_pincodes is a read-only set view over that single array.
+
+PincodePrefixIndex answers prefix queries (autocomplete) over the pincodes
+any lender serves, optionally joined with an all-India pincode master
+(district and state per pincode).
+"""
+import os
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from collections.abc import Set
+from pathlib import Path
+
+import numpy as np
+
+PINCODE_SPACE = 1_000_000
+PINCODE_DIGITS = 6
+
+# Optional all-India pincode directory (data.gov.in layout or pincode,district,state)
+PINCODE_MASTER_FILE = Path(os.environ.get("PINCODE_MASTER_FILE", "data/pincode_master.csv"))
+
+
+def _mask_dtype(n_lenders):
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if n_lenders <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f"Too many lenders for one pincode bitmask: {n_lenders}")
+
+
+class PincodeIndex:
+    """
+    Lender bitmask per pincode: masks[pincode] has bit i set when lenders[i]
+    serves it. Values outside the 6-digit space are kept in a small side table.
+    """
+
+    def __init__(self, lender_pincodes):
+        self.lenders = tuple(lender_pincodes)
+        self.bits = {lender: 1 << i for i, lender in enumerate(self.lenders)}
+        self.masks = np.zeros(PINCODE_SPACE, dtype=_mask_dtype(len(self.lenders)))
+        self._overflow = {}
+        for lender, pincodes in lender_pincodes.items():
+            pincodes = np.unique(np.asarray(list(pincodes), dtype=np.int64))
+            in_space = (pincodes >= 0) & (pincodes < PINCODE_SPACE)
+            self.masks[pincodes[in_space]] |= self.bits[lender]
+            for pincode in pincodes[~in_space].tolist():
+                self._overflow[pincode] = self._overflow.get(pincode, 0) | self.bits[lender]
+        self._finish()
+
+    @classmethod
+    def from_arrays(cls, lenders, masks, overflow=None):
+        """
+        Rebuilds an index from its arrays (e.g. a policy snapshot) without copying masks;
+        masks may be a read-only memory-mapped array.
+        """
+        self = cls.__new__(cls)
+        self.lenders = tuple(lenders)
+        self.bits = {lender: 1 << i for i, lender in enumerate(self.lenders)}
+        self.masks = masks
+        self._overflow = dict(overflow or {})
+        self._finish()
+        return self
+
+    def overflow_items(self):
+        """(pincode, mask) pairs outside the 6-digit space."""
+        return list(self._overflow.items())
+
+    def _finish(self):
+        if not self.masks.dtype.isnative:
+            self.masks = self.masks.astype(self.masks.dtype.newbyteorder("="))
+        # memoryview indexing returns plain ints, avoiding NumPy scalar overhead.
+        # Arrays read from a file export an explicit byte order ("<H"), which
+        # memoryview cannot index, so recast to the native format code.
+        self._lookup = memoryview(self.masks).cast("B").cast(self.masks.dtype.char)
+        self._views = {lender: ServiceablePincodes(self, lender) for lender in self.lenders}
+
+    def mask_for(self, pincode):
+        """Returns the lender bitmask for one pincode (0 if no lender serves it)."""
+        if 0 <= pincode < PINCODE_SPACE:
+            return self._lookup[pincode]
+        return self._overflow.get(pincode, 0)
+
+    def lenders_for(self, pincode):
+        """Returns the lenders serving a pincode, in index order."""
+        mask = self.mask_for(pincode)
+        return [lender for lender in self.lenders if mask & self.bits[lender]]
+
+    def masks_for(self, pincodes):
+        """Vectorized mask_for over an integer array; out-of-space values use the side table."""
+        pincodes = np.asarray(pincodes, dtype=np.int64)
+        in_space = (pincodes >= 0) & (pincodes < PINCODE_SPACE)
+        result = np.zeros(pincodes.shape, dtype=self.masks.dtype)
+        result[in_space] = self.masks[pincodes[in_space]]
+        for i in np.flatnonzero(~in_space):
+            result[i] = self._overflow.get(int(pincodes[i]), 0)
+        return result
+
+    def view(self, lender):
+        return self._views[lender]
+
+
+class ServiceablePincodes(Set):
+    """Read-only set of one lender's pincodes, backed by a PincodeIndex."""
+
+    __slots__ = ("index", "lender", "bit", "_lookup", "_len")
+
+    def __init__(self, index, lender):
+        self.index = index
+        self.lender = lender
+        self.bit = index.bits[lender]
+        self._lookup = index._lookup
+        self._len = None  # counted on first len()
+
+    def __contains__(self, pincode):
+        if not isinstance(pincode, int):
+            # Like a set of ints: 560001.0 (e.g. read through pandas or Excel) matches
+            # 560001; text and non-integral values match nothing
+            try:
+                as_int = int(pincode)
+            except (TypeError, ValueError, OverflowError):
+                return False
+            if as_int != pincode:
+                return False
+            pincode = as_int
+        try:
+            if 0 <= pincode < PINCODE_SPACE:
+                return bool(self._lookup[pincode] & self.bit)
+        except TypeError:
+            return False
+        return bool(self.index._overflow.get(pincode, 0) & self.bit)
+
+    def __iter__(self):
+        for pincode in np.flatnonzero(self.index.masks & self.bit).tolist():
+            yield pincode
+        for pincode, mask in self.index._overflow.items():
+            if mask & self.bit:
+                yield pincode
+
+    def __len__(self):
+        if self._len is None:
+            in_space = int(np.count_nonzero(self.index.masks & self.bit))
+            self._len = in_space + sum(1 for mask in self.index._overflow.values() if mask & self.bit)
+        return self._len
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # Set operators (&, |, -) return plain sets
+        return set(iterable)
+
+    def contains_many(self, pincodes):
+        """Vectorized membership test over an integer array."""
+        return (self.index.masks_for(pincodes) & self.bit) != 0
+
+    def __repr__(self):
+        return f"ServiceablePincodes({self.lender!r}, {len(self)} pincodes)"
+
+
+# --- PREFIX INDEX ---
+_RANK_SHIFT = 20  # pincodes (< 10**6) fit in the low 20 bits of a rank key
+_PINCODE_MASK = (1 << _RANK_SHIFT) - 1
+_MAX_LENDERS = 255
+
+# A candidate pincode for autocomplete: lenders serving it, and its district /
+# state when the pincode master has it (else None)
+PincodeSuggestion = namedtuple("PincodeSuggestion", ["pincode", "lenders", "district", "state"])
+
+
+def load_pincode_master(path=None):
+    """
+    {pincode: (district, state)} from the pincode master CSV, or None when the
+    file does not exist. Accepts the data.gov.in directory columns
+    (pincode, Districtname / district, statename / state); the first row of a
+    pincode wins.
+    """
+    path = PINCODE_MASTER_FILE if path is None else Path(path)
+    if not path.exists():
+        return None
+    import pandas as pd
+    df = pd.read_csv(path, dtype=str)
+    columns = {column.strip().lower(): column for column in df.columns}
+    district = next((columns[c] for c in ("districtname", "district") if c in columns), None)
+    state = next((columns[c] for c in ("statename", "state") if c in columns), None)
+    if "pincode" not in columns:
+        print(f"Pincode master {path} has no pincode column; ignoring it.")
+        return None
+    pincodes = pd.to_numeric(df[columns["pincode"]].str.strip(), errors="coerce")
+
+    def names(column):
+        if column is None:
+            return [None] * len(df)
+        return [value.strip().title() if isinstance(value, str) and value.strip() else None for value in df[column]]
+
+    master = {}
+    for pincode, district_name, state_name in zip(pincodes, names(district), names(state)):
+        if pincode == pincode and 0 <= pincode < PINCODE_SPACE:  # not NaN
+            master.setdefault(int(pincode), (district_name, state_name))
+    print(f"Loaded {len(master)} pincodes from the pincode master {path}")
+    return master
+
+
+class PincodePrefixIndex:
+    """
+    Sorted array of every pincode a lender serves (plus every pincode in the
+    master, with 0 lenders). A prefix of k digits covers one contiguous range
+    of 6-digit values, found with two binary searches. Alongside each pincode
+    is a rank key, (lenders descending, pincode) packed into one integer, so
+    the best candidates are a partial sort of that slice only. Built on first
+    use, once per policy.
+    """
+
+    def __init__(self, index, master=None):
+        self.index = index
+        self.master = master
+        self._pincodes = None
+        self._sorted = None  # memoryview of _pincodes: bisect on it beats np.searchsorted per call
+        self._ranks = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_pincode_sets(cls, pincode_sets, master=None):
+        """Index over a policy's {lender: pincodes}; reuses their shared PincodeIndex when there is one."""
+        views = list(pincode_sets.values())
+        if views and isinstance(views[0], ServiceablePincodes):
+            return cls(views[0].index, master)
+        return cls(PincodeIndex(pincode_sets), master)
+
+    def _ensure_built(self):
+        if self._pincodes is not None:
+            return
+        with self._lock:
+            if self._pincodes is not None:
+                return
+            masks = self.index.masks
+            served = np.flatnonzero(masks)
+            counts = np.zeros(len(served), dtype=np.uint8)
+            served_masks = np.asarray(masks[served])
+            for bit in range(len(self.index.lenders)):
+                counts += ((served_masks >> bit) & 1).astype(np.uint8)
+            if self.master:
+                extra = np.setdiff1d(np.fromiter(self.master, dtype=np.int64), served)
+                extra = extra[(extra >= 0) & (extra < PINCODE_SPACE)]
+                served = np.concatenate([served, extra])
+                counts = np.concatenate([counts, np.zeros(len(extra), dtype=np.uint8)])
+                order = np.argsort(served, kind="stable")
+                served, counts = served[order], counts[order]
+            pincodes = served.astype(np.int32)
+            self._ranks = ((_MAX_LENDERS - counts.astype(np.int32)) << _RANK_SHIFT) | pincodes
+            self._sorted = memoryview(pincodes)
+            self._pincodes = pincodes  # last: readers check it without the lock
+
+    def _range(self, prefix):
+        scale = 10 ** (PINCODE_DIGITS - len(prefix))
+        low = int(prefix) * scale
+        return bisect_left(self._sorted, low), bisect_left(self._sorted, low + scale)
+
+    def _suggestion(self, pincode, lenders):
+        district, state = self.master.get(pincode, (None, None)) if self.master else (None, None)
+        return PincodeSuggestion(f"{pincode:06d}", lenders, district, state)
+
+    def count(self, prefix):
+        """Number of known pincodes starting with prefix (a string of 1-6 digits)."""
+        if not (prefix.isascii() and prefix.isdigit() and len(prefix) <= PINCODE_DIGITS):
+            return 0
+        self._ensure_built()
+        start, stop = self._range(prefix)
+        return stop - start
+
+    def complete(self, prefix, limit=8):
+        """
+        Up to limit PincodeSuggestions starting with prefix (a string of 1-6
+        digits), most lenders first, then in pincode order.
+        """
+        if not (prefix.isascii() and prefix.isdigit() and len(prefix) <= PINCODE_DIGITS) or limit <= 0:
+            return []
+        self._ensure_built()
+        start, stop = self._range(prefix)
+        ranks = self._ranks[start:stop]
+        best = np.partition(ranks, limit - 1)[:limit] if len(ranks) > limit else ranks.copy()
+        best.sort()
+        return [self._suggestion(rank & _PINCODE_MASK, _MAX_LENDERS - (rank >> _RANK_SHIFT))
+                for rank in best.tolist()]
+
+    def lookup(self, pincode):
+        """PincodeSuggestion for one pincode, or None when no lender serves it and the master lacks it."""
+        pincode = int(pincode)
+        lenders = bin(int(self.index.mask_for(pincode))).count("1")
+        if lenders == 0 and not (self.master and pincode in self.master):
+            return None
+        return self._suggestion(pincode, lenders)
@@ -0,0 +1,395 @@
+# policy_data.py
+"""
+Lender policy definitions and their data files, with no Streamlit dependency,
+so logic can be imported by batch jobs and scripts.
+
+Policies live in an external JSON file (data/policies.json, or $POLICY_FILE):
+per lender the thresholds and lists used by the checks, plus the pincode and
+negative-industry CSVs it draws on. The file is schema-validated on load.
+PolicyWatcher polls it and its CSVs so a running process can pick up changes
+(see logic.start_policy_watcher).
+
+Load problems are printed and collected in LOAD_ERRORS; utils shows them in
+the Streamlit UI. LOAD_TIMINGS holds how long each part of the last load took
+(exported by metrics). pandas is only imported when the CSVs have to be read,
+i.e. when the binary snapshot is missing or stale.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from industry import NegativeIndustrySet, normalize_industry
+from pincodes import PincodeIndex
+import snapshot
+
+POLICY_FILE = Path(os.environ.get("POLICY_FILE", "data/policies.json"))
+POLICY_SCHEMA_VERSION = 1
+
+# Messages from the last load (missing/unreadable files)
+LOAD_ERRORS = []
+# Seconds per part of the last load: definitions, snapshot or pincode_sets and
+# negative_industry_sets (CSV rebuild), total. Replaced whole on each load.
+LOAD_TIMINGS = {}
+
+# A loaded policy: validated definitions plus the tables built from their files
+Policy = namedtuple("Policy", ["revision", "lenders", "pincode_sets", "negative_industry_sets"])
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+class PolicyValidationError(ValueError):
+    """The policy file does not match the schema; .errors lists every problem."""
+
+    def __init__(self, path, errors):
+        self.errors = errors
+        super().__init__(f"Invalid policy file {path}:\n  " + "\n  ".join(errors))
+
+
+def _report_error(message, errors):
+    print(message)
+    errors.append(message)
+
+
+# --- POLICY FILE SCHEMA ---
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+def _string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _overrides(value):
+    return isinstance(value, dict) and all(
+        isinstance(override, dict) and set(override) <= {"min_vintage_years"}
+        and _number(override.get("min_vintage_years", 0))
+        for override in value.values()
+    )
+
+
+# Lenders' bits in the eligibility_mask column (bigint, sign bit unused)
+MAX_ELIGIBILITY_BIT = 62
+
+
+def _eligibility_bit(value):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_ELIGIBILITY_BIT
+
+
+# field -> (validator, description for error messages, required)
+LENDER_FIELDS = {
+    "description": (lambda v: isinstance(v, str), "a string", False),
+    "eligibility_bit": (_eligibility_bit, f"an integer from 0 to {MAX_ELIGIBILITY_BIT}", True),
+    "min_vintage_years": (_number, "a non-negative number", True),
+    "allowed_constitutions": (_string_list, "a list of strings", True),
+    "min_yearly_turnover": (_number, "a non-negative number", True),
+    "max_foir": (_number, "a non-negative number", True),
+    "pincode_file": (lambda v: isinstance(v, str) and v != "", "a file path", False),
+    "allowed_ownership": (_string_list, "a list of strings", True),
+    "negative_industry_file": (lambda v: isinstance(v, str) and v != "", "a file path", False),
+    "ntc_allowed": (lambda v: isinstance(v, bool), "true or false", True),
+    "allowed_loan_types": (_string_list, "a list of strings", False),
+    "ownership_overrides": (_overrides, 'an object like {"Both Rented": {"min_vintage_years": 2}}', False),
+}
+
+
+def validate_policy_definitions(document, path=POLICY_FILE):
+    """
+    Checks a parsed policy file against the schema and returns
+    (revision, {lender: fields}); raises PolicyValidationError listing every problem.
+    """
+    errors = []
+    if not isinstance(document, dict):
+        raise PolicyValidationError(path, ["top level must be an object"])
+    if document.get("schema_version") != POLICY_SCHEMA_VERSION:
+        errors.append(f"schema_version must be {POLICY_SCHEMA_VERSION}, got {document.get('schema_version')!r}")
+    revision = document.get("revision")
+    if not isinstance(revision, str) or not revision:
+        errors.append("revision must be a non-empty string")
+    unknown = set(document) - {"schema_version", "revision", "lenders"}
+    if unknown:
+        errors.append(f"unknown top-level keys: {', '.join(sorted(unknown))}")
+
+    lenders = document.get("lenders")
+    if not isinstance(lenders, dict) or not lenders:
+        errors.append("lenders must be a non-empty object")
+        lenders = {}
+    for lender, fields in lenders.items():
+        if not isinstance(fields, dict):
+            errors.append(f"{lender}: must be an object")
+            continue
+        for field, (is_valid, expected, required) in LENDER_FIELDS.items():
+            if field not in fields:
+                if required:
+                    errors.append(f"{lender}: {field} is required")
+            elif not is_valid(fields[field]):
+                errors.append(f"{lender}: {field} must be {expected}, got {fields[field]!r}")
+        for field in sorted(set(fields) - set(LENDER_FIELDS)):
+            errors.append(f"{lender}: unknown field {field}")
+
+    # Stored masks outlive policy edits: a bit must never be shared or reused
+    bits = {}
+    for lender, fields in lenders.items():
+        if isinstance(fields, dict) and _eligibility_bit(fields.get("eligibility_bit")):
+            bits.setdefault(fields["eligibility_bit"], []).append(lender)
+    for bit, owners in sorted(bits.items()):
+        if len(owners) > 1:
+            errors.append(f"eligibility_bit {bit} is used by more than one lender: {', '.join(owners)}")
+
+    if errors:
+        raise PolicyValidationError(path, errors)
+    return revision, lenders
+
+
+def read_policy_definitions(path=None):
+    """Reads and validates the policy file; returns (revision, {lender: fields})."""
+    path = POLICY_FILE if path is None else Path(path)
+    try:
+        document = json.loads(Path(path).read_text(encoding="utf-8"))
+    except ValueError as e:
+        raise PolicyValidationError(path, [f"not valid JSON: {e}"])
+    return validate_policy_definitions(document, path)
+
+
+def source_files(lenders):
+    """(pincode_files, negative_industry_files): lender -> CSV path, for lenders that have one."""
+    pincode_files = {lender: f["pincode_file"] for lender, f in lenders.items() if "pincode_file" in f}
+    negative_industry_files = {lender: f["negative_industry_file"] for lender, f in lenders.items()
+                               if "negative_industry_file" in f}
+    return pincode_files, negative_industry_files
+
+
+# --- POLICY DATA FILES ---
+def _read_pincode_csvs(pincode_files, errors):
+    """
+    Loads serviceable pincodes from CSV files into one shared PincodeIndex.
+    Returns the index; lenders whose file failed to load serve no pincodes.
+    """
+    pincode_sets = {}
+    # Each distinct file is read once; lenders sharing a file share its array
+    loaded_files = {}
+    for lender, filename in pincode_files.items():
+        try:
+            if filename not in loaded_files:
+                import pandas as pd  # only needed when (re)building from the CSVs
+                # Read the CSV file
+                df = pd.read_csv(filename)
+                loaded_files[filename] = df['pincode'].astype(int).to_numpy()
+
+            pincode_sets[lender] = loaded_files[filename]
+        except FileNotFoundError:
+            _report_error(f"Pincode file not found: {filename}. {lender} will have no pincode rules.", errors)
+            pincode_sets[lender] = [] # No serviceable pincodes
+        except Exception as e:
+            _report_error(f"Error loading {filename}: {e}", errors)
+            pincode_sets[lender] = []
+
+    # One shared bitmask index; each lender gets a read-only set view over it
+    index = PincodeIndex(pincode_sets)
+    for lender in index.lenders:
+        print(f"Loaded {len(index.view(lender))} pincodes for {lender}")
+    return index
+
+
+def _read_negative_industry_csvs(negative_industry_files, errors):
+    """
+    Loads negative industry terms from CSV files into a dictionary of NegativeIndustrySet.
+    """
+    negative_industry_sets = {}
+    # Each distinct file is read once and its matcher shared by every lender using it
+    loaded_files = {}
+    for lender,filename in negative_industry_files.items():
+        try:
+            if filename not in loaded_files:
+                import pandas as pd
+                df = pd.read_csv(filename)
+
+                # --- START FIX ---
+                # Clean and normalize the data: drop NAs, convert to string, collapse whitespace, and convert to lowercase
+                df_cleaned = df['negative_industries'].dropna().astype(str)
+                loaded_files[filename] = NegativeIndustrySet(t for t in map(normalize_industry, df_cleaned) if t)
+                # --- END FIX ---
+
+            negative_industry_sets[lender] = loaded_files[filename]
+            print(f"Loaded {len(negative_industry_sets[lender])} Negative Industries for {lender}")
+        except FileNotFoundError:
+            _report_error(f"Negative Industry file not found: {filename}. {lender} will have no rules.", errors)
+            negative_industry_sets[lender] = NegativeIndustrySet()
+        except Exception as e:
+            _report_error(f"Error loading {filename}: {e}", errors)
+            negative_industry_sets[lender] = NegativeIndustrySet()
+
+    return negative_industry_sets
+
+
+def build_policy_snapshot(path=None, lenders=None, errors=None, timings=None):
+    """
+    Reads the policy CSVs and writes them to the binary policy snapshot.
+    The snapshot is only written when every source file exists, so a missing
+    file keeps being reported until it is fixed.
+    Returns (pincode_sets, negative_industry_sets).
+    """
+    path = snapshot.SNAPSHOT_FILE if path is None else path
+    lenders = read_policy_definitions()[1] if lenders is None else lenders
+    errors = [] if errors is None else errors
+    timings = {} if timings is None else timings
+    pincode_files, negative_industry_files = source_files(lenders)
+    content_hash = snapshot.source_hash(pincode_files, negative_industry_files, lenders)
+    start = time.perf_counter()
+    index = _read_pincode_csvs(pincode_files, errors)
+    timings["pincode_sets"] = time.perf_counter() - start
+    start = time.perf_counter()
+    negative_industry_sets = _read_negative_industry_csvs(negative_industry_files, errors)
+    timings["negative_industry_sets"] = time.perf_counter() - start
+
+    all_files = set(pincode_files.values()) | set(negative_industry_files.values())
+    if all(Path(filename).exists() for filename in all_files):
+        try:
+            snapshot.write_snapshot(path, content_hash, index, negative_industry_sets)
+            # Switch to the memory-mapped copy so this process shares pages with the others
+            tables = snapshot.read_snapshot(path, content_hash)
+            if tables is not None:
+                return tables
+        except OSError as e:
+            print(f"Could not write policy snapshot {path}: {e}")
+
+    pincode_sets = {lender: index.view(lender) for lender in index.lenders}
+    return pincode_sets, negative_industry_sets
+
+
+def _read_policy_tables(lenders, errors, timings):
+    """
+    Returns (pincode_sets, negative_industry_sets), from the binary snapshot when
+    it matches the current source files and rules, else from the CSVs (rebuilding the snapshot).
+    The pincode bitmask is memory-mapped read-only, so every process on the host
+    shares one physical copy through the OS page cache.
+    """
+    start = time.perf_counter()
+    content_hash = snapshot.source_hash(*source_files(lenders), lenders)
+    tables = snapshot.read_snapshot(snapshot.SNAPSHOT_FILE, content_hash)
+    if tables is None:
+        # Only one worker rebuilds; the others wait and then map its snapshot
+        with snapshot.build_lock(snapshot.SNAPSHOT_FILE):
+            tables = snapshot.read_snapshot(snapshot.SNAPSHOT_FILE, content_hash)
+            if tables is None:
+                return build_policy_snapshot(lenders=lenders, errors=errors, timings=timings)
+    timings["snapshot"] = time.perf_counter() - start
+    print(f"Loaded policy snapshot {snapshot.SNAPSHOT_FILE}")
+    return tables
+
+
+def read_policy(path=None):
+    """Reads the policy file and its data files into a new Policy (uncached)."""
+    global LOAD_TIMINGS
+    start = time.perf_counter()
+    revision, lenders = read_policy_definitions(path)
+    timings = {"definitions": time.perf_counter() - start}
+    errors = []
+    pincode_sets, negative_industry_sets = _read_policy_tables(lenders, errors, timings)
+    timings["total"] = time.perf_counter() - start
+    LOAD_ERRORS[:] = errors
+    LOAD_TIMINGS = timings
+    return Policy(revision, lenders, pincode_sets, negative_industry_sets)
+
+
+def load_policy():
+    """The current Policy, read on first use and then kept for the process."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = read_policy()
+        return _policy
+
+
+def reload_policy():
+    """
+    Re-reads the policy file and data files and makes the result current.
+    Raises (keeping the current policy) if the file is invalid.
+    """
+    global _policy
+    policy = read_policy()
+    with _policy_lock:
+        _policy = policy
+    return policy
+
+
+def load_pincode_sets():
+    """
+    Returns a dictionary of lender -> ServiceablePincodes (a read-only set view
+    over one shared PincodeIndex).
+    """
+    return load_policy().pincode_sets
+
+
+def load_negative_industry_sets():
+    """
+    Returns a dictionary of lender -> NegativeIndustrySet.
+    """
+    return load_policy().negative_industry_sets
+
+
+# --- CHANGE DETECTION ---
+def source_fingerprint(path=None):
+    """
+    (size, mtime) of the policy file and of every data file it names; changes
+    whenever one of them is edited or replaced. Missing files count too.
+    """
+    path = POLICY_FILE if path is None else Path(path)
+    files = [path]
+    try:
+        pincode_files, negative_industry_files = source_files(read_policy_definitions(path)[1])
+        files += sorted(set(pincode_files.values()) | set(negative_industry_files.values()))
+    except (OSError, ValueError):
+        pass  # an unreadable/invalid file is still fingerprinted by its own stat below
+
+    fingerprint = []
+    for filename in files:
+        try:
+            stat = os.stat(filename)
+            fingerprint.append((str(filename), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            fingerprint.append((str(filename), None, None))
+    return tuple(fingerprint)
+
+
+class PolicyWatcher:
+    """
+    Polls source_fingerprint() every interval seconds on a daemon thread and
+    calls on_change() when it changes. Errors raised by on_change are printed
+    and the watcher keeps running (and retries on the next change).
+    """
+
+    def __init__(self, on_change, interval=5.0, path=None):
+        self.on_change = on_change
+        self.interval = interval
+        self.path = path
+        self._stop = threading.Event()
+        self._fingerprint = source_fingerprint(path)
+        self._thread = threading.Thread(target=self._run, name="policy-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """Runs one poll; returns True when a change was handled."""
+        fingerprint = source_fingerprint(self.path)
+        if fingerprint == self._fingerprint:
+            return False
+        self._fingerprint = fingerprint
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Policy reload failed, keeping the current policy: {e}")
+            LOAD_ERRORS.append(f"Policy reload failed, keeping the current policy: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
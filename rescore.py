@@ -0,0 +1,306 @@
+# rescore.py
+"""
+Policy-diff driven re-scoring of the eligibility stored in public.bdo_leads
+(eligibility_mask / eligibility_codes, see logic.encode_eligibility).
+
+The job compares the current policy (data/policies.json and its data files)
+with the baseline the stored results were last scored with, kept under
+data/scored_policy/. For every lender whose rule changed it derives which
+leads could be affected (e.g. pincodes added to or removed from the lender's
+list, leads whose FOIR lies above the lower of the old and new limits), reads
+only those rows, re-evaluates only the changed lenders (and any lender a row
+has no code for) and writes back only rows whose stored codes actually
+changed, in batches. The baseline is then advanced to the current policy.
+
+Without a baseline every stored lead is re-scored once; --unscored only
+scores rows that have no codes yet (e.g. after schema.py added the columns).
+
+Usage (from the repo root):
+    python rescore.py [--batch-size 1000] [--dry-run] [--unscored] [--baseline data/scored_policy]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import logic
+import policy_data
+import snapshot
+from industry import token_patterns
+from pincodes import PincodeIndex, ServiceablePincodes
+
+BASELINE_DIR = Path("data/scored_policy")
+BATCH_SIZE = 1000
+
+# CompiledRule fields compared directly; pincodes and negative_terms are
+# diffed by content (see _pincode_changes / _negative_term_changes)
+_RULE_FIELDS = ("eligibility_bit", "min_vintage", "min_vintage_label", "vintage_tip_floor", "constitutions", "min_turnover",
+                "min_turnover_label", "max_foir", "max_foir_label", "ownership", "ownership_overrides",
+                "ntc_allowed", "loan_types")
+
+
+# --- BASELINE ---
+def load_baseline(directory=BASELINE_DIR):
+    """The compiled rules the stored results were scored with, or None if no baseline exists."""
+    directory = Path(directory)
+    policy_file, tables_file = directory / "policies.json", directory / "policy_snapshot.npz"
+    if not policy_file.exists() or not tables_file.exists():
+        return None
+    try:
+        revision, lenders = policy_data.read_policy_definitions(policy_file)
+    except policy_data.PolicyValidationError as e:
+        print(f"Ignoring baseline: {e}")  # e.g. written by an older schema
+        return None
+    tables = snapshot.read_snapshot(tables_file, None)
+    if tables is None:
+        return None
+    policy = policy_data.Policy(revision, lenders, *tables)
+    return logic.compile_policy_rules(logic.build_policy_rules(policy))
+
+
+def save_baseline(policy, directory=BASELINE_DIR):
+    """Records policy as the one the stored results are now scored with."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    views = list(policy.pincode_sets.values())
+    index = views[0].index if views and isinstance(views[0], ServiceablePincodes) else PincodeIndex(policy.pincode_sets)
+    content_hash = snapshot.source_hash(*policy_data.source_files(policy.lenders), policy.lenders)
+    snapshot.write_snapshot(directory / "policy_snapshot.npz", content_hash, index, policy.negative_industry_sets)
+    tmp_path = directory / f".policies.json.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps({"schema_version": policy_data.POLICY_SCHEMA_VERSION,
+                                    "revision": policy.revision, "lenders": policy.lenders}, indent=4))
+    os.replace(tmp_path, directory / "policies.json")
+
+
+# --- POLICY DIFF ---
+def _pincode_changes(old, new):
+    """Pincodes whose serviceability differs between two rule pincode sets, or None for "all leads"."""
+    if old is None or new is None:
+        return None
+    if isinstance(old, ServiceablePincodes) and isinstance(new, ServiceablePincodes):
+        old_on = (np.asarray(old.index.masks) & old.bit) != 0
+        new_on = (np.asarray(new.index.masks) & new.bit) != 0
+        changed = set(np.flatnonzero(old_on != new_on).tolist())
+        changed |= {p for p, m in old.index.overflow_items() if m & old.bit} ^ {p for p, m in new.index.overflow_items() if m & new.bit}
+        return sorted(changed)
+    return sorted(set(old) ^ set(new))
+
+
+def _negative_term_changes(old, new):
+    """Terms whose presence (or first-match precedence) differs, or None for "all leads"."""
+    if old is None or new is None:
+        return None
+    old_terms, new_terms = list(old.terms), list(new.terms)
+    changed = set(old_terms) ^ set(new_terms)
+    common_old = [t for t in old_terms if t in new_terms]
+    common_new = [t for t in new_terms if t in old_terms]
+    if common_old != common_new:
+        # Reordering changes which term a reason names; any matching lead may change
+        changed |= set(common_old)
+    return sorted(changed)
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def lead_filters(old_rule, new_rule):
+    """
+    SQL conditions (with parameters) selecting the stored leads whose result for
+    this lender can differ between old_rule and new_rule. Returns [] when the
+    rules are equivalent and None when every lead has to be re-scored.
+    """
+    if old_rule is None or new_rule is None:
+        return None
+    changed = {field for field in _RULE_FIELDS if getattr(old_rule, field) != getattr(new_rule, field)}
+    if "eligibility_bit" in changed:
+        return None  # every stored code moves
+    pincodes = _pincode_changes(old_rule.pincodes, new_rule.pincodes)
+    negative_terms = _negative_term_changes(old_rule.negative_terms, new_rule.negative_terms)
+
+    filters = []
+    if changed & {"min_vintage", "min_vintage_label", "vintage_tip_floor"}:
+        # Failing under either threshold (reason text names the threshold)
+        filters.append(("vintage_years < %s", [max(old_rule.min_vintage, new_rule.min_vintage)]))
+    if "constitutions" in changed:
+        filters.append(("constitution_type = ANY(%s)", [sorted(old_rule.constitutions ^ new_rule.constitutions)]))
+    if changed & {"min_turnover", "min_turnover_label"}:
+        filters.append(("yearly_turnover < %s", [max(old_rule.min_turnover, new_rule.min_turnover)]))
+    if changed & {"max_foir", "max_foir_label"}:
+        filters.append(("foir > %s", [min(old_rule.max_foir, new_rule.max_foir)]))
+    if pincodes is None and (old_rule.pincodes is None) != (new_rule.pincodes is None):
+        return None
+    if pincodes:
+        values = sorted({str(p) for p in pincodes} | {f"{p:06d}" for p in pincodes if p >= 0})
+        filters.append(("pincode::text = ANY(%s)", [values]))
+    if negative_terms is None and (old_rule.negative_terms is None) != (new_rule.negative_terms is None):
+        return None
+    if negative_terms:
+        # Contains a term, or has a word shaped like each of a term's tokens (fuzzy hits)
+        clauses = ["lower(business_segment) LIKE ANY(%s)"]
+        params = [[_like_pattern(t) for t in negative_terms]]
+        for term in negative_terms:
+            patterns = token_patterns(term)
+            if patterns:
+                clauses.append("lower(business_segment) ~ ALL(%s)")
+                params.append(patterns)
+        filters.append((f"({' OR '.join(clauses)})", params))
+    if changed & {"ownership", "ownership_overrides"}:
+        statuses = set(old_rule.ownership ^ new_rule.ownership)
+        statuses |= {s for s in set(old_rule.ownership_overrides) | set(new_rule.ownership_overrides)
+                     if old_rule.ownership_overrides.get(s) != new_rule.ownership_overrides.get(s)}
+        filters.append(("ownership_status = ANY(%s)", [sorted(statuses)]))
+    if "ntc_allowed" in changed:
+        filters.append(("is_ntc IS TRUE", []))
+    if "loan_types" in changed:
+        filters.append(("requested_loan_type = ANY(%s)", [sorted(old_rule.loan_types ^ new_rule.loan_types)]))
+    return filters
+
+
+def diff_policies(old_rules, new_rules):
+    """
+    Returns {lender: filters} for every lender whose result can change (see
+    lead_filters), including added and removed lenders (filters None).
+    """
+    old_by_lender = {rule.lender: rule for rule in old_rules}
+    new_by_lender = {rule.lender: rule for rule in new_rules}
+    changes = {}
+    for lender in list(new_by_lender) + [l for l in old_by_lender if l not in new_by_lender]:
+        filters = lead_filters(old_by_lender.get(lender), new_by_lender.get(lender))
+        if filters is None or filters:
+            changes[lender] = filters
+    return changes
+
+
+# --- RE-SCORING ---
+def _candidate_query(changes, unscored_only=False):
+    """WHERE clause and parameters matching the union of every changed lender's filters."""
+    where = "lead_json IS NOT NULL" + (" AND eligibility_codes IS NULL" if unscored_only else "")
+    if any(filters is None for filters in changes.values()):
+        return where, []
+    clauses, params = [], []
+    for filters in changes.values():
+        for clause, clause_params in filters:
+            clauses.append(f"({clause})")
+            params.extend(clause_params)
+    return f"{where} AND ({' OR '.join(clauses)})", params
+
+
+def _as_dict(value):
+    if isinstance(value, dict):
+        return value
+    try:
+        parsed = json.loads(value) if value else {}
+    except (TypeError, ValueError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def rescore_leads(pool, changes, rules, batch_size=BATCH_SIZE, dry_run=False, progress=None, unscored_only=False):
+    """
+    Re-evaluates the changed lenders for the leads selected by changes and
+    writes back rows whose eligibility_mask/eligibility_codes differ. Reads and
+    writes in batches ordered by mobile_number (one transaction per batch).
+    Returns {"lenders", "candidates", "updated"}.
+    """
+    summary = {"lenders": len(changes), "candidates": 0, "updated": 0}
+    if not changes:
+        return summary
+    where, params = _candidate_query(changes, unscored_only)
+    query = (f"SELECT mobile_number, lead_json, eligibility_mask, eligibility_codes FROM public.bdo_leads "
+             f"WHERE {where} AND mobile_number > %s ORDER BY mobile_number LIMIT %s;")
+    # Re-scoring is not an edit of the lead: updated_at is left alone
+    update = ("UPDATE public.bdo_leads SET eligibility_mask = %s, eligibility_codes = %s::smallint[], "
+              "eligibility_results = %s WHERE mobile_number = %s;")
+
+    last_mobile = ""
+    while True:
+        def fetch(conn):
+            with conn.cursor() as cur:
+                cur.execute(query, params + [last_mobile, batch_size])
+                return cur.fetchall()
+
+        rows = pool.run(fetch)
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            stored_codes = list(row["eligibility_codes"] or [])
+            codes = logic.stored_reason_codes(stored_codes, rules)
+            lead_data = _as_dict(row["lead_json"])
+            parsed = logic.parse_lead(lead_data)
+            lookups = {}
+            for rule in rules:
+                # Changed lenders, and lenders this row was never scored for
+                if rule.lender in changes or rule.lender not in codes:
+                    codes[rule.lender] = logic.reason_code(rule, parsed, lookups)
+            mask, new_codes = logic.encode_eligibility(codes, rules)
+            if (mask, new_codes) != (row["eligibility_mask"], stored_codes):
+                # Keeps the legacy eligibility_results text in step with the codes
+                results = json.dumps(logic.describe_eligibility(lead_data, new_codes, rules))
+                updates.append((mask, new_codes, results, row["mobile_number"]))
+        summary["candidates"] += len(rows)
+        summary["updated"] += len(updates)
+        last_mobile = rows[-1]["mobile_number"]
+
+        if updates and not dry_run:
+            def write(conn):
+                import psycopg2.extras
+                with conn.cursor() as cur:
+                    psycopg2.extras.execute_batch(cur, update, updates, page_size=len(updates))
+                conn.commit()
+
+            pool.run(write)
+        if progress:
+            progress(summary)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored leads affected by a policy change.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count affected rows without writing")
+    parser.add_argument("--unscored", action="store_true", help="only score rows that have no eligibility codes yet")
+    parser.add_argument("--baseline", default=str(BASELINE_DIR), help="directory holding the last scored policy")
+    args = parser.parse_args(argv)
+
+    import utils
+    policy = policy_data.load_policy()
+    rules = logic.COMPILED_RULES
+    old_rules = None if args.unscored else load_baseline(args.baseline)
+    if args.unscored:
+        print("Scoring rows without eligibility codes.")
+        changes = {rule.lender: None for rule in rules}
+    elif old_rules is None:
+        print(f"No baseline in {args.baseline}: re-scoring every stored lead once.")
+        changes = {rule.lender: None for rule in rules}
+    else:
+        changes = diff_policies(old_rules, rules)
+    if not changes:
+        print("Policy unchanged since the last re-score; nothing to do.")
+    else:
+        for lender, filters in changes.items():
+            detail = "all leads" if filters is None else "; ".join(clause for clause, _ in filters)
+            print(f"  {lender}: {detail}")
+
+    start = time.perf_counter()
+    summary = rescore_leads(
+        utils.init_db_pool(), changes, rules, batch_size=args.batch_size, dry_run=args.dry_run,
+        unscored_only=args.unscored, progress=lambda s: print(f"  {s['candidates']} candidates read, {s['updated']} changed", end="\r"),
+    )
+    print()
+    verb = "would update" if args.dry_run else "updated"
+    print(f"{summary['lenders']} lender(s) changed; read {summary['candidates']} candidate leads, "
+          f"{verb} {summary['updated']} in {time.perf_counter() - start:.1f}s")
+    if not args.dry_run and not args.unscored:
+        save_baseline(policy, args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
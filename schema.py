@@ -0,0 +1,130 @@
+# schema.py
+"""
+Eligibility columns and indexes of public.bdo_leads.
+
+Eligibility is stored compactly rather than as a JSON text of English reasons
+(eligibility_results is still written, until its readers move to the codes):
+    eligibility_mask   bigint     bit N set when the lead is eligible for the
+                                  lender whose eligibility_bit is N
+                                  (data/policies.json)
+    eligibility_codes  smallint[] that lender's logic.REASON_* bits at index
+                                  N + 1 (SQL arrays are 1-based); NULL if the
+                                  lead was not scored for it
+The reasons are rebuilt for display by logic.describe_eligibility.
+
+Indexes cover the usual filters: status, bdo_name and updated_at, plus one
+partial index per lender over (status, updated_at) holding only the leads
+eligible for it. The planner only uses a partial index when the query spells
+the lender condition the same way, so build it with eligible_for_sql().
+
+Lead saves fail until this has run (utils.upsert_leads names this script).
+
+Usage (from the repo root), after adding a lender or on a fresh database:
+    python schema.py [--skip-backfill]
+Applies the DDL (idempotent; indexes are built CONCURRENTLY) and then scores
+every row that has no codes yet (rescore.py --unscored).
+"""
+import argparse
+import sys
+import time
+
+import logic
+
+LEAD_COLUMNS_SQL = [
+    "ALTER TABLE public.bdo_leads ADD COLUMN IF NOT EXISTS eligibility_mask bigint;",
+    "ALTER TABLE public.bdo_leads ADD COLUMN IF NOT EXISTS eligibility_codes smallint[];",
+]
+
+LEAD_INDEXES_SQL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS bdo_leads_status_updated_at ON public.bdo_leads (status, updated_at DESC);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS bdo_leads_bdo_name_updated_at ON public.bdo_leads (bdo_name, updated_at DESC);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS bdo_leads_updated_at ON public.bdo_leads (updated_at DESC);",
+]
+
+
+def _lender_rule(lender, rules=None):
+    rules = logic.COMPILED_RULES if rules is None else rules
+    for rule in rules:
+        if rule.lender == lender:
+            return rule
+    raise KeyError(f"Unknown lender {lender!r}")
+
+
+def eligible_for_sql(lender, rules=None):
+    """SQL condition matching leads eligible for lender (the predicate of its partial index)."""
+    return f"(eligibility_mask & {1 << _lender_rule(lender, rules).eligibility_bit}) <> 0"
+
+
+def reason_codes_sql(lender, rules=None):
+    """SQL expression for lender's stored REASON_* bits (NULL when not scored)."""
+    return f"eligibility_codes[{_lender_rule(lender, rules).eligibility_bit + 1}]"
+
+
+def lender_index_sql(rules=None):
+    """One partial (status, updated_at) index per lender, keyed by its eligibility bit."""
+    rules = logic.COMPILED_RULES if rules is None else rules
+    return [
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS bdo_leads_eligible_bit{rule.eligibility_bit} "
+        f"ON public.bdo_leads (status, updated_at DESC) WHERE {eligible_for_sql(rule.lender, rules)};"
+        for rule in rules
+    ]
+
+
+def eligible_leads_query(lender, status=None, bdo_name=None, since=None, limit=1000, rules=None):
+    """
+    (sql, params) listing leads eligible for lender, newest first, optionally
+    filtered by status, bdo_name and updated_at >= since.
+    """
+    clauses, params = [eligible_for_sql(lender, rules)], []
+    for clause, value in (("status = %s", status), ("bdo_name = %s", bdo_name), ("updated_at >= %s", since)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    sql = (f"SELECT mobile_number, firm_name, bdo_name, status, updated_at FROM public.bdo_leads "
+           f"WHERE {' AND '.join(clauses)} ORDER BY updated_at DESC LIMIT %s;")
+    return sql, params + [limit]
+
+
+def apply_schema(pool, rules=None):
+    """Runs the column and index DDL; CREATE INDEX CONCURRENTLY needs autocommit."""
+    statements = LEAD_COLUMNS_SQL + LEAD_INDEXES_SQL + lender_index_sql(rules)
+
+    def run(conn):
+        conn.commit()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                for statement in statements:
+                    print(f"  {statement}")
+                    cur.execute(statement)
+        finally:
+            conn.autocommit = False
+
+    pool.run(run)
+    return len(statements)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add the eligibility columns and indexes to public.bdo_leads.")
+    parser.add_argument("--skip-backfill", action="store_true", help="do not score rows that have no codes yet")
+    args = parser.parse_args(argv)
+
+    import rescore
+    import utils
+    pool = utils.init_db_pool()
+    start = time.perf_counter()
+    applied = apply_schema(pool)
+    print(f"Applied {applied} statements in {time.perf_counter() - start:.1f}s")
+    if not args.skip_backfill:
+        rules = logic.COMPILED_RULES
+        summary = rescore.rescore_leads(
+            pool, {rule.lender: None for rule in rules}, rules, unscored_only=True,
+            progress=lambda s: print(f"  {s['updated']} leads scored", end="\r"),
+        )
+        print()
+        print(f"Scored {summary['updated']} of {summary['candidates']} leads without eligibility codes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
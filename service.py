@@ -0,0 +1,221 @@
+# service.py
+"""
+Eligibility HTTP service over logic.check_eligibility, for systems other than
+the Streamlit page (partner-lead intake, CRM).
+
+Endpoints (JSON in, JSON out):
+    POST /eligibility        one lead dict        -> {lender: {eligible, reasons, tips}}
+    POST /eligibility/batch  {"leads": [...]}     -> {"results": [{lender: ...}, ...]}
+                             {"leads": [...], "mode": "fast"}
+                                                  -> {"results": [{lender: true/false}, ...]}
+    GET  /health                                  -> {"status": "ok", "revision": ..., "lenders": N}
+    GET  /industry?q=<segment>                    -> {"canonical": [{name, confidence}, ...],
+                                                        "negative": {lender: {term, confidence, exact}}}
+    GET  /industry?q=<partial text>&suggest=1     -> {"suggestions": [canonical name, ...]}
+    GET  /pincodes?prefix=<1-6 digits>[&limit=8] -> {"count": N, "pincodes": [{pincode, lenders,
+                                                                        district, state}, ...]}
+    GET  /metrics                                 -> Prometheus text (see metrics; needs ELIGIBILITY_METRICS=1)
+
+"fast" mode only answers whether each lender accepts each lead, stopping at the
+first failing check (logic.eligibility_flags); use it for ranking and filtering.
+
+Each connection is served by its own thread, so a slow client or a large batch
+does not hold up other requests. With --workers N the listening socket is
+shared by N forked processes (POSIX only); policy data is loaded once, before
+the fork, and its memory-mapped tables are shared between the workers.
+Each worker watches data/policies.json and swaps in edited policies without
+a restart. Metrics are kept per process, so with several workers /metrics
+reports whichever worker answered the scrape.
+
+Run locally (from the repo root):
+    python service.py [--host 127.0.0.1] [--port 8502] [--workers 1] [--metrics]
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import logic
+import metrics
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_BATCH_LEADS = 1000
+
+_INVALID = object()  # request body rejected (error response already sent)
+
+
+class EligibilityHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True  # headers and body are separate writes; don't wait for the ACK
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status, text, content_type="text/plain; version=0.0.4; charset=utf-8"):
+        body = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        """Returns the parsed request body, or _INVALID after sending an error response."""
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self._send_json(413 if length > 0 else 400, {"error": "Missing or oversized request body."})
+            self.close_connection = True  # the unread body would corrupt the next request
+            return _INVALID
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return _INVALID
+
+    def _respond(self, handler):
+        """
+        Runs handler() for the current request. An unexpected error becomes a JSON
+        500 response instead of a connection closed without one.
+        """
+        try:
+            handler()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # client went away; nothing to answer
+        except Exception as e:
+            print(f"Eligibility service error on {self.command} {self.path}: {e!r}", file=sys.stderr)
+            self._send_json(500, {"error": f"Internal error ({e.__class__.__name__})."})
+
+    def do_GET(self):
+        self._respond(self._get)
+
+    def do_POST(self):
+        self._respond(self._post)
+
+    def _get(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok", "revision": logic.POLICY.revision, "lenders": len(logic.COMPILED_RULES)})
+        elif url.path == "/industry":
+            query = parse_qs(url.query)
+            text = query.get("q", [""])[0]
+            if query.get("suggest", ["0"])[0] not in ("", "0"):
+                self._send_json(200, {"suggestions": logic.INDUSTRY_INDEX.suggest(text)})
+                return
+            match = logic.INDUSTRY_INDEX.match(text)
+            self._send_json(200, {"canonical": [c._asdict() for c in match.canonical],
+                                  "negative": {lender: hit._asdict() for lender, hit in match.negative.items()}})
+        elif url.path == "/pincodes":
+            query = parse_qs(url.query)
+            prefix = query.get("prefix", [""])[0]
+            try:
+                limit = min(int(query.get("limit", ["8"])[0]), 100)
+            except ValueError:
+                limit = -1
+            if not (prefix.isascii() and prefix.isdigit() and len(prefix) <= 6) or limit < 0:
+                self._send_json(400, {"error": "Expected ?prefix=<1-6 digits>[&limit=N]."})
+                return
+            self._send_json(200, {"count": logic.PINCODE_INDEX.count(prefix),
+                                  "pincodes": [s._asdict() for s in logic.PINCODE_INDEX.complete(prefix, limit)]})
+        elif url.path == "/metrics":
+            self._send_text(200, metrics.render())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def _post(self):
+        path = urlsplit(self.path).path
+        if path not in ("/eligibility", "/eligibility/batch"):
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        payload = self._read_json()
+        if payload is _INVALID:
+            return
+
+        if path == "/eligibility":
+            if not isinstance(payload, dict):
+                self._send_json(400, {"error": "Expected a lead object."})
+                return
+            self._send_json(200, logic.check_eligibility(payload))
+            return
+
+        leads = payload.get("leads") if isinstance(payload, dict) else payload
+        mode = payload.get("mode", "full") if isinstance(payload, dict) else "full"
+        if not isinstance(leads, list) or not all(isinstance(lead, dict) for lead in leads):
+            self._send_json(400, {"error": "Expected {\"leads\": [lead, ...]}."})
+            return
+        if mode not in ("full", "fast"):
+            self._send_json(400, {"error": f"Unknown mode {mode!r}; expected \"full\" or \"fast\"."})
+            return
+        if len(leads) > MAX_BATCH_LEADS:
+            self._send_json(413, {"error": f"At most {MAX_BATCH_LEADS} leads per batch."})
+            return
+        evaluate = logic.eligibility_flags if mode == "fast" else logic.check_eligibility
+        self._send_json(200, {"results": [evaluate(lead) for lead in leads]})
+
+    def log_message(self, format, *args):
+        pass  # no per-request logging on the hot path
+
+
+class EligibilityServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(host="127.0.0.1", port=8502, workers=1, reload_interval=5.0):
+    server = EligibilityServer((host, port), EligibilityHandler)
+    print(f"Eligibility service on http://{host}:{server.server_address[1]} ({workers} worker(s), "
+          f"{len(logic.COMPILED_RULES)} lenders)", flush=True)
+    # SIGTERM unwinds through the finally below, so the parent also stops its workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    children = []
+    if workers > 1:
+        for _ in range(workers - 1):
+            pid = os.fork()
+            if pid == 0:
+                children = []
+                break
+            children.append(pid)
+    if reload_interval > 0:
+        logic.start_policy_watcher(reload_interval)  # threads do not survive fork, so one per worker
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve lender eligibility over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the socket (POSIX only)")
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="seconds between policy file checks (0 disables hot reload)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="record per-check timings for GET /metrics (same as ELIGIBILITY_METRICS=1)")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    if args.workers > 1 and not hasattr(os, "fork"):
+        sys.exit("--workers needs os.fork; run one process per port instead.")
+    serve(args.host, args.port, args.workers, args.reload_interval)
+
+
+if __name__ == "__main__":
+    main()
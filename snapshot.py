@@ -0,0 +1,184 @@
+# snapshot.py
+"""
+Precompiled binary snapshot of the policy data files (pincode and
+negative-industry CSVs) for fast cold starts.
+
+The snapshot is one uncompressed .npz holding the shared pincode bitmask
+array, the negative-industry term lists and a JSON header with the format
+version and a content hash of the source files and the lender rule
+definitions (thresholds and lists from data/policies.json), so it belongs
+to exactly one POLICY_RULES. The bitmask array is
+memory-mapped read-only straight out of the .npz, so loading it copies
+nothing and all processes on a host share the same physical pages.
+A rebuild replaces the file atomically; processes still mapping the old
+file keep a valid mapping until they reload.
+
+Build (or rebuild) from the repo root:  python snapshot.py
+"""
+import hashlib
+import json
+import mmap
+import os
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+
+from industry import NegativeIndustrySet
+from pincodes import PincodeIndex
+
+SNAPSHOT_VERSION = 3  # 2: terms normalized with industry.normalize_industry; 3: rules in source_hash
+SNAPSHOT_FILE = Path(os.environ.get("POLICY_SNAPSHOT_FILE", "data/policy_snapshot.npz"))
+
+
+def source_hash(pincode_files, negative_industry_files, rules):
+    """
+    Content hash of the lender -> file mappings, every source file and the
+    lender rule definitions ({lender: fields} as validated by policy_data).
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([SNAPSHOT_VERSION, pincode_files, negative_industry_files, rules], sort_keys=True).encode())
+    for filename in sorted(set(pincode_files.values()) | set(negative_industry_files.values())):
+        digest.update(filename.encode())
+        try:
+            digest.update(Path(filename).read_bytes())
+        except FileNotFoundError:
+            digest.update(b"\0missing")
+    return digest.hexdigest()
+
+
+def write_snapshot(path, content_hash, pincode_index, negative_industry_sets):
+    """
+    Writes the snapshot atomically (temp file + rename), so a reader never sees
+    a half-written file.
+    """
+    path = Path(path)
+    distinct_sets = []
+    negative_lenders = {}
+    for lender, terms in negative_industry_sets.items():
+        for i, known in enumerate(distinct_sets):
+            if known is terms:
+                break
+        else:
+            i = len(distinct_sets)
+            distinct_sets.append(terms)
+        negative_lenders[lender] = i
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "source_hash": content_hash,
+        "pincode_lenders": list(pincode_index.lenders),
+        "negative_lenders": negative_lenders,
+    }
+    arrays = {
+        "header": np.array(json.dumps(header)),
+        "masks": np.asarray(pincode_index.masks),
+        "overflow": np.array(pincode_index.overflow_items(), dtype=np.int64).reshape(-1, 2),
+    }
+    for i, terms in enumerate(distinct_sets):
+        for name, array in terms.to_arrays().items():
+            arrays[f"negative_{i}_{name}"] = array
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as fh:
+        np.savez(fh, **arrays)  # savez stores members uncompressed, so masks can be mmapped
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def build_lock(path):
+    """
+    Exclusive inter-process lock around a snapshot rebuild (a no-op where
+    fcntl is unavailable).
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = Path(path).with_name(f".{Path(path).name}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _mmap_member(fh, name):
+    """
+    Memory-maps one uncompressed .npy member of an .npz read-only, through the
+    already open file fh: the offset is computed from, and the mapping taken
+    of, the same file even if the path is replaced meanwhile.
+    """
+    with zipfile.ZipFile(fh) as archive:
+        info = archive.getinfo(f"{name}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{name} is compressed and cannot be memory-mapped")
+    # Local file header: 30 fixed bytes, then file name and extra field
+    fh.seek(info.header_offset + 26)
+    name_len, extra_len = np.frombuffer(fh.read(4), dtype="<u2")
+    fh.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+    version = np.lib.format.read_magic(fh)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fh)
+    offset = fh.tell()
+    count = int(np.prod(shape))
+    if count == 0:
+        return np.zeros(shape, dtype=dtype)
+    mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)  # stays valid after fh is closed
+    return np.frombuffer(mapped, dtype=dtype, count=count, offset=offset).reshape(
+        shape, order="F" if fortran_order else "C")
+
+
+def read_snapshot(path, content_hash):
+    """
+    Loads (pincode_sets, negative_industry_sets) from the snapshot, or returns
+    None when it is missing, from another format version or built from
+    different source files or rules (content_hash=None accepts any).
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        # One open file for the header, the term lists and the masks: a rebuild
+        # that replaces the path meanwhile cannot pair one file's header with
+        # another file's masks
+        with open(path, "rb") as fh, np.load(fh, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("version") != SNAPSHOT_VERSION:
+                return None
+            if content_hash is not None and header.get("source_hash") != content_hash:
+                return None
+            overflow = {int(pincode): int(mask) for pincode, mask in data["overflow"]}
+            distinct_sets = {}
+            for lender, i in header["negative_lenders"].items():
+                if i not in distinct_sets:
+                    distinct_sets[i] = NegativeIndustrySet.from_arrays(
+                        data[f"negative_{i}_terms"].tolist(),
+                        data[f"negative_{i}_edges"],
+                        data[f"negative_{i}_fail"],
+                        data[f"negative_{i}_outputs"],
+                    )
+            masks = _mmap_member(fh, "masks")
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+    index = PincodeIndex.from_arrays(header["pincode_lenders"], masks, overflow)
+    pincode_sets = {lender: index.view(lender) for lender in index.lenders}
+    negative_industry_sets = {lender: distinct_sets[i] for lender, i in header["negative_lenders"].items()}
+    return pincode_sets, negative_industry_sets
+
+
+if __name__ == "__main__":
+    import policy_data
+    policy_data.build_policy_snapshot()
+    print(f"Wrote {SNAPSHOT_FILE}")
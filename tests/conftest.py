@@ -0,0 +1,10 @@
+# tests/conftest.py
+# The modules read data/ relative to the working directory and are imported
+# as top-level modules, so tests run from the repo root like the app does.
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+os.chdir(ROOT)
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,37 @@
+# tests/test_audit.py
+import copy
+
+import pytest
+
+import audit
+import logic
+
+
+def test_csv_resume_skips_records_not_lines(tmp_path):
+    path = tmp_path / "leads.csv"
+    path.write_text('mobile_number,remarks\n'
+                    '9000000001,"called twice,\nno answer"\n'
+                    '9000000002,\n'
+                    '9000000003,"line one\nline two\nline three"\n'
+                    '9000000004,\n'
+                    '9000000005,\n')
+    for chunk_size in (1, 2, 10):
+        resumed = [m for chunk in audit.read_csv_chunks(path, chunk_size, skip=2) for m in chunk["mobile_number"]]
+        assert resumed == ["9000000003", "9000000004", "9000000005"]
+    assert list(audit.read_csv_chunks(path, 2, skip=5)) == []
+
+
+def test_policy_change_without_new_revision_cannot_resume(tmp_path):
+    output = tmp_path / "audit.csv"
+    output.write_text("mobile_number\n")
+    progress = audit._load_progress(output, "leads.csv", audit.policy_hash(), restart=False)
+    audit._save_progress(output, dict(progress, rows=1, bytes=14))
+    assert audit._load_progress(output, "leads.csv", audit.policy_hash(), restart=False)["rows"] == 1
+
+    lenders = copy.deepcopy(logic.POLICY.lenders)
+    lender = next(iter(lenders))
+    lenders[lender]["max_foir"] = lenders[lender]["max_foir"] + 0.05
+    changed = logic.POLICY._replace(lenders=lenders)
+    assert changed.revision == logic.POLICY.revision
+    with pytest.raises(SystemExit, match="--restart"):
+        audit._load_progress(output, "leads.csv", audit.policy_hash(changed), restart=False)
@@ -0,0 +1,56 @@
+# tests/test_bulk.py
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+import bench
+import bulk
+import logic
+
+
+def _scalar_codes(lead):
+    # A null cell stands for a field not captured yet, i.e. a key absent from lead_data
+    present = {key: value for key, value in lead.items()
+               if value is not None and not (isinstance(value, float) and math.isnan(value))}
+    return logic.reason_codes(logic.COMPILED_RULES, logic.parse_lead(present))
+
+
+def _assert_parity(leads_df, leads):
+    eligible, codes = bulk.check_eligibility_bulk(leads_df)
+    lenders = [rule.lender for rule in logic.COMPILED_RULES]
+    assert list(codes.columns) == lenders
+    expected = np.array([_scalar_codes(lead) for lead in leads], dtype=np.uint16)
+    mismatches = np.argwhere(codes.to_numpy() != expected)
+    assert not len(mismatches), [(leads[i], lenders[j], codes.iat[i, j], expected[i, j]) for i, j in mismatches[:5]]
+    assert (eligible.to_numpy() == (expected == 0)).all()
+
+
+def test_bulk_matches_scalar_on_generated_leads():
+    leads = bench.make_leads(3000, seed=7)
+    _assert_parity(pd.DataFrame.from_records(leads), leads)
+
+
+def test_bulk_matches_scalar_on_edge_leads():
+    leads = bench.make_edge_leads(3000, seed=11)
+    _assert_parity(pd.DataFrame.from_records(leads), leads)
+
+
+def test_bulk_null_cells_match_absent_keys():
+    leads = [{"mobile_number": "9000000001"}, {field: None for field in bulk.LEAD_FIELDS}]
+    leads_df = pd.DataFrame.from_records(leads, columns=["mobile_number", *bulk.LEAD_FIELDS])
+    _, codes = bulk.check_eligibility_bulk(leads_df)
+    expected = logic.reason_codes(logic.COMPILED_RULES, logic.parse_lead({}))
+    assert codes.iloc[0].tolist() == expected
+    assert codes.iloc[1].tolist() == expected
+
+
+def test_bulk_reads_fields_missing_as_columns_from_lead_json():
+    leads = bench.make_leads(50, seed=3)
+    leads_df = pd.DataFrame({
+        "mobile_number": [lead["mobile_number"] for lead in leads],
+        "pincode": [lead["pincode"] for lead in leads],
+        "lead_json": [json.dumps(lead) for lead in leads],
+    })
+    _assert_parity(leads_df, leads)
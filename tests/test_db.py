@@ -0,0 +1,154 @@
+# tests/test_db.py
+import pytest
+
+from db import ConnectionPool
+
+
+class OperationalError(Exception):
+    """Like psycopg2.OperationalError: dropped connections and some server errors."""
+
+
+class QueryCanceledError(OperationalError):
+    """Like psycopg2's statement_timeout error: the connection stays usable."""
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.closed or self.conn.dropped:
+            raise OperationalError("server closed the connection unexpectedly")
+        if self.conn.aborted:
+            raise OperationalError("current transaction is aborted, commands ignored until end of transaction block")
+        self.conn.statements.append(query)
+
+    def fetchone(self):
+        return (1,)
+
+
+class FakeConnection:
+    """DB-API connection with psycopg2's aborted-transaction behaviour after an error."""
+
+    def __init__(self):
+        self.closed = 0
+        self.dropped = False   # socket gone, but closed not updated yet
+        self.aborted = False
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.closed or self.dropped:
+            raise OperationalError("connection already closed")
+        self.aborted = False
+
+    def commit(self):
+        self.rollback()
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections():
+    return []
+
+
+@pytest.fixture
+def pool(connections):
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+    return ConnectionPool(connect, minconn=1, maxconn=2, disconnect_errors=(OperationalError,))
+
+
+def test_statement_timeout_is_raised_once_and_keeps_connection(pool, connections):
+    calls = []
+
+    def operation(conn):
+        calls.append(conn)
+        conn.aborted = True
+        raise QueryCanceledError("canceling statement due to statement timeout")
+
+    with pytest.raises(QueryCanceledError):
+        pool.run(operation)
+    assert len(calls) == 1
+    assert len(connections) == 1 and not connections[0].closed
+    # The connection went back to the pool usable, with its transaction rolled back
+    assert pool.run(lambda conn: conn) is connections[0]
+    assert not connections[0].aborted
+
+
+@pytest.mark.parametrize("closed_flag", [True, False])
+def test_disconnect_is_retried_on_a_new_connection(pool, connections, closed_flag):
+    calls = []
+
+    def operation(conn):
+        calls.append(conn)
+        if len(calls) == 1:
+            # psycopg2 sets closed on a dropped socket; other drivers only fail the next call
+            if closed_flag:
+                conn.closed = 2
+            else:
+                conn.dropped = True
+            raise OperationalError("server closed the connection unexpectedly")
+        return "saved"
+
+    assert pool.run(operation) == "saved"
+    assert len(calls) == 2 and calls[0] is not calls[1]
+    assert connections[0].closed and not connections[1].closed
+
+
+def test_timeout_then_disconnect(pool, connections):
+    calls = []
+
+    def operation(conn):
+        calls.append(conn)
+        if len(calls) == 1:
+            conn.aborted = True
+            raise QueryCanceledError("canceling statement due to statement timeout")
+        if len(calls) == 2:
+            conn.dropped = True
+            raise OperationalError("server closed the connection unexpectedly")
+        return "saved"
+
+    with pytest.raises(QueryCanceledError):
+        pool.run(operation)
+    assert pool.run(operation) == "saved"
+    assert len(calls) == 3
+    assert calls[0] is calls[1] and calls[2] is not calls[1]
+    assert len(connections) == 2 and connections[0].closed
+
+
+def test_retries_are_bounded(pool, connections):
+    def operation(conn):
+        conn.closed = 2
+        raise OperationalError("server closed the connection unexpectedly")
+
+    with pytest.raises(OperationalError):
+        pool.run(operation, retries=1)
+    assert len(connections) == 2 and all(conn.closed for conn in connections)
+
+
+def test_connection_context_discards_only_dead_connections(pool, connections):
+    with pytest.raises(QueryCanceledError):
+        with pool.connection() as conn:
+            conn.aborted = True
+            raise QueryCanceledError("canceling statement due to statement timeout")
+    assert not connections[0].closed
+
+    with pytest.raises(OperationalError):
+        with pool.connection() as conn:
+            conn.dropped = True
+            raise OperationalError("server closed the connection unexpectedly")
+    assert connections[0].closed
+    with pool.connection() as conn:
+        assert conn is not connections[0]
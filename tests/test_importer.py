@@ -0,0 +1,112 @@
+# tests/test_importer.py
+import pandas as pd
+import pytest
+
+import importer
+import utils
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    """Runs operations like db.ConnectionPool.run: once more on a new connection after a disconnect."""
+    disconnect_errors = (ConnectionError,)
+
+    def __init__(self):
+        self.attempts = 0
+
+    def run(self, operation, retries=1):
+        for attempt in range(retries + 1):
+            self.attempts += 1
+            try:
+                return operation(FakeConnection())
+            except self.disconnect_errors:
+                if attempt >= retries:
+                    raise
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    """{mobile: status} of the leads upserted; mobiles starting 8 are rejected by the database."""
+    saved = {}
+
+    def upsert_leads(conn, items, commit=True):
+        for lead, status in items:
+            if lead["mobile_number"].startswith("8"):
+                raise ValueError(f"value too long for {lead['mobile_number']}")
+        for lead, status in items:
+            saved[lead["mobile_number"]] = status
+
+    monkeypatch.setattr(utils, "upsert_leads", upsert_leads)
+    return saved
+
+
+def _write_leads(tmp_path, rows):
+    path = tmp_path / "leads.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+def test_rows_keep_their_own_status(tmp_path, saved):
+    path = _write_leads(tmp_path, [
+        {"mobile_number": "9000000001", "status": "draft"},
+        {"mobile_number": "9000000002", "status": ""},
+        {"mobile_number": "9000000003", "status": " active "},
+    ])
+    summary, errors = importer.import_leads(path, pool=FakePool())
+    assert errors == [] and summary["imported"] == 3
+    assert saved == {"9000000001": "draft", "9000000002": importer.DEFAULT_STATUS, "9000000003": "active"}
+
+
+def test_explicit_status_overrides_rows(tmp_path, saved):
+    path = _write_leads(tmp_path, [{"mobile_number": "9000000001", "status": "draft"},
+                                   {"mobile_number": "9000000002"}])
+    importer.import_leads(path, pool=FakePool(), status="archived")
+    assert saved == {"9000000001": "archived", "9000000002": "archived"}
+
+
+def test_status_option_defaults_to_rows_own(tmp_path, saved, monkeypatch):
+    path = _write_leads(tmp_path, [{"mobile_number": "9000000001", "status": "draft"}])
+    monkeypatch.setattr(utils, "init_db_pool", FakePool)
+    assert importer.main([str(path), "--errors", str(tmp_path / "errors.csv")]) == 0
+    assert saved == {"9000000001": "draft"}
+
+
+def test_replayed_chunk_reports_each_error_once(tmp_path, saved, monkeypatch):
+    path = _write_leads(tmp_path, [{"mobile_number": m} for m in ("9000000001", "8000000002", "9000000003")])
+    upsert_leads = utils.upsert_leads
+    dropped = []
+
+    def flaky_upsert(conn, items, commit=True):
+        # The connection drops on the row after the rejected one, on the first attempt only
+        if not dropped and items[0][0]["mobile_number"] == "9000000003" and len(items) == 1:
+            dropped.append(True)
+            raise ConnectionError("server closed the connection unexpectedly")
+        return upsert_leads(conn, items, commit)
+
+    monkeypatch.setattr(utils, "upsert_leads", flaky_upsert)
+    pool = FakePool()
+    summary, errors = importer.import_leads(path, pool=pool)
+    assert pool.attempts == 2
+    assert [error["row"] for error in errors] == [2]
+    assert summary == {"rows": 3, "imported": 2, "duplicates": 0, "failed": 1}
@@ -0,0 +1,85 @@
+# tests/test_industry.py
+import logic
+from industry import IndustryIndex, NegativeIndustrySet
+
+
+def test_first_match_is_earliest_term_in_csv_order():
+    terms = NegativeIndustrySet(["broker", "real estate", "estate", "real estate broker"])
+    text = "real estate broker"
+    assert terms.find_all(text) == ("broker", "real estate", "estate", "real estate broker")
+    # Not the term that starts first, ends first or is longest in the text
+    assert terms.first_match(text) == "broker"
+    assert NegativeIndustrySet(["real estate broker", "broker"]).first_match(text) == "real estate broker"
+
+
+def test_duplicate_terms_keep_first_position():
+    terms = NegativeIndustrySet(["dsa", "loan agent", "dsa"])
+    assert terms.terms == ("dsa", "loan agent")
+    assert terms.first_match("loan agent dsa") == "dsa"
+
+
+def test_reason_names_first_term_of_lender_csv():
+    # data/bajaj_negative_industry.csv lists "dsa" before "loan agent"
+    terms = logic.NEGATIVE_INDUSTRIES["Bajaj (Term Loan)"].terms
+    assert terms.index("dsa") < terms.index("loan agent")
+    result = logic.check_eligibility({"business_segment": "Loan Agent / DSA"})["Bajaj (Term Loan)"]
+    assert "Industry 'Loan Agent / DSA' is negative (contains 'dsa')." in result["reasons"]
+
+
+def _rules_with_terms(terms):
+    policy_rules = {lender: dict(rules) for lender, rules in logic.POLICY_RULES.items()}
+    for rules in policy_rules.values():
+        if "negative_industry" in rules:
+            rules["negative_industry"] = terms
+    return logic.compile_policy_rules(policy_rules, taxonomy=[])
+
+
+def test_own_rules_get_fuzzy_hits_from_their_own_index(monkeypatch):
+    rules = _rules_with_terms(["scrap dealer"])
+    # A reload swapped in an index that has never seen these rules' lists
+    monkeypatch.setattr(logic, "INDUSTRY_INDEX", IndustryIndex())
+    results = logic.evaluate_lead({"business_segment": "Scrapp Dealers"}, rules)
+    bajaj = results["Bajaj (Term Loan)"]
+    assert bajaj.code & logic.REASON_NEGATIVE_INDUSTRY
+    assert "Industry 'Scrapp Dealers' is negative (close to 'scrap dealer', 92% match)." in bajaj.reasons
+    assert not logic.eligibility_flags({"business_segment": "Scrapp Dealers"}, rules)["Bajaj (Term Loan)"]
+
+
+def test_bulk_uses_the_index_of_its_rules(monkeypatch):
+    import pandas as pd
+    import bulk
+    rules = _rules_with_terms(["scrap dealer"])
+    monkeypatch.setattr(logic, "INDUSTRY_INDEX", IndustryIndex())
+    _, codes = bulk.check_eligibility_bulk(pd.DataFrame({"business_segment": ["Scrapp Dealers", "Kirana"]}), rules)
+    assert codes["Bajaj (Term Loan)"].tolist()[0] & logic.REASON_NEGATIVE_INDUSTRY
+    assert not codes["Bajaj (Term Loan)"].tolist()[1] & logic.REASON_NEGATIVE_INDUSTRY
+
+
+def test_compiled_rules_share_the_global_index():
+    indexes = {id(rule.industry_index) for rule in logic.COMPILED_RULES}
+    assert indexes == {id(logic.INDUSTRY_INDEX)}
+
+
+class _ClearedCache(dict):
+    """A cache another thread clears right after every write."""
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.clear()
+
+
+def test_match_survives_cache_cleared_concurrently():
+    terms = NegativeIndustrySet(["scrap dealer"])
+    index = IndustryIndex([("Scrap Trading", ("scrap dealer",))], {"Lender": terms})
+    index._match_cache = _ClearedCache()
+    match = index.match("Scrapp Dealers")
+    assert match.negative["Lender"].term == "scrap dealer"
+    assert match.canonical[0].name == "Scrap Trading"
+
+
+def test_fuzzy_tie_goes_to_earliest_term_in_csv_order():
+    # Both terms match "Brass Zinc Tradr" equally well; "brass" is looked up first
+    index = IndustryIndex([], {"Lender": NegativeIndustrySet(["zinc trader", "brass trader"])})
+    assert index.match("Brass Zinc Tradr").negative["Lender"].term == "zinc trader"
+    index = IndustryIndex([], {"Lender": NegativeIndustrySet(["brass trader", "zinc trader"])})
+    assert index.match("Brass Zinc Tradr").negative["Lender"].term == "brass trader"
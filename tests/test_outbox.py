@@ -0,0 +1,138 @@
+# tests/test_outbox.py
+import pytest
+
+from outbox import FAILED, PENDING, RETRYING, SYNCED, LeadOutbox
+
+
+class FakeLeadTable:
+    """flush() target: keeps the last saved lead per mobile; fails for mobiles in reject."""
+
+    def __init__(self):
+        self.rows = {}
+        self.calls = []
+        self.reject = set()
+        self.down = False
+
+    def flush(self, items):
+        self.calls.append([lead["mobile_number"] for lead, _ in items])
+        if self.down:
+            raise ConnectionError("could not connect to server")
+        bad = [lead["mobile_number"] for lead, _ in items if lead["mobile_number"] in self.reject]
+        if bad:
+            raise ValueError(f"rejected {bad[0]}")
+        for lead, status in items:
+            self.rows[lead["mobile_number"]] = (lead["version"], status)
+
+
+@pytest.fixture
+def table():
+    return FakeLeadTable()
+
+
+def _outbox(tmp_path, table, **kwargs):
+    return LeadOutbox(tmp_path / "outbox.sqlite3", flush=table.flush, **kwargs)
+
+
+def test_older_save_never_overwrites_newer(tmp_path, table):
+    outbox = _outbox(tmp_path, table, retry_base_seconds=60)
+    outbox.enqueue({"mobile_number": "9000000001", "version": 1})
+    table.down = True
+    assert outbox.drain_once() == 0
+    assert outbox.sync_state("9000000001")[0] == RETRYING
+
+    table.down = False
+    outbox.enqueue({"mobile_number": "9000000001", "version": 2})
+    assert outbox.drain_once() == 2  # v2 synced, backed-off v1 dropped with it
+    assert table.rows["9000000001"] == (2, "draft")
+    assert outbox.sync_state("9000000001") == (SYNCED, None)
+    assert outbox.pending_count() == 0
+
+
+def test_only_newest_save_per_mobile_is_claimed(tmp_path, table):
+    outbox = _outbox(tmp_path, table, retry_base_seconds=0)
+    outbox.enqueue({"mobile_number": "9000000001", "version": 1})
+    table.down = True
+    outbox.drain_once()  # v1 fails and is due again at once
+    outbox.enqueue({"mobile_number": "9000000001", "version": 2})
+    table.down = False
+    assert outbox.drain_once() == 2
+    assert table.calls[-1] == ["9000000001"]
+    assert table.rows["9000000001"] == (2, "draft")
+
+
+def test_mobile_in_flight_is_not_claimed_again(tmp_path, table):
+    outbox = _outbox(tmp_path, table)
+    outbox.enqueue({"mobile_number": "9000000001", "version": 1})
+    in_flight = outbox._claim_batch()
+    outbox.enqueue({"mobile_number": "9000000001", "version": 2})
+    # Another worker must not send v2 while v1 may still land after it
+    assert outbox._claim_batch() == []
+
+    outbox._settle(in_flight, [], None)
+    assert outbox.sync_state("9000000001")[0] == PENDING  # v2 still queued
+    assert outbox.drain_once() == 1
+    assert outbox.sync_state("9000000001") == (SYNCED, None)
+    assert outbox.pending_lead("9000000001") is None
+
+
+def test_expired_lease_is_claimed_again(tmp_path, table):
+    outbox = _outbox(tmp_path, table, lease_seconds=0)
+    outbox.enqueue({"mobile_number": "9000000001", "version": 1})
+    assert len(outbox._claim_batch()) == 1  # worker dies before settling
+    assert outbox.drain_once() == 1
+    assert table.rows["9000000001"] == (1, "draft")
+
+
+def test_rejected_row_does_not_hold_back_its_batch(tmp_path, table):
+    outbox = _outbox(tmp_path, table, retry_base_seconds=60)
+    table.reject.add("9000000002")
+    for mobile in ("9000000001", "9000000002", "9000000003"):
+        outbox.enqueue({"mobile_number": mobile, "version": 1}, status="active")
+
+    assert outbox.drain_once() == 2
+    assert set(table.rows) == {"9000000001", "9000000003"}
+    assert outbox.sync_state("9000000001") == (SYNCED, None)
+    assert outbox.sync_state("9000000002") == (FAILED, "rejected 9000000002")
+    assert outbox.pending_count() == 1
+    # Backed off on its own; the next drain has nothing due
+    assert outbox.drain_once() == 0
+
+
+def test_unreachable_database_retries_whole_batch(tmp_path, table):
+    outbox = _outbox(tmp_path, table, retry_base_seconds=0)
+    table.down = True
+    for mobile in ("9000000001", "9000000002"):
+        outbox.enqueue({"mobile_number": mobile, "version": 1})
+    assert outbox.drain_once() == 0
+    assert outbox.sync_state("9000000001")[0] == RETRYING
+    assert outbox.sync_state("9000000002")[0] == RETRYING
+
+    table.down = False
+    assert outbox.drain_once() == 2
+    assert table.rows == {"9000000001": (1, "draft"), "9000000002": (1, "draft")}
+
+
+def test_row_whose_lease_expired_mid_drain_is_not_flushed(tmp_path, table):
+    outbox = _outbox(tmp_path, table, retry_base_seconds=60)
+    other = _outbox(tmp_path, table)  # another process sharing the outbox file
+    table.reject.add("9000000002")
+    for mobile in ("9000000001", "9000000002", "9000000003"):
+        outbox.enqueue({"mobile_number": mobile, "version": 1})
+    flush = outbox.flush
+
+    def slow_flush(items):
+        flush(items)
+        if [lead["mobile_number"] for lead, _ in items] == ["9000000001"]:
+            # The row fallback outlasts 9000000003's lease; the other process
+            # claims the number and syncs a newer save
+            other._db.execute("UPDATE leases SET leased_until = 0 WHERE mobile_number = '9000000003';")
+            other.enqueue({"mobile_number": "9000000003", "version": 2})
+            assert other.drain_once() == 2
+
+    outbox.flush = slow_flush
+    assert outbox.drain_once() == 1
+    assert table.rows["9000000003"] == (2, "draft")
+    assert ["9000000003"] not in table.calls[table.calls.index(["9000000002"]):]
+    assert outbox.sync_state("9000000003") == (SYNCED, None)
+    assert outbox.sync_state("9000000002")[0] == FAILED
+    assert outbox.pending_count() == 1
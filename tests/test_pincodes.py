@@ -0,0 +1,43 @@
+# tests/test_pincodes.py
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from pincodes import PincodeIndex, PincodePrefixIndex
+
+
+@pytest.fixture
+def view():
+    return PincodeIndex({"A": [560001, 110001, 1_234_567], "B": [400080]}).view("A")
+
+
+@pytest.mark.parametrize("value", [560001, 560001.0, np.int64(560001), np.float64(560001.0), Decimal(560001),
+                                   1_234_567, 1_234_567.0])
+def test_membership_matches_a_set_of_ints(view, value):
+    assert value in view
+    assert value in set(view)
+
+
+@pytest.mark.parametrize("value", ["560001", 560001.5, float("nan"), float("inf"), None, 400080, -1])
+def test_non_members(view, value):
+    assert value not in view
+    assert value not in set(view)
+
+
+def test_unhashable_values_are_not_members(view):
+    assert [560001] not in view
+
+
+@pytest.mark.parametrize("prefix", ["56", "560001"])
+def test_prefix_completion(prefix):
+    prefixes = PincodePrefixIndex(PincodeIndex({"A": [560001, 110001], "B": [560001, 560002]}))
+    assert prefixes.count(prefix) == (2 if prefix == "56" else 1)
+    assert prefixes.complete(prefix)[0].pincode == "560001"
+
+
+@pytest.mark.parametrize("prefix", ["", "²", "5६", "56a", "5600011"])
+def test_non_ascii_digit_prefixes_match_nothing(prefix):
+    prefixes = PincodePrefixIndex(PincodeIndex({"A": [560001]}))
+    assert prefixes.count(prefix) == 0
+    assert prefixes.complete(prefix) == []
@@ -0,0 +1,112 @@
+# tests/test_rescore.py
+import re
+
+import pytest
+
+import bench
+import logic
+import rescore
+
+LENDER = "Bajaj (Term Loan)"
+
+
+def _column(lead, name):
+    """The public.bdo_leads column a filter reads, as utils._lead_params stores it."""
+    if name == "is_ntc":
+        return bool(lead.get("is_ntc"))
+    if name in ("vintage_years", "yearly_turnover", "foir"):
+        return logic._parse_float(lead.get(name))
+    value = lead.get(name)
+    return None if value is None else str(value)
+
+
+def _like(text, pattern):
+    return pattern.strip("%") in text
+
+
+# Python equivalents of the SQL conditions lead_filters produces
+_CLAUSES = [
+    (r"(\w+) < %s", lambda lead, col, p: _column(lead, col) is not None and _column(lead, col) < p.pop(0)),
+    (r"(\w+) > %s", lambda lead, col, p: _column(lead, col) is not None and _column(lead, col) > p.pop(0)),
+    (r"(\w+)(?:::text)? = ANY\(%s\)", lambda lead, col, p: _column(lead, col) in p.pop(0)),
+    (r"(is_ntc) IS TRUE", lambda lead, col, p: _column(lead, col) is True),
+]
+
+
+def _matches(lead, clause, params):
+    params = list(params)
+    if clause.startswith("("):  # negative terms: LIKE ANY / ~ ALL alternatives
+        segment = _column(lead, "business_segment")
+        if segment is None:
+            return False
+        segment = segment.lower()
+        for part in clause[1:-1].split(" OR "):
+            values = params.pop(0)
+            if "LIKE ANY" in part and any(_like(segment, v) for v in values):
+                return True
+            if "~ ALL" in part and all(re.search(v, segment) for v in values):
+                return True
+        return False
+    for pattern, test in _CLAUSES:
+        found = re.fullmatch(pattern, clause)
+        if found:
+            return test(lead, found.group(1), params)
+    raise AssertionError(f"unhandled filter {clause}")
+
+
+def _rules_with(change):
+    # Changes replace values, so copying one level keeps POLICY_RULES intact
+    policy_rules = {lender: dict(rules) for lender, rules in logic.POLICY_RULES.items()}
+    change(policy_rules[LENDER])
+    return logic.compile_policy_rules(policy_rules)
+
+
+CHANGES = {
+    "vintage": lambda r: r.update(min_vintage_years=2),
+    "constitutions": lambda r: r.update(allowed_constitutions=r["allowed_constitutions"] + ["Others"]),
+    "turnover": lambda r: r.update(min_yearly_turnover=3000000),
+    "foir": lambda r: r.update(max_foir=0.3),
+    "pincodes": lambda r: r.update(allowed_pincodes=set(r["allowed_pincodes"]) ^ {110001, 560001, 999999}),
+    "negative_terms": lambda r: r.update(negative_industry=[t for t in r["negative_industry"].terms
+                                                             if t not in ("dsa", "real estate", "jewellery")]),
+    "ownership": lambda r: r.update(ownership_overrides={"Both Rented": {"min_vintage_years": 2}}),
+    "ntc": lambda r: r.update(ntc_allowed=False),
+    "loan_types": lambda r: r.update(allowed_loan_types=["Term Loan", "OD"]),
+}
+
+
+@pytest.mark.parametrize("name", list(CHANGES))
+def test_filters_select_every_lead_whose_result_changes(name):
+    old_rules = logic.COMPILED_RULES
+    new_rules = _rules_with(CHANGES[name])
+    changes = rescore.diff_policies(old_rules, new_rules)
+    assert list(changes) == [LENDER]
+    filters = changes[LENDER]
+    assert filters
+
+    old_rule = next(rule for rule in old_rules if rule.lender == LENDER)
+    new_rule = next(rule for rule in new_rules if rule.lender == LENDER)
+    leads = bench.make_form_leads(2000, seed=13) + bench.make_captured_leads(1000, seed=13)
+    leads += [{"business_segment": s, "pincode": "110001"}
+              for s in ("Real  Estate Agent", "JEWELLERY shop", "dsa", "Jewelery Shop", "Dsa Agency")]
+    affected = selected = 0
+    for lead in leads:
+        parsed = logic.parse_lead(lead)
+        old = logic.evaluate_rule(old_rule, parsed)
+        new = logic.evaluate_rule(new_rule, parsed)
+        hit = any(_matches(lead, clause, params) for clause, params in filters)
+        selected += hit
+        if old != new:
+            affected += 1
+            assert hit, (lead, old, new)
+    assert affected, "the change should affect some leads"
+    assert selected < len(leads), "the filters should not select every lead"
+
+
+def test_unchanged_policy_has_no_changes():
+    assert rescore.diff_policies(logic.COMPILED_RULES, _rules_with(lambda r: None)) == {}
+
+
+def test_moved_eligibility_bit_rescores_everything():
+    rules = _rules_with(lambda r: r.update(eligibility_bit=40))
+    assert rescore.diff_policies(logic.COMPILED_RULES, rules) == {LENDER: None}
@@ -0,0 +1,127 @@
+# tests/test_service.py
+import http.client
+import json
+import threading
+
+import pytest
+
+import logic
+import service
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = service.EligibilityServer(("127.0.0.1", 0), service.EligibilityHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, payload=None, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        if payload is not None:
+            body = json.dumps(payload)
+        conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = response.read()
+        is_json = response.getheader("Content-Type") == "application/json"
+        return response.status, json.loads(data) if is_json else data.decode()
+    finally:
+        conn.close()
+
+
+MALFORMED_LEADS = [
+    {"pincode": [1]},
+    {"pincode": {"a": 1}},
+    {"pincode": 1e400},
+    {"pincode": True, "vintage_years": [2], "yearly_turnover": {"x": 1}, "foir": "-inf"},
+    {"constitution_type": ["LLP"], "ownership_status": {"a": 1}, "requested_loan_type": [], "is_ntc": [True]},
+    {"business_segment": ["dsa"], "yearly_turnover": float("-inf")},
+]
+
+
+@pytest.mark.parametrize("lead", MALFORMED_LEADS)
+def test_malformed_lead_gets_a_json_answer(server, lead):
+    status, results = _request(server, "POST", "/eligibility", body=json.dumps(lead))
+    assert status == 200
+    assert set(results) == {rule.lender for rule in logic.COMPILED_RULES}
+    assert all(isinstance(result["reasons"], list) for result in results.values())
+
+
+def test_non_scalar_pincode_is_invalid(server):
+    status, results = _request(server, "POST", "/eligibility", {"pincode": [1]})
+    assert status == 200
+    reasons = results["Kotak (Term Loan)"]["reasons"]
+    assert "Pincode '[1]' is invalid." in reasons
+
+
+@pytest.mark.parametrize("mode", ["full", "fast"])
+def test_batch_with_malformed_leads(server, mode):
+    leads = MALFORMED_LEADS + [{"pincode": "110001", "vintage_years": 5}]
+    status, payload = _request(server, "POST", "/eligibility/batch", {"leads": leads, "mode": mode})
+    assert status == 200
+    assert len(payload["results"]) == len(leads)
+    if mode == "fast":
+        assert payload["results"][-1] == logic.eligibility_flags(leads[-1])
+    else:
+        assert payload["results"][-1] == json.loads(json.dumps(logic.check_eligibility(leads[-1])))
+
+
+@pytest.mark.parametrize("payload, status", [
+    ([1, 2], 400),                           # /eligibility expects one lead object
+    ({"leads": [1]}, 400),
+    ({"leads": [{}], "mode": "slow"}, 400),
+])
+def test_bad_requests_get_400(server, payload, status):
+    path = "/eligibility" if isinstance(payload, list) else "/eligibility/batch"
+    assert _request(server, "POST", path, payload)[0] == status
+
+
+def test_invalid_json_gets_400(server):
+    status, payload = _request(server, "POST", "/eligibility", body="{not json")
+    assert status == 400 and "Invalid JSON" in payload["error"]
+
+
+def test_unexpected_error_gets_500(server, monkeypatch):
+    def broken(lead_data):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(logic, "check_eligibility", broken)
+    status, payload = _request(server, "POST", "/eligibility", {"pincode": "110001"})
+    assert status == 500 and payload == {"error": "Internal error (RuntimeError)."}
+    # The server keeps answering
+    monkeypatch.undo()
+    assert _request(server, "POST", "/eligibility", {"pincode": "110001"})[0] == 200
+
+
+@pytest.mark.parametrize("path", ["/health", "/health?probe=lb", "/metrics?x=1"])
+def test_get_routes_ignore_query_string(server, path):
+    status, payload = _request(server, "GET", path)
+    assert status == 200
+    if path.startswith("/health"):
+        assert payload == {"status": "ok", "revision": logic.POLICY.revision, "lenders": len(logic.COMPILED_RULES)}
+
+
+@pytest.mark.parametrize("path", ["/eligibility?source=crm", "/eligibility/batch?source=crm"])
+def test_post_routes_ignore_query_string(server, path):
+    payload = {"pincode": "110001"} if "batch" not in path else {"leads": [{"pincode": "110001"}]}
+    assert _request(server, "POST", path, payload)[0] == 200
+
+
+def test_unknown_path_gets_404(server):
+    assert _request(server, "GET", "/healthz")[0] == 404
+    assert _request(server, "POST", "/eligibility/other", {})[0] == 404
+
+
+@pytest.mark.parametrize("query", ["prefix=%C2%B2", "prefix=5%E0%A5%AC", "prefix=abc", "prefix=5600011", "prefix=56&limit=x"])
+def test_bad_pincode_prefix_gets_400(server, query):
+    status, payload = _request(server, "GET", f"/pincodes?{query}")
+    assert status == 400 and "prefix" in payload["error"]
+
+
+def test_pincode_prefix_completion(server):
+    status, payload = _request(server, "GET", "/pincodes?prefix=56&limit=3")
+    assert status == 200 and len(payload["pincodes"]) <= 3 and payload["count"] >= len(payload["pincodes"])
@@ -0,0 +1,86 @@
+# tests/test_snapshot.py
+import copy
+import mmap
+import os
+
+import numpy as np
+
+import bench
+import logic
+import policy_data
+import snapshot
+
+
+def _csv_tables(lenders):
+    pincode_files, negative_industry_files = policy_data.source_files(lenders)
+    index = policy_data._read_pincode_csvs(pincode_files, [])
+    pincode_sets = {lender: index.view(lender) for lender in index.lenders}
+    return pincode_sets, policy_data._read_negative_industry_csvs(negative_industry_files, [])
+
+
+def test_snapshot_round_trip_matches_csvs(tmp_path):
+    _, lenders = policy_data.read_policy_definitions()
+    path = tmp_path / "policy_snapshot.npz"
+    policy_data.build_policy_snapshot(path=path, lenders=lenders)
+    content_hash = snapshot.source_hash(*policy_data.source_files(lenders), lenders)
+    pincode_sets, negative_sets = snapshot.read_snapshot(path, content_hash)
+    csv_pincodes, csv_negative = _csv_tables(lenders)
+
+    assert {lender: set(view) for lender, view in pincode_sets.items()} == \
+        {lender: set(view) for lender, view in csv_pincodes.items()}
+    assert {lender: terms.terms for lender, terms in negative_sets.items()} == \
+        {lender: terms.terms for lender, terms in csv_negative.items()}
+    # Masks are mapped read-only out of the file, not copied
+    masks = next(iter(pincode_sets.values())).index.masks
+    base = masks.base
+    while isinstance(base, (np.ndarray, memoryview)):
+        base = base.base if isinstance(base, np.ndarray) else base.obj
+    assert isinstance(base, mmap.mmap) and not masks.flags.writeable
+
+
+def test_snapshot_and_csv_tables_score_leads_identically(tmp_path):
+    revision, lenders = policy_data.read_policy_definitions()
+    path = tmp_path / "policy_snapshot.npz"
+    policy_data.build_policy_snapshot(path=path, lenders=lenders)
+    tables = snapshot.read_snapshot(path, None)
+    from_snapshot = logic.compile_policy_rules(logic.build_policy_rules(policy_data.Policy(revision, lenders, *tables)))
+    from_csvs = logic.compile_policy_rules(logic.build_policy_rules(
+        policy_data.Policy(revision, lenders, *_csv_tables(lenders))))
+
+    for lead in bench.make_form_leads(500, seed=5) + bench.make_edge_leads(500, seed=5):
+        parsed = logic.parse_lead(lead)
+        assert logic.reason_codes(from_snapshot, parsed) == logic.reason_codes(from_csvs, parsed)
+
+
+def test_rule_changes_invalidate_snapshot(tmp_path):
+    _, lenders = policy_data.read_policy_definitions()
+    path = tmp_path / "policy_snapshot.npz"
+    policy_data.build_policy_snapshot(path=path, lenders=lenders)
+    content_hash = snapshot.source_hash(*policy_data.source_files(lenders), lenders)
+    assert snapshot.read_snapshot(path, content_hash) is not None
+
+    changed = copy.deepcopy(lenders)
+    lender = next(iter(changed))
+    changed[lender]["max_foir"] = changed[lender]["max_foir"] + 0.05
+    changed_hash = snapshot.source_hash(*policy_data.source_files(changed), changed)
+    assert changed_hash != content_hash
+    assert snapshot.read_snapshot(path, changed_hash) is None
+
+
+def test_rebuild_during_read_does_not_mix_files(tmp_path, monkeypatch):
+    from pincodes import PincodeIndex
+    from industry import NegativeIndustrySet
+    path, other = tmp_path / "policy_snapshot.npz", tmp_path / "other.npz"
+    snapshot.write_snapshot(path, "a", PincodeIndex({"A": [110001], "B": [560001]}), {"A": NegativeIndustrySet(["dsa"])})
+    # Same size, different lender layout and masks
+    snapshot.write_snapshot(other, "b", PincodeIndex({"B": [110001], "A": [400080]}), {"A": NegativeIndustrySet(["dsa"])})
+    mmap_member = snapshot._mmap_member
+
+    def replaced_meanwhile(fh, name):
+        os.replace(other, path)  # a rebuild lands between reading the header and mapping the masks
+        return mmap_member(fh, name)
+
+    monkeypatch.setattr(snapshot, "_mmap_member", replaced_meanwhile)
+    pincode_sets, _ = snapshot.read_snapshot(path, "a")
+    assert set(pincode_sets["A"]) == {110001}
+    assert set(pincode_sets["B"]) == {560001}
@@ -0,0 +1,41 @@
+# tests/test_utils.py
+import json
+
+import psycopg2.errors
+import pytest
+
+import logic
+import utils
+
+
+class FakeConnection:
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+
+def test_saves_keep_writing_eligibility_results():
+    lead = {"mobile_number": "9000000001", "pincode": "110001", "vintage_years": 5,
+            "business_segment": "Loan Agent / DSA", "eligibility_results": {"stale": True}}
+    params = utils._lead_params(lead, "draft")
+    assert "eligibility_results" in utils.UPSERT_LEAD_SQL.split("VALUES")[0]
+    assert "%(eligibility_results)s" in utils.UPSERT_LEAD_TEMPLATE
+    assert json.loads(params["eligibility_results"]) == json.loads(json.dumps(logic.check_eligibility(lead)))
+    assert "eligibility_results" not in json.loads(params["lead_json"])
+
+
+def test_missing_columns_name_the_migration(monkeypatch):
+    def execute_values(cur, sql, rows, template=None, page_size=100):
+        raise psycopg2.errors.UndefinedColumn('column "eligibility_mask" of relation "bdo_leads" does not exist')
+
+    monkeypatch.setattr(utils.psycopg2.extras, "execute_values", execute_values)
+    with pytest.raises(RuntimeError, match="python schema.py"):
+        utils.upsert_leads(FakeConnection(), [({"mobile_number": "9000000001"}, "draft")])
@@ -1,20 +1,52 @@
 # ui_capture.py
 import streamlit as st
 import json
+import pandas as pd
+import capacity
 import logic
 import utils
-from datetime import datetime
+import export
+from datetime import datetime, timedelta
+
+def _use_segment(name):
+    """Replaces the typed business segment with a suggested canonical industry."""
+    st.session_state['segment_input'] = name
+
+
+def _use_pincode(pincode):
+    """Completes a partly typed pincode with a suggested one."""
+    st.session_state['pincode_input'] = pincode
+
+
+def _pincode_place(suggestion):
+    """' (District, State)' from the pincode master, or '' when unknown."""
+    place = ", ".join(part for part in (suggestion.district, suggestion.state) if part) if suggestion else ""
+    return f" ({place})" if place else ""
+
 
 def display_lead_capture():
     """
     Renders the Lead Capture view and the Eligibility Board.
     """
+    # Pick up edits to data/policies.json without a restart (one watcher per process)
+    logic.start_policy_watcher()
+    # Missing/unreadable policy files
+    utils.show_policy_load_errors()
+
     # Initialize session state
     if 'step' not in st.session_state:
         st.session_state.step = 0
         st.session_state.lead_data = {}
         st.session_state.eligibility_results = {}
 
+    def refresh_eligibility():
+        # Per-session incremental checker: reruns that did not touch a rule-relevant
+        # field reuse the previous board, and an edit re-runs only its own checks
+        if '_eligibility' not in st.session_state:
+            st.session_state['_eligibility'] = logic.IncrementalEligibility()
+        st.session_state.eligibility_results = st.session_state['_eligibility'].update(st.session_state.lead_data)
+        return st.session_state.eligibility_results
+
     if '_lead_to_restore' in st.session_state:
         payload = st.session_state.pop('_lead_to_restore')
         lead = payload.get('lead', {}) or {}
@@ -43,7 +75,7 @@ def display_lead_capture():
 
         # Selectboxes / text fields (must match your widget keys & exact option strings)
         st.session_state['ownership_input'] = lead.get('ownership_status', "")
-        st.session_state['segment_input'] = lead.get('business_segment', "")
+        st.session_state['segment_input'] = lead.get('business_segment') or None
         st.session_state['nature_input'] = lead.get('nature_of_business', "")
         st.session_state['constitution_input'] = lead.get('constitution_type', "")
         st.session_state['gender_input'] = lead.get('gender', "")
@@ -102,7 +134,7 @@ def display_lead_capture():
                 st.session_state['step'] = st.session_state.get('step', 1)
 
         # Recompute eligibility
-        st.session_state['eligibility_results'] = logic.check_eligibility(st.session_state['lead_data'])
+        refresh_eligibility()
 
     # def save_lead_to_storage(is_draft=True):
     #     # uses utils.save_lead_to_excel
@@ -117,7 +149,8 @@ def display_lead_capture():
     def save_lead_to_storage(is_draft=True):
         try:
             status = 'draft' if is_draft else 'active'
-            ok = utils.save_lead_to_db(st.session_state.lead_data, status=status)
+            # Queued locally and upserted in the background; see the sidebar sync status
+            ok = utils.queue_lead_save(st.session_state.lead_data, status=status)
             return ok
         except Exception as e:
             st.error(f"Failed to save lead: {e}")
@@ -132,7 +165,8 @@ def display_lead_capture():
 
     def load_draft_from_storage(mobile):
         try:
-            return utils.load_draft_from_db(mobile)
+            # A save still waiting in the local queue is newer than the database row
+            return utils.load_pending_draft(mobile) or utils.load_draft_from_db(mobile)
         except Exception as e:
             st.error(f"Failed to load draft: {e}")
             return None
@@ -142,6 +176,43 @@ def display_lead_capture():
         st.session_state.clear()
         st.rerun()
 
+    # Sync status of the current lead's saves
+    current_mobile = st.session_state.lead_data.get('mobile_number')
+    if current_mobile:
+        sync_state, sync_error = utils.lead_sync_state(current_mobile)
+        if sync_state == "synced":
+            st.sidebar.caption("☁️ Saved to database")
+        elif sync_state == "pending":
+            st.sidebar.caption("⏳ Saved locally, syncing to database...")
+        elif sync_state == "retrying":
+            st.sidebar.caption(f"⚠️ Saved locally, database sync will retry: {sync_error}")
+        elif sync_state == "failed":
+            st.sidebar.caption(f"❌ Saved locally, but the database rejected this lead (will retry): {sync_error}")
+
+    # Export of the lead table, built only when the download is clicked
+    with st.sidebar.expander("📥 Export leads"):
+        export_format = st.selectbox("Format", export.FORMATS, key="export_format")
+        export_status = st.text_input("Status", key="export_status").strip() or None
+        export_bdo = st.text_input("BDO Name", key="export_bdo").strip() or None
+        export_range = st.date_input("Updated between", value=(), key="export_range")
+        export_since = datetime.combine(export_range[0], datetime.min.time()) if len(export_range) > 0 else None
+        export_until = (datetime.combine(export_range[1], datetime.min.time()) + timedelta(days=1)
+                        if len(export_range) > 1 else None)
+
+        def build_export():
+            return export.export_to_tempfile(
+                utils.init_db_pool(), export_format,
+                status=export_status, bdo_name=export_bdo, since=export_since, until=export_until,
+            )
+
+        st.download_button(
+            label="Download",
+            data=build_export,
+            file_name=f"leads.{export_format}",
+            mime=export.MIME_TYPES[export_format],
+            on_click="ignore",
+        )
+
     # --- UI LAYOUT ---
     chat_col, board_col = st.columns([1, 1])
 
@@ -202,6 +273,25 @@ def display_lead_capture():
                 if pincode.isdigit() and len(pincode) == 6:
                     st.session_state.lead_data['pincode'] = pincode
                     if st.session_state.step == 3: st.session_state.step = 4
+                    # Serviceability up front, before the rest of the form is filled
+                    served = logic.PINCODE_INDEX.lookup(pincode)
+                    if served is None or served.lenders == 0:
+                        st.warning(f"No lender serves pincode {pincode}{_pincode_place(served)}.")
+                    else:
+                        st.caption(f"Served by {served.lenders} of {len(logic.COMPILED_RULES)} lenders{_pincode_place(served)}")
+                elif pincode.isdigit():
+                    # Partial pincode: offer the known pincodes starting with it, most lenders first
+                    candidates = logic.PINCODE_INDEX.complete(pincode, limit=6)
+                    if candidates:
+                        st.caption(f"{logic.PINCODE_INDEX.count(pincode)} known pincodes start with {pincode}:")
+                        columns = st.columns(3)
+                        for i, candidate in enumerate(candidates):
+                            columns[i % 3].button(
+                                f"{candidate.pincode} · {candidate.lenders} lenders", key=f"pincode_suggestion_{candidate.pincode}",
+                                help=_pincode_place(candidate).strip(" ()") or None,
+                                on_click=_use_pincode, args=(candidate.pincode,))
+                    else:
+                        st.error(f"No serviceable pincode starts with {pincode}.")
                 else:
                     st.error("Please enter a valid 6-digit pincode.")
 
@@ -222,9 +312,22 @@ def display_lead_capture():
 
         # STEP 6: Business Segment
         if st.session_state.step >= 6:
-            segment = st.text_input("7. What is the Business Industry?", key="segment_input")
+            # Typing filters the taxonomy in the browser; other text is accepted as typed
+            # (and kept as the first option, e.g. a restored free-text segment)
+            industries = logic.INDUSTRY_INDEX
+            typed = st.session_state.get('segment_input')
+            options = industries.names if not typed or typed in industries.names else (typed,) + industries.names
+            segment = st.selectbox("7. What is the Business Industry?", options, index=None,
+                                   accept_new_options=True, placeholder="Start typing, e.g. Kirana, Textiles, IT Services",
+                                   key="segment_input")
             if segment:
                 st.session_state.lead_data['business_segment'] = segment
+                if segment not in industries.names:
+                    closest = [c.name for c in industries.match(segment, limit=3).canonical if c.confidence >= 0.5]
+                    if closest:
+                        st.caption("Did you mean:")
+                        for column, name in zip(st.columns(len(closest)), closest):
+                            column.button(name, key=f"segment_suggestion_{name}", on_click=_use_segment, args=(name,))
                 if st.session_state.step == 6: st.session_state.step = 7
 
         # STEP 7: Nature of Business
@@ -374,7 +477,7 @@ def display_lead_capture():
                 else:
                     loan_type = loan_type_display
                 st.session_state.lead_data['requested_loan_type'] = loan_type
-                st.session_state.eligibility_results = logic.check_eligibility(st.session_state.lead_data)
+                refresh_eligibility()
                 if st.session_state.step == 15:
                     st.session_state.step = 16
 
@@ -392,11 +495,11 @@ def display_lead_capture():
                 if st.button("💾 Save as Draft"):
                     ok = save_lead_to_storage(is_draft=True)
                     if ok:
-                        st.success("Draft saved to data/leads.xlsx. You can continue later and load it using the mobile number.")
+                        st.success("Draft saved. You can continue later and load it using the mobile number.")
             with col_save:
                 if st.button("✅ Save Lead (Final)"):
                     try:
-                        st.session_state.eligibility_results = logic.check_eligibility(st.session_state.lead_data)
+                        refresh_eligibility()
                         ok = save_lead_to_storage(is_draft=False)
                         if ok:
                             st.success(f"Lead for mobile number {st.session_state.lead_data.get('mobile_number')} saved successfully!")
@@ -408,7 +511,7 @@ def display_lead_capture():
         st.header("Lender Eligibility Board")
         
         if st.session_state.lead_data:
-            st.session_state.eligibility_results = logic.check_eligibility(st.session_state.lead_data)
+            refresh_eligibility()
         
         if not st.session_state.eligibility_results:
             st.info("The board will update in real-time as you enter lead details.")
@@ -426,6 +529,24 @@ def display_lead_capture():
                 with st.expander(f"💡 {lender} — Tips / Possible Deviations (click to view)"):
                     for tip in tips:
                         st.info(tip)
+
+        # Loan capacity of the eligible lenders: max EMI within each lender's max FOIR
+        # and the loan it repays per tenure, at the chosen interest rate
+        eligible = [lender for lender, result in st.session_state.eligibility_results.items() if result["eligible"]]
+        lead_capacity = capacity.lead_capacity(st.session_state.lead_data, eligible) if eligible else None
+        if lead_capacity is not None and lead_capacity.max_emi.any():
+            st.subheader("Loan Capacity")
+            rate = st.select_slider("Interest rate (p.a.)", options=list(lead_capacity.rates), value=0.18,
+                                    format_func=lambda r: f"{r:.0%}", key="capacity_rate_input")
+            rows = [i for i, emi in enumerate(lead_capacity.max_emi) if emi > 0]
+            table = pd.DataFrame(
+                lead_capacity.max_loan[rows, lead_capacity.rates.index(rate)].round(),
+                index=[lead_capacity.lenders[i] for i in rows],
+                columns=[f"{months} months (₹)" for months in lead_capacity.tenures],
+            )
+            table.insert(0, "Max EMI (₹)", lead_capacity.max_emi[rows].round())
+            st.dataframe(table, column_config={column: st.column_config.NumberColumn(format="localized")
+                                               for column in table.columns})
         
         if st.session_state.step == 16:
             st.subheader("Final Lead Summary")
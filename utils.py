@@ -4,10 +4,19 @@ import pandas as pd
 from io import BytesIO
 from pathlib import Path
 import json
-from datetime import datetime
+import os
+from datetime import datetime, timezone
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
 
+import logic
+import metrics
+import policy_data
+from db import ConnectionPool
+from draft_cache import DraftCache
+from outbox import LeadOutbox
+
 
 # --- UNIT DEFINITIONS ---
 UNITS = {
@@ -131,89 +140,46 @@ def _read_all_leads():
 #         st.error(f"Failed to load draft from Excel: {e}")
 #         return None
 
-@st.cache_resource
+# --- POLICY DATA ---
+# Loading lives in policy_data (no Streamlit dependency, loaded once per
+# process); these wrappers surface its load errors in the UI.
+def show_policy_load_errors():
+    """Shows missing/unreadable policy files as Streamlit errors."""
+    for message in policy_data.LOAD_ERRORS:
+        st.error(message)
+
+
 def load_pincode_sets():
     """
-    Loads serviceable pincodes from CSV files into a dictionary of sets.
+    Returns a dictionary of lender -> ServiceablePincodes (a read-only set view
+    over one shared PincodeIndex).
     """
-    pincode_sets = {}
-    # IMPORTANT: Update these file paths to be correct for your system
-    lender_files = {
-        "Indifi (Term Loan)": "data/indifi_pincode.csv",
-        "Kotak (Term Loan)": "data/kotak_pincode.csv",
-        "Axis Bank (Term Loan)": "data/axis_pincode.csv",
-        "Bajaj (Term Loan)":"data/bajaj_pincode.csv",
-        "Bajaj (STBL Lite T/O < 50L)":"data/bajaj_pincode.csv",
-        "Bajaj (STBL T/O > 50L)":"data/bajaj_pincode.csv",
-        "Flexi (Term Loan)":"data/flexi_pincode.csv",
-        "Kotak (CA Program)": "data/kotak_pincode.csv",
-        "L&T (Term Loan)":"data/ltfs_pincode.csv",
-        "L&T (CA Program)":"data/ltfs_pincode.csv",
-        "Hero (Term Loan)":"data/hero_pincode.csv",
-        "Credit Saison (SBA Program)":"data/credit_saison_pincode.csv",
-        "Credit Saison (UBL Program)":"data/credit_saison_pincode.csv"
-    }
-
-    for lender, filename in lender_files.items():
-        try:
-            # Read the CSV file
-            df = pd.read_csv(filename)
-            
-            # Convert the 'pincode' column to a set of integers for fast lookup
-            pincode_sets[lender] = set(df['pincode'].astype(int))
-            print(f"Loaded {len(pincode_sets[lender])} pincodes for {lender}")
-            
-        except FileNotFoundError:
-            st.error(f"Pincode file not found: {filename}. {lender} will have no pincode rules.")
-            pincode_sets[lender] = set() # Create an empty set
-        except Exception as e:
-            st.error(f"Error loading {filename}: {e}")
-            pincode_sets[lender] = set()
-
-    return pincode_sets
+    return policy_data.load_pincode_sets()
 
 
-@st.cache_resource
 def load_negative_industry_sets():
-    negative_industry_sets = {}
-    lender_files = {
-        "Indifi (Term Loan)": "data/bajaj_negative_industry.csv",
-        "Kotak (Term Loan)": "data/bajaj_negative_industry.csv",
-        "Bajaj (Term Loan)":"data/bajaj_negative_industry.csv",
-        "Bajaj (STBL Lite T/O < 50L)":"data/bajaj_negative_industry.csv",
-        "Bajaj (STBL T/O > 50L)":"data/bajaj_negative_industry.csv",
-        "Flexi (Term Loan)":"data/flexi_negative_industry.csv",
-        "Kotak (CA Program)": "data/bajaj_negative_industry.csv",
-        "L&T (Term Loan)":"data/ltfs_negative_industries.csv",
-        "L&T (CA Program)":"data/ltfs_negative_industries.csv",
-        "Hero (Term Loan)":"data/ltfs_negative_industries.csv",
-        "Credit Saison (SBA Program)":"data/ltfs_negative_industries.csv",
-        "Credit Saison (UBL Program)":"data/ltfs_negative_industries.csv"
-    }
-    for lender,filename in lender_files.items():
-        try:
-            df = pd.read_csv(filename)
-            
-            # --- START FIX ---
-            # Clean and normalize the data: drop NAs, convert to string, strip whitespace, and convert to lowercase
-            df_cleaned = df['negative_industries'].dropna().astype(str)
-            negative_industry_sets[lender] = set(s.strip().lower() for s in df_cleaned)
-            # --- END FIX ---
-
-            print(f"Loaded {len(negative_industry_sets[lender])} Negative Industries for {lender}")
-        except FileNotFoundError:
-            st.error(f"Negative Industry file not found: {filename}. {lender} will have no rules.")
-            negative_industry_sets[lender] = set()
-        except Exception as e:
-            st.error(f"Error loading {filename}: {e}")
-            negative_industry_sets[lender] = set()
-        
-    return negative_industry_sets
+    """
+    Returns a dictionary of lender -> NegativeIndustrySet.
+    """
+    return policy_data.load_negative_industry_sets()
+
+
+# --- DATABASE ---
+# Pool sizing and timeouts; override under st.secrets["supabase"]
+DB_POOL_DEFAULTS = {
+    "POOL_MIN": 1,
+    "POOL_MAX": 10,
+    "CONNECT_TIMEOUT": 10,              # seconds to open a connection
+    "STATEMENT_TIMEOUT_MS": 15000,      # server-side limit per statement
+    "CHECKOUT_TIMEOUT": 10,             # seconds to wait for a free connection
+    "HEALTH_CHECK_INTERVAL": 30,        # ping connections idle longer than this
+}
+
 
 @st.cache_resource
-def init_db_connection():
+def init_db_pool():
     """
-    Initialize and return a psycopg2 connection using Streamlit secrets.
+    Initialize and return a ConnectionPool of psycopg2 connections using Streamlit secrets.
     Expects the secret at st.secrets["supabase"]["DATABASE_URL"].
     """
     db_url = None
@@ -223,9 +189,157 @@ def init_db_connection():
         st.error("Database URL not found in Streamlit secrets under ['supabase']['DATABASE_URL'].")
         raise
 
-    # Use sslmode=require to be safe for cloud connections
-    conn = psycopg2.connect(db_url, sslmode='require', cursor_factory=psycopg2.extras.RealDictCursor)
-    return conn
+    settings = dict(DB_POOL_DEFAULTS)
+    for key in settings:
+        try:
+            settings[key] = type(settings[key])(st.secrets["supabase"][key])
+        except Exception:
+            pass
+
+    def connect():
+        # Use sslmode=require to be safe for cloud connections
+        return psycopg2.connect(
+            db_url,
+            sslmode='require',
+            cursor_factory=psycopg2.extras.RealDictCursor,
+            connect_timeout=settings["CONNECT_TIMEOUT"],
+            options=f"-c statement_timeout={settings['STATEMENT_TIMEOUT_MS']}",
+        )
+
+    return ConnectionPool(
+        connect,
+        minconn=settings["POOL_MIN"],
+        maxconn=settings["POOL_MAX"],
+        checkout_timeout=settings["CHECKOUT_TIMEOUT"],
+        health_check_interval=settings["HEALTH_CHECK_INTERVAL"],
+        disconnect_errors=(psycopg2.OperationalError, psycopg2.InterfaceError),
+    )
+
+UPSERT_LEAD_SQL = """
+INSERT INTO public.bdo_leads (
+    mobile_number, vintage_years,firm_name,bdo_name, business_segment, nature_of_business,
+    constitution_type, gender, age, co_applicant_details, monthly_turnover,
+    yearly_turnover, total_obligations, foir, pincode, ownership_status,
+    profit_last_year, eligibility_mask, eligibility_codes, eligibility_results, is_ntc, requested_loan_type,
+    lead_json, draft_step, status, updated_at, remarks
+)
+VALUES %s
+ON CONFLICT (mobile_number) DO UPDATE SET
+    firm_name = EXCLUDED.firm_name,
+    bdo_name = EXCLUDED.bdo_name,
+    vintage_years = EXCLUDED.vintage_years,
+    business_segment = EXCLUDED.business_segment,
+    nature_of_business = EXCLUDED.nature_of_business,
+    constitution_type = EXCLUDED.constitution_type,
+    gender = EXCLUDED.gender,
+    age = EXCLUDED.age,
+    co_applicant_details = EXCLUDED.co_applicant_details,
+    monthly_turnover = EXCLUDED.monthly_turnover,
+    yearly_turnover = EXCLUDED.yearly_turnover,
+    total_obligations = EXCLUDED.total_obligations,
+    foir = EXCLUDED.foir,
+    pincode = EXCLUDED.pincode,
+    ownership_status = EXCLUDED.ownership_status,
+    profit_last_year = EXCLUDED.profit_last_year,
+    eligibility_mask = EXCLUDED.eligibility_mask,
+    eligibility_codes = EXCLUDED.eligibility_codes,
+    eligibility_results = EXCLUDED.eligibility_results,
+    is_ntc = EXCLUDED.is_ntc,
+    requested_loan_type = EXCLUDED.requested_loan_type,
+    lead_json = EXCLUDED.lead_json,
+    draft_step = EXCLUDED.draft_step,
+    status = EXCLUDED.status,
+    updated_at = now(),
+    remarks = EXCLUDED.remarks;
+"""
+
+UPSERT_LEAD_TEMPLATE = """(
+    %(mobile)s, %(vintage)s,%(firm_name)s,%(bdo_name)s, %(business_segment)s, %(nature_of_business)s,
+    %(constitution_type)s, %(gender)s, %(age)s, %(co_applicant_details)s, %(monthly_turnover)s,
+    %(yearly_turnover)s, %(total_obligations)s, %(foir)s, %(pincode)s, %(ownership_status)s,
+    %(profit_last_year)s, %(eligibility_mask)s, %(eligibility_codes)s::smallint[], %(eligibility_results)s, %(is_ntc)s, %(requested_loan_type)s,
+    %(lead_json)s, %(draft_step)s, %(status)s, now(), %(remarks)s
+)"""
+
+
+def _lead_params(lead_dict, status):
+    """
+    Maps a lead dict onto the UPSERT_LEAD_TEMPLATE placeholders. Eligibility is
+    stored as reason codes (see logic.eligibility_columns); the legacy
+    eligibility_results JSON text is still written, rebuilt from the codes,
+    for readers that have not moved to them.
+    """
+    eligibility_mask, eligibility_codes = logic.eligibility_columns(lead_dict)
+    lead_dict = {key: value for key, value in lead_dict.items() if key != 'eligibility_results'}
+    eligibility_results = logic.describe_eligibility(lead_dict, eligibility_codes)
+    return {
+        "mobile": lead_dict.get('mobile_number'),
+        "vintage": lead_dict.get('vintage_years'),
+        "firm_name": lead_dict.get('firm_name'),
+        "bdo_name": lead_dict.get('bdo_name'),
+        "business_segment": lead_dict.get('business_segment'),
+        "nature_of_business": lead_dict.get('nature_of_business'),
+        "constitution_type": lead_dict.get('constitution_type'),
+        "gender": lead_dict.get('gender'),
+        "age": lead_dict.get('age'),
+        "co_applicant_details": json.dumps(lead_dict.get('co_applicant_details')) if lead_dict.get('co_applicant_details') else None,
+        "monthly_turnover": lead_dict.get('monthly_turnover'),
+        "yearly_turnover": lead_dict.get('yearly_turnover'),
+        "total_obligations": lead_dict.get('total_obligations'),
+        "foir": lead_dict.get('foir'),
+        "pincode": lead_dict.get('pincode'),
+        "ownership_status": lead_dict.get('ownership_status'),
+        "profit_last_year": lead_dict.get('profit_last_year'),
+        "eligibility_mask": eligibility_mask,
+        "eligibility_codes": eligibility_codes,
+        "eligibility_results": json.dumps(eligibility_results),
+        "is_ntc": bool(lead_dict.get('is_ntc')),
+        "requested_loan_type": lead_dict.get('requested_loan_type'),
+        # Save full snapshot as JSON
+        "lead_json": json.dumps(lead_dict, default=str),
+        "draft_step": lead_dict.get('draft_step'),
+        "status": status,
+        "remarks": lead_dict.get('remarks')
+    }
+
+
+def upsert_leads(conn, items, commit=True):
+    """
+    Upserts (lead_dict, status) pairs in one multi-row statement and commits
+    (unless commit=False). Mobile numbers must be unique within items (Postgres
+    rejects a statement that updates the same row twice). Raises on failure.
+    Returns the statement parameters of each row.
+    """
+    rows = [_lead_params(lead_dict, status) for lead_dict, status in items]
+    with conn.cursor() as cur:
+        try:
+            psycopg2.extras.execute_values(cur, UPSERT_LEAD_SQL, rows, template=UPSERT_LEAD_TEMPLATE,
+                                           page_size=len(rows) or 1)
+        except psycopg2.errors.UndefinedColumn as e:
+            raise RuntimeError(f"public.bdo_leads is missing a column lead saves write ({e}); "
+                               f"migrate it with `python schema.py`.") from e
+    if commit:
+        conn.commit()
+    return rows
+
+
+def save_leads_to_db(items):
+    """
+    Upserts a batch of (lead_dict, status) pairs through the pool and writes
+    the saved drafts through to the draft cache; raises on failure.
+    """
+    cache = init_draft_cache()
+    for lead_dict, _ in items:
+        # Loads already running read the old row; keep them out of the cache
+        cache.invalidate(str(lead_dict.get('mobile_number')))
+    with metrics.timed("eligibility_db_seconds", op="save_leads"):
+        rows = init_db_pool().run(lambda conn: upsert_leads(conn, items))
+    revision = logic.POLICY.revision
+    saved_at = datetime.now(timezone.utc)  # updated_at is set by the server; close enough for display
+    for row in rows:
+        draft = _draft_from_row(row["lead_json"], row["draft_step"], row["status"], saved_at, row["eligibility_codes"])
+        cache.put(str(row["mobile"]), draft, revision)
+
 
 def save_lead_to_db(lead_dict, status="draft"):
     """
@@ -233,146 +347,165 @@ def save_lead_to_db(lead_dict, status="draft"):
     lead_dict: dict containing lead data. Returns True/False.
     """
     try:
-        conn = init_db_connection()
         mobile = lead_dict.get('mobile_number')
         if not mobile:
             st.error("Mobile number required to save.")
             return False
 
-        # Prepare values
-        vintage = lead_dict.get('vintage_years')
-        pincode = lead_dict.get('pincode')
-        yearly_turnover = lead_dict.get('yearly_turnover')
-        foir = lead_dict.get('foir')
-        requested_loan_type = lead_dict.get('requested_loan_type')
-        is_ntc = bool(lead_dict.get('is_ntc'))
-        # Save full snapshot as JSON
-        lead_json = json.dumps(lead_dict, default=str)
-        eligibility = lead_dict.get('eligibility_results', None)
-
-        query = """
-        INSERT INTO public.bdo_leads (
-            mobile_number, vintage_years,firm_name,bdo_name, business_segment, nature_of_business,
-            constitution_type, gender, age, co_applicant_details, monthly_turnover,
-            yearly_turnover, total_obligations, foir, pincode, ownership_status,
-            profit_last_year, eligibility_results, is_ntc, requested_loan_type,
-            lead_json, draft_step, status, updated_at, remarks
-        )
-        VALUES (
-            %(mobile)s, %(vintage)s,%(firm_name)s,%(bdo_name)s, %(business_segment)s, %(nature_of_business)s,
-            %(constitution_type)s, %(gender)s, %(age)s, %(co_applicant_details)s, %(monthly_turnover)s,
-            %(yearly_turnover)s, %(total_obligations)s, %(foir)s, %(pincode)s, %(ownership_status)s,
-            %(profit_last_year)s, %(eligibility_results)s, %(is_ntc)s, %(requested_loan_type)s,
-            %(lead_json)s, %(draft_step)s, %(status)s, now(), %(remarks)s
-        )
-        ON CONFLICT (mobile_number) DO UPDATE SET
-            firm_name = EXCLUDED.firm_name,
-            bdo_name = EXCLUDED.bdo_name,
-            vintage_years = EXCLUDED.vintage_years,
-            business_segment = EXCLUDED.business_segment,
-            nature_of_business = EXCLUDED.nature_of_business,
-            constitution_type = EXCLUDED.constitution_type,
-            gender = EXCLUDED.gender,
-            age = EXCLUDED.age,
-            co_applicant_details = EXCLUDED.co_applicant_details,
-            monthly_turnover = EXCLUDED.monthly_turnover,
-            yearly_turnover = EXCLUDED.yearly_turnover,
-            total_obligations = EXCLUDED.total_obligations,
-            foir = EXCLUDED.foir,
-            pincode = EXCLUDED.pincode,
-            ownership_status = EXCLUDED.ownership_status,
-            profit_last_year = EXCLUDED.profit_last_year,
-            eligibility_results = EXCLUDED.eligibility_results,
-            is_ntc = EXCLUDED.is_ntc,
-            requested_loan_type = EXCLUDED.requested_loan_type,
-            lead_json = EXCLUDED.lead_json,
-            draft_step = EXCLUDED.draft_step,
-            status = EXCLUDED.status,
-            updated_at = now(),
-            remarks = EXCLUDED.remarks;
-        """
-
-        params = {
-            "mobile": mobile,
-            "vintage": vintage,
-            "firm_name": lead_dict.get('firm_name'),
-            "bdo_name": lead_dict.get('bdo_name'),
-            "business_segment": lead_dict.get('business_segment'),
-            "nature_of_business": lead_dict.get('nature_of_business'),
-            "constitution_type": lead_dict.get('constitution_type'),
-            "gender": lead_dict.get('gender'),
-            "age": lead_dict.get('age'),
-            "co_applicant_details": json.dumps(lead_dict.get('co_applicant_details')) if lead_dict.get('co_applicant_details') else None,
-            "monthly_turnover": lead_dict.get('monthly_turnover'),
-            "yearly_turnover": yearly_turnover,
-            "total_obligations": lead_dict.get('total_obligations'),
-            "foir": foir,
-            "pincode": pincode,
-            "ownership_status": lead_dict.get('ownership_status'),
-            "profit_last_year": lead_dict.get('profit_last_year'),
-            "eligibility_results": json.dumps(eligibility) if eligibility is not None else None,
-            "is_ntc": is_ntc,
-            "requested_loan_type": requested_loan_type,
-            "lead_json": lead_json,
-            "draft_step": lead_dict.get('draft_step'),
-            "status": status,
-            "remarks": lead_dict.get('remarks')
-        }
-
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            conn.commit()
+        save_leads_to_db([(lead_dict, status)])
         return True
     except Exception as e:
         st.error(f"Failed to save lead to DB: {e}")
         return False
 
+
+# --- DRAFT CACHE ---
+DRAFT_CACHE_SIZE = 512      # drafts kept per server process
+DRAFT_CACHE_TTL = 300.0     # seconds; bounds staleness after saves made by other processes
+
+
+@st.cache_resource
+def init_draft_cache():
+    """Read-through cache in front of load_draft_from_db, written through by save_leads_to_db."""
+    return DraftCache(maxsize=DRAFT_CACHE_SIZE, ttl=DRAFT_CACHE_TTL)
+
+
+def draft_cache_stats():
+    """Hit/miss counters of the draft cache (see DraftCache.stats)."""
+    return init_draft_cache().stats()
+
+
+# --- METRICS ---
+METRICS_FILE = os.environ.get("ELIGIBILITY_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("ELIGIBILITY_METRICS_INTERVAL", "15"))
+
+
+@st.cache_resource
+def init_metrics_dump():
+    """
+    Starts writing the metrics to ELIGIBILITY_METRICS_FILE every
+    ELIGIBILITY_METRICS_INTERVAL seconds (one thread per server process).
+    Returns the FileDumper, or None when metrics are off or no file is set.
+    """
+    if not (metrics.ENABLED and METRICS_FILE):
+        return None
+    return metrics.FileDumper(METRICS_FILE, METRICS_INTERVAL).start()
+
+
+# --- WRITE-BEHIND LEAD SAVES ---
+OUTBOX_FILE = Path("data/lead_outbox.sqlite3")
+
+
+@st.cache_resource
+def init_lead_outbox():
+    """
+    Durable local queue of lead saves, drained to the database by a background
+    thread (one per server process).
+    """
+    return LeadOutbox(OUTBOX_FILE, flush=save_leads_to_db).start()
+
+
+def queue_lead_save(lead_dict, status="draft"):
+    """
+    Records a lead save locally and returns immediately; the database upsert
+    happens in the background. Returns True/False like save_lead_to_db.
+    """
+    try:
+        if not lead_dict.get('mobile_number'):
+            st.error("Mobile number required to save.")
+            return False
+        init_lead_outbox().enqueue(lead_dict, status)
+        return True
+    except Exception as e:
+        st.error(f"Failed to queue lead save: {e}")
+        return False
+
+
+def load_pending_draft(mobile):
+    """
+    The latest save of a lead that is still queued locally, shaped like
+    load_draft_from_db's result, or None. Lets a draft be reloaded before it
+    reaches the database.
+    """
+    pending = init_lead_outbox().pending_lead(mobile)
+    if not pending:
+        return None
+    lead_data, status = pending
+    return {"lead_data": lead_data, "draft_step": lead_data.get('draft_step'), "status": status, "updated_at": None,
+            "eligibility_results": logic.check_eligibility(lead_data)}
+
+
+def lead_sync_state(mobile):
+    """(state, last_error) of a lead's queued saves: "pending", "retrying", "failed", "synced" or None."""
+    return init_lead_outbox().sync_state(mobile)
+
+
+def _draft_from_row(lead_json, draft_step, status, updated_at, eligibility_codes):
+    """load_draft_from_db's result for one bdo_leads row."""
+    # Parse lead_json into a python dict regardless of stored type
+    lead_data = {}
+    if lead_json is None:
+        lead_data = {}
+    elif isinstance(lead_json, dict):
+        lead_data = lead_json
+    else:
+        # lead_json likely a string
+        try:
+            lead_data = json.loads(lead_json)
+        except Exception:
+            # fallback: leave as empty dict if unparseable
+            lead_data = {}
+
+    # ensure draft_step is also present inside lead_data (useful when restoring)
+    if 'draft_step' not in lead_data and draft_step is not None:
+        try:
+            lead_data['draft_step'] = int(draft_step)
+        except Exception:
+            lead_data['draft_step'] = draft_step
+
+    eligibility_results = logic.describe_eligibility(lead_data, eligibility_codes)
+    return {"lead_data": lead_data, "draft_step": draft_step, "status": status, "updated_at": updated_at,
+            "eligibility_results": eligibility_results}
+
+
 def load_draft_from_db(mobile):
     """
-    Load lead row by mobile number. Returns dict {'lead_data': {...}, 'draft_step':..., 'status':..., 'updated_at':...} or None.
+    Load lead row by mobile number. Returns dict {'lead_data': {...}, 'draft_step':..., 'status':..., 'updated_at':...,
+    'eligibility_results': {...} rebuilt from the stored reason codes} or None.
     Robustly handles lead_json stored as jsonb/dict or as string.
+    Served from the draft cache when this process loaded or saved the lead recently.
     """
     try:
-        conn = init_db_connection()
-        query = "SELECT lead_json, draft_step, status, updated_at FROM public.bdo_leads WHERE mobile_number = %s LIMIT 1;"
-        with conn.cursor() as cur:
-            cur.execute(query, (str(mobile),))
-            row = cur.fetchone()
-            if not row:
-                return None
-
-            # If using RealDictCursor, row may be a dict-like
-            if isinstance(row, dict):
-                lead_json = row.get('lead_json')
-                draft_step = row.get('draft_step')
-                status = row.get('status')
-                updated_at = row.get('updated_at')
-            else:
-                # tuple-like: (lead_json, draft_step, status, updated_at)
-                lead_json, draft_step, status, updated_at = row
-
-            # Parse lead_json into a python dict regardless of stored type
-            lead_data = {}
-            if lead_json is None:
-                lead_data = {}
-            elif isinstance(lead_json, dict):
-                lead_data = lead_json
-            else:
-                # lead_json likely a string
-                try:
-                    lead_data = json.loads(lead_json)
-                except Exception:
-                    # fallback: leave as empty dict if unparseable
-                    lead_data = {}
-
-            # ensure draft_step is also present inside lead_data (useful when restoring)
-            if 'draft_step' not in lead_data and draft_step is not None:
-                try:
-                    lead_data['draft_step'] = int(draft_step)
-                except Exception:
-                    lead_data['draft_step'] = draft_step
-
-            return {"lead_data": lead_data, "draft_step": draft_step, "status": status, "updated_at": updated_at}
+        cache = init_draft_cache()
+        revision = logic.POLICY.revision
+        cached = cache.get(str(mobile), revision)
+        metrics.inc("eligibility_draft_cache_total", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+        token = cache.begin_load(str(mobile))
+
+        query = ("SELECT lead_json, draft_step, status, updated_at, eligibility_codes "
+                 "FROM public.bdo_leads WHERE mobile_number = %s LIMIT 1;")
+
+        def fetch(conn):
+            with conn.cursor() as cur:
+                cur.execute(query, (str(mobile),))
+                return cur.fetchone()
+
+        with metrics.timed("eligibility_db_seconds", op="load_draft"):
+            row = init_db_pool().run(fetch)
+        if not row:
+            return None
+
+        # If using RealDictCursor, row may be a dict-like
+        if isinstance(row, dict):
+            draft = _draft_from_row(row.get('lead_json'), row.get('draft_step'), row.get('status'),
+                                    row.get('updated_at'), row.get('eligibility_codes'))
+        else:
+            # tuple-like: (lead_json, draft_step, status, updated_at, eligibility_codes)
+            draft = _draft_from_row(*row)
+        cache.put(str(mobile), draft, revision, token)
+        return draft
     except Exception as e:
         st.error(f"Failed to load draft from DB: {e}")
-        return None
\ No newline at end of file
+        return None